@@ -4,34 +4,23 @@ course project.
 """
 
 import codecs
-import ply.lex
-from typing import List
+import os
 
+import ssbatch
 import sslexer
 
 
-def read_file(filename: str) -> str:
-    """
-    Reads the file data to string.
-
-    Another code snippet given from instructions.
-    :return: The file content as string.
-    """
-    with codecs.open(filename, 'r', encoding='utf-8') as INFILE:
-        return INFILE.read()
-
-
 def tokenize_file(filename: str):
     """
-    Reads the data from file to string.
+    Tokenizes the file and prints the tokens.
     I have moved the reading from example to this function so that tests can be run without CLI.
 
     :param filename: File to read.
     """
-    file_data: str = read_file(filename=filename)
-    token_list: List[ply.lex.LexToken] = sslexer.tokenize_data(data=file_data)
-    for token in token_list:
-        print(token)
+    with codecs.open(filename, 'r', encoding='utf-8') as INFILE:
+        # The tokens are printed as soon as they are read so large files don't have to fit in memory.
+        for token in sslexer.iter_tokens(source=INFILE):
+            print(token)
 
 
 if __name__ == '__main__':
@@ -47,11 +36,17 @@ if __name__ == '__main__':
     group = parser.add_mutually_exclusive_group()
     group.add_argument('--who', action='store_true', help='who wrote this')
     group.add_argument('-f', '--file', help='filename to process')
+    group.add_argument('-b', '--batch', nargs='+', metavar='PATTERN',
+                       help='process the files matching the glob patterns or in the directories')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes for --batch')
+    parser.add_argument('--unordered', action='store_true', help='write the results of --batch as they are done')
 
     ns = parser.parse_args()
     if ns.who:
         # identify who wrote this
         print('424562 Chi-Hao Lay')
+    elif ns.batch is not None:
+        ssbatch.run_batch(tokenize_file, ns.batch, jobs=ns.jobs, ordered=not ns.unordered)
     elif ns.file is None:
         # user didn't provide input filename
         parser.print_help()
@@ -6,7 +6,8 @@ Actual lexer implementation for SheetScript.
 to improve flexibility and readability.
 """
 
-from typing import Dict, List
+import mmap
+from typing import IO, Dict, Iterator, List, Union
 
 import ply.lex
 
@@ -163,3 +164,69 @@ def tokenize_data(data: str) -> List[ply.lex.LexToken]:
     """
     lexer.input(data)
     return list(lexer)
+
+
+# Anything that iter_tokens accepts as source code. Bytes are expected to be UTF-8.
+Source = Union[str, bytes, mmap.mmap, IO]
+
+# Approximate size of the chunks read from files.
+# The chunks end at line boundaries since none of the tokens can span multiple lines.
+CHUNK_SIZE: int = 1 << 16
+
+
+def read_chunks(source: Source) -> Iterator[str]:
+    """
+    Splits the source to chunks of complete lines so that large files don't have to be read to memory at once.
+
+    :param source: A string, bytes, mmap or a file object opened in text or binary mode.
+    :return: Generator of text chunks.
+    """
+    if isinstance(source, str):
+        # Already in memory, nothing to gain from splitting.
+        yield source
+    elif isinstance(source, (bytes, bytearray, mmap.mmap)):
+        start: int = 0
+        size: int = len(source)
+        while start < size:
+            end: int = source.find(b"\n", start + CHUNK_SIZE)
+            end = size if end == -1 else end + 1
+            yield bytes(source[start:end]).decode("utf-8")
+            start = end
+    else:
+        lines: List[Union[str, bytes]] = []
+        length: int = 0
+        for line in source:
+            lines.append(line)
+            length += len(line)
+            if length >= CHUNK_SIZE:
+                yield _join_lines(lines)
+                lines = []
+                length = 0
+        if lines:
+            yield _join_lines(lines)
+
+
+def _join_lines(lines: List[Union[str, bytes]]) -> str:
+    if isinstance(lines[0], bytes):
+        return b"".join(lines).decode("utf-8")
+    return "".join(lines)
+
+
+def iter_tokens(source: Source) -> Iterator[ply.lex.LexToken]:
+    """
+    Tokenizes the source lazily chunk by chunk, so the memory use does not grow with the input size.
+    The `lineno` and `lexpos` of the tokens are the same as if the whole source was tokenized at once.
+    A clone of the lexer is used so that tokenize_data can be called while the generator is suspended.
+
+    :param source: A string, bytes, mmap or a file object.
+    :return: Generator of LexToken instances.
+    """
+    chunk_lexer: ply.lex.Lexer = lexer.clone()
+    chunk_lexer.lineno = 1
+    offset: int = 0
+    for chunk in read_chunks(source):
+        chunk_lexer.input(chunk)
+        for token in chunk_lexer:
+            token.lexpos += offset
+            yield token
+        offset += len(chunk)
@@ -0,0 +1,29 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import ssbatch
+from main import tokenize_file
+
+
+class SSBatchTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.good = os.path.join(self.directory, "good.sheetscript")
+        self.bad = os.path.join(self.directory, "bad.sheetscript")
+        shutil.copy("tests/code.sheetscript", self.good)
+        with open(self.bad, "w", encoding="utf-8") as source:
+            source.write("scalar xx = 1.0 @\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_error_only_fails_the_file(self):
+        for jobs in (1, 2):
+            output, errors = io.StringIO(), io.StringIO()
+            summary = ssbatch.run_batch(tokenize_file, [self.directory], jobs=jobs, output=output, errors=errors)
+            self.assertEqual((summary.files, summary.failed), (2, 1))
+            self.assertTrue(output.getvalue().startswith(f"==> {self.good} <==\n"))
+            self.assertIn(f"{self.bad}: Illegal character '@' at line 1\n", errors.getvalue())
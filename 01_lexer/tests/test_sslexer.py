@@ -1,10 +1,15 @@
+import io
 from typing import List, Tuple
 from unittest import TestCase
 
 import ply
 
 import sslexer
-from main import read_file
+
+
+def read_source() -> str:
+    with open('tests/code.sheetscript', encoding='utf-8') as source:
+        return source.read()
 
 
 class SSLexerTest(TestCase):
@@ -51,7 +56,20 @@ class SSLexerTest(TestCase):
             ("ENDIF", "endif"),
             ("END", "end")
         ]
-        token_list: List[ply.lex.LexToken] = sslexer.tokenize_data(data=read_file('tests/code.sheetscript'))
+        token_list: List[ply.lex.LexToken] = sslexer.tokenize_data(data=read_source())
         for token, expected in zip(token_list, expected_tokens):
             self.assertEqual(token.type, expected[0], msg=token)
             self.assertEqual(token.value, expected[1], msg=token)
+
+    def test_iter_tokens(self):
+        data: str = read_source()
+        # A fresh lexer, the module lexer keeps counting lines from previous inputs.
+        fresh: ply.lex.Lexer = sslexer.lexer.clone()
+        fresh.lineno = 1
+        fresh.input(data)
+        expected: List[Tuple[str, str, int, int]] = [
+            (token.type, token.value, token.lineno, token.lexpos) for token in fresh
+        ]
+        for source in [data, io.StringIO(data), io.BytesIO(data.encode("utf-8"))]:
+            tokens = [(token.type, token.value, token.lineno, token.lexpos) for token in sslexer.iter_tokens(source)]
+            self.assertEqual(tokens, expected)
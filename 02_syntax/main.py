@@ -1,5 +1,7 @@
 import codecs
+import os
 
+import ssbatch
 import ssparser
 
 
@@ -26,10 +28,16 @@ if __name__ == '__main__':
     group = parser.add_mutually_exclusive_group()
     group.add_argument('--who', action='store_true', help='who wrote this')
     group.add_argument('-f', '--file', help='filename to process')
+    group.add_argument('-b', '--batch', nargs='+', metavar='PATTERN',
+                       help='process the files matching the glob patterns or in the directories')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes for --batch')
+    parser.add_argument('--unordered', action='store_true', help='write the results of --batch as they are done')
 
     ns = parser.parse_args()
     if ns.who:
         print('424562 Chi-Hao Lay')
+    elif ns.batch is not None:
+        ssbatch.run_batch(parse_file, ns.batch, jobs=ns.jobs, ordered=not ns.unordered)
     elif ns.file is None:
         parser.print_help()
     else:
@@ -0,0 +1,148 @@
+"""
+Batch mode of the CLI for processing many files in one run.
+
+The files are given as glob patterns or directories, a directory means all SheetScript files under it.
+Each file is processed by a function of the CLI in a pool of worker processes, so Python and PLY are started
+only once per worker. What the function prints is collected and written by the main process, either in the
+order of the files or as soon as a file is done. An error in a file, also the SystemExit of a syntax error,
+only fails that file and the rest are processed.
+
+The same module is in every phase, only the function that processes a file differs.
+"""
+import contextlib
+import functools
+import glob
+import io
+import multiprocessing
+import os
+import sys
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO
+
+# The files that are searched from directories.
+PATTERN: str = "*.sheetscript"
+
+
+class FileResult:
+    """
+    What processing a file printed, or the error if it failed.
+    """
+    __slots__ = ("filename", "size", "output", "error")
+
+    def __init__(self, filename: str, size: int, output: str, error: Optional[str] = None):
+        self.filename: str = filename
+        self.size: int = size
+        self.output: str = output
+        self.error: Optional[str] = error
+
+
+class Summary:
+    """
+    The number of files and bytes processed and the time taken.
+    """
+    __slots__ = ("files", "failed", "size", "seconds")
+
+    def __init__(self):
+        self.files: int = 0
+        self.failed: int = 0
+        self.size: int = 0
+        self.seconds: float = 0.0
+
+    def __str__(self) -> str:
+        seconds: float = max(self.seconds, 1e-9)
+        megabytes: float = self.size / 1e6
+        return (f"{self.files} files ({self.failed} failed), {megabytes:.2f} MB in {self.seconds:.2f} s: "
+                f"{self.files / seconds:.1f} files/s, {megabytes / seconds:.2f} MB/s")
+
+
+def find_files(patterns: Iterable[str]) -> List[str]:
+    """
+    :param patterns: Glob patterns (`**` is recursive), directories or file names.
+    :return: The files in the order of the patterns, each pattern sorted. A name that matches nothing is kept
+        so that it is reported as an error.
+    """
+    filenames: List[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches: List[str] = glob.glob(os.path.join(pattern, "**", PATTERN), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True) or [pattern]
+        filenames.extend(sorted(match for match in matches if not os.path.isdir(match)))
+    # A file matched by many patterns is processed once.
+    return list(dict.fromkeys(filenames))
+
+
+def process_file(process: Callable[[str], object], filename: str) -> FileResult:
+    """
+    Calls process(filename) and collects what it prints.
+    """
+    try:
+        size: int = os.path.getsize(filename)
+    except OSError:
+        size = 0
+    output: io.StringIO = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            process(filename)
+    except SystemExit:
+        # The parser prints the syntax error before exiting.
+        printed: List[str] = output.getvalue().strip().splitlines()
+        return FileResult(filename, size, "", printed[-1] if printed else "exited")
+    except Exception as error:
+        return FileResult(filename, size, "", str(error) or type(error).__name__)
+    return FileResult(filename, size, output.getvalue())
+
+
+def iter_results(process: Callable[[str], object], filenames: List[str], jobs: Optional[int] = None,
+                 ordered: bool = True) -> Iterator[FileResult]:
+    """
+    Processes the files in worker processes.
+
+    :param process: A function that takes a file name, it has to be defined at the top level of a module.
+    :param jobs: The number of worker processes, by default one per CPU. With one the files are processed
+        in this process.
+    :param ordered: Give the results in the order of the files, otherwise as soon as each is done.
+    """
+    work: Callable[[str], FileResult] = functools.partial(process_file, process)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(filenames) < 2:
+        yield from map(work, filenames)
+        return
+    # Small files are sent in chunks so that the workers don't wait for the main process between files.
+    chunksize: int = max(1, min(32, len(filenames) // (jobs * 4)))
+    with multiprocessing.Pool(jobs) as pool:
+        results = pool.imap if ordered else pool.imap_unordered
+        yield from results(work, filenames, chunksize)
+
+
+def run_batch(process: Callable[[str], object], patterns: Iterable[str], jobs: Optional[int] = None,
+              ordered: bool = True, output: Optional[TextIO] = None, errors: Optional[TextIO] = None) -> Summary:
+    """
+    Processes the files, writes what was printed for each file after a `==> filename <==` line and
+    each line of the errors as `filename: error`.
+
+    :param patterns: See `find_files`.
+    :param jobs: See `iter_results`.
+    :param ordered: See `iter_results`.
+    :param output: Where the output of the files is written, stdout by default.
+    :param errors: Where the errors and the summary are written, stderr by default.
+    :return: The summary which is also written to errors.
+    """
+    output = output or sys.stdout
+    errors = errors or sys.stderr
+    summary: Summary = Summary()
+    start: float = time.perf_counter()
+    for result in iter_results(process, find_files(patterns), jobs=jobs, ordered=ordered):
+        summary.files += 1
+        summary.size += result.size
+        if result.error is not None:
+            summary.failed += 1
+            # The parser can report many errors in one file.
+            for line in result.error.splitlines():
+                errors.write(f"{result.filename}: {line}\n")
+        elif result.output:
+            output.write(f"==> {result.filename} <==\n")
+            output.write(result.output)
+    summary.seconds = time.perf_counter() - start
+    errors.write(f"{summary}\n")
+    return summary
@@ -428,4 +428,6 @@ parser: ply.yacc.LRParser = ply.yacc.yacc()
 
 
 def parse_data(data: str):
+    # The lexer is shared, so the line numbers would continue from the previous file in a batch.
+    sslexer.lexer.lineno = 1
     parser.parse(data, lexer=sslexer.lexer, debug=False)
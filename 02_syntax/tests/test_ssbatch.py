@@ -0,0 +1,30 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import ssbatch
+from main import parse_file
+
+
+class SSBatchTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.good = os.path.join(self.directory, "good.sheetscript")
+        self.bad = os.path.join(self.directory, "bad.sheetscript")
+        with open(self.good, "w", encoding="utf-8") as source:
+            source.write("scalar xx = 1.0\nprint_scalar xx\n")
+        with open(self.bad, "w", encoding="utf-8") as source:
+            source.write("scalar xx = 1.0\nxx := := 2.0\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_syntax_error_only_fails_the_file(self):
+        for jobs in (1, 2):
+            output, errors = io.StringIO(), io.StringIO()
+            summary = ssbatch.run_batch(parse_file, [self.directory], jobs=jobs, output=output, errors=errors)
+            self.assertEqual((summary.files, summary.failed), (2, 1))
+            self.assertIn(f"==> {self.good} <==\n", output.getvalue())
+            self.assertIn(f"{self.bad}: 2:Syntax Error (token:':=')\n", errors.getvalue())
@@ -0,0 +1,66 @@
+"""
+Measures how the parser tells the variables from the decimal literals in `atom`.
+
+Run from the phase directory with `python -m benchmarks.bench_atoms`.
+The grammar has own rules for `IDENT` and `DECIMAL_LITERAL` atoms, so PLY picks the rule from the token type.
+The first measurement does the same choice both ways for the token values alone: trying `decimal.Decimal` and
+catching `InvalidOperation` like the single rule did, and looking at the token type. The second one parses a
+program where the expressions are mostly variables. The best of a few rounds is reported.
+"""
+import decimal
+import time
+from typing import Callable, List
+
+import ply.lex
+
+import sslexer
+import ssparser
+from benchmarks.programs import generate_identifiers
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def by_exception(tokens: List[ply.lex.LexToken]) -> int:
+    decimals: int = 0
+    for token in tokens:
+        try:
+            decimal.Decimal(token.value)
+            decimals += 1
+        except decimal.InvalidOperation:
+            pass
+    return decimals
+
+
+def by_type(tokens: List[ply.lex.LexToken]) -> int:
+    decimals: int = 0
+    for token in tokens:
+        if token.type == "DECIMAL_LITERAL":
+            decimal.Decimal(token.value)
+            decimals += 1
+    return decimals
+
+
+def main():
+    program: str = generate_identifiers(statements=20000)
+    tokens: List[ply.lex.LexToken] = [token for token in sslexer.Lexer().tokenize(program)
+                                      if token.type in ("IDENT", "DECIMAL_LITERAL")]
+    exception: float = best(lambda: by_exception(tokens))
+    typed: float = best(lambda: by_type(tokens))
+    print(f"{len(tokens)} atoms, {by_type(tokens)} of them decimals")
+    print(f"  choose: by exception {len(tokens) / exception / 1e6:5.2f} M atoms/s, "
+          f"by token type {len(tokens) / typed / 1e6:5.2f} M atoms/s ({exception / typed:.1f}x)")
+    parse: float = best(lambda: ssparser.parse_data(program))
+    print(f"  parse:  {parse:6.3f} s, {len(tokens) / parse / 1e6:5.2f} M atoms/s")
+
+
+if __name__ == '__main__':
+    main()
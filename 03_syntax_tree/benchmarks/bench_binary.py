@@ -0,0 +1,38 @@
+"""
+Compares parsing to loading a tree saved with `ssbinary.dump`, which is memory-mapped and read without PLY.
+
+Run from the phase directory with `python -m benchmarks.bench_binary`.
+"""
+import os
+import tempfile
+import time
+
+import ssbinary
+import ssoptimizer
+import ssparser
+from benchmarks.programs import generate_functions, generate_program, generate_sheet
+
+
+def main():
+    programs = [("100 statements", generate_program(statements=100)),
+                ("20k statements", generate_program(statements=20000)),
+                ("1000 functions", generate_functions(functions=1000)),
+                ("100k cell sheet", generate_sheet(rows=100, columns=1000))]
+    with tempfile.TemporaryDirectory() as directory:
+        filename: str = os.path.join(directory, "program.ast")
+        for name, program in programs:
+            start: float = time.perf_counter()
+            tree = ssparser.parse_data(program)
+            parse: float = time.perf_counter() - start
+            ssbinary.dump(tree, filename)
+            start = time.perf_counter()
+            ssbinary.load(filename)
+            load: float = time.perf_counter() - start
+            size: int = os.path.getsize(filename)
+            count: int = ssoptimizer.count_nodes(tree)
+            print(f"{name:>15}: parse {parse * 1000:8.1f} ms, load {load * 1000:7.1f} ms, "
+                  f"{size / 1024:6.0f} KiB ({size / len(program):.1f}x the source, {size / count:4.1f} B/node)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Compares parsing to loading the tree from the parse cache, from memory and from a cache directory.
+
+Run from the phase directory with `python -m benchmarks.bench_cache`.
+"""
+import tempfile
+import time
+
+import sscache
+from benchmarks.programs import generate_functions, generate_program, generate_sheet
+
+
+def timed(parse) -> float:
+    start: float = time.perf_counter()
+    parse()
+    return time.perf_counter() - start
+
+
+def main():
+    programs = [("20k statements", generate_program(statements=20000)),
+                ("1000 functions", generate_functions(functions=1000)),
+                ("100k cell sheet", generate_sheet(rows=100, columns=1000))]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, program in programs:
+            cache = sscache.ParseCache(directory=directory)
+            parse: float = timed(lambda: cache.parse(program))
+            memory: float = timed(lambda: cache.parse(program))
+            cache.entries.clear()
+            disk: float = timed(lambda: cache.parse(program))
+            size: int = len(cache.entries[cache.key(program)])
+            print(f"{name:>15}: parse {parse:6.3f} s, memory hit {memory:6.3f} s, disk hit {disk:6.3f} s, "
+                  f"{size / 1024:7.0f} KiB stored, {cache}")
+
+
+if __name__ == '__main__':
+    main()
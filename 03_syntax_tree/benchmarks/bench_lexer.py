@@ -0,0 +1,44 @@
+"""
+Compares the tokens per second of the PLY lexer and `ssfastlexer`, and the parse time with each of them.
+
+Run from the phase directory with `python -m benchmarks.bench_lexer`.
+The best of a few rounds is reported since the other processes on the machine make single runs noisy.
+"""
+import time
+from typing import Callable, List
+
+import ssfastlexer
+import sslexer
+import ssparser
+from benchmarks.programs import generate_functions, generate_program, generate_sheet
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    programs = [("20k statements", generate_program(statements=20000)),
+                ("1000 functions", generate_functions(functions=1000)),
+                ("100k cell sheet", generate_sheet(rows=100, columns=1000))]
+    for name, program in programs:
+        count: int = len(sslexer.Lexer().tokenize(program))
+        ply_lex: float = best(lambda: sslexer.Lexer().tokenize(program))
+        fast_lex: float = best(lambda: ssfastlexer.FastLexer().tokenize(program))
+        ply_parse: float = best(lambda: ssparser.Parser(fast=False).parse(program))
+        fast_parse: float = best(lambda: ssparser.Parser(fast=True).parse(program))
+        print(f"{name:>15}: {count} tokens, {len(program) / 1e6:.1f} MB")
+        print(f"{'':>15}  tokenize: PLY {count / ply_lex / 1e6:5.2f} M tokens/s, "
+              f"fast {count / fast_lex / 1e6:5.2f} M tokens/s ({ply_lex / fast_lex:.1f}x)")
+        print(f"{'':>15}  parse:    PLY {ply_parse:6.2f} s, fast {fast_parse:6.2f} s ({ply_parse / fast_parse:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the memory used by the AST with __slots__ nodes to nodes that store attributes in __dict__.
+
+Run from the phase directory with `python -m benchmarks.bench_memory`.
+The __dict__ nodes are copies of the parsed tree made with a class like the original kwargs-driven Node.
+The copies share the values with the parsed tree, so the __slots__ figure also counts the values and is an upper bound.
+"""
+import tracemalloc
+from typing import Callable, Tuple
+
+import ssparser
+import sssyntax as nodes
+from benchmarks.programs import generate_program, generate_sheet
+
+
+class DictNode:
+    """
+    The node before __slots__, every attribute is stored in the instance __dict__.
+    """
+
+    def __init__(self, nodetype: str, **kwargs):
+        self.nodetype = nodetype
+        for attr, value in kwargs.items():
+            setattr(self, attr, value)
+
+
+def to_dict_node(node):
+    if isinstance(node, list):
+        return [to_dict_node(child) for child in node]
+    if not isinstance(node, nodes.Node):
+        return node
+    attributes = {name: to_dict_node(getattr(node, name)) for name in node.child_fields if hasattr(node, name)}
+    if hasattr(node, "value"):
+        attributes["value"] = node.value
+    return DictNode(node.nodetype, **attributes)
+
+
+def count_nodes(node) -> int:
+    if isinstance(node, list):
+        return sum(count_nodes(child) for child in node)
+    if not isinstance(node, nodes.Node):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, name)) for name in node.child_fields if hasattr(node, name))
+
+
+def measure(build: Callable[[], object]) -> Tuple[object, int]:
+    """
+    :return: The built object and the bytes still allocated after building it.
+    """
+    tracemalloc.start()
+    result = build()
+    allocated: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+def main():
+    for name, program in [("statements", generate_program(statements=20000)),
+                          ("sheet literal", generate_sheet(rows=2000, columns=10))]:
+        tree, slots_bytes = measure(lambda: ssparser.parse_data(program))
+        _, dict_bytes = measure(lambda: to_dict_node(tree))
+        count: int = count_nodes(tree)
+        print(f"{name:>13}: {count} nodes, __slots__ {slots_bytes / count:6.1f} B/node, "
+              f"__dict__ {dict_bytes / count:6.1f} B/node")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Parses many scripts with thread and process pools using the per-thread parser sessions.
+
+Run from the phase directory with `python -m benchmarks.bench_parallel`.
+The thread pool shows that parse_data can be called concurrently, but CPython's GIL keeps the parsing
+itself serial. The process pool shows the scaling that is possible when each worker has its own interpreter.
+"""
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+
+import ssparser
+from benchmarks.programs import generate_program
+
+SCRIPTS: int = 64
+STATEMENTS: int = 500
+
+
+def count_statements(data: str) -> int:
+    return len(ssparser.parse_data(data).children_statement_list)
+
+
+def run(executor: Executor, scripts: List[str]) -> float:
+    """
+    :return: Time taken to parse all scripts in seconds.
+    """
+    start: float = time.perf_counter()
+    results: List[int] = list(executor.map(count_statements, scripts))
+    elapsed: float = time.perf_counter() - start
+    assert results == [STATEMENTS] * len(scripts), "parse results differ"
+    return elapsed
+
+
+def main():
+    scripts: List[str] = [generate_program(STATEMENTS) for _ in range(SCRIPTS)]
+
+    start: float = time.perf_counter()
+    for script in scripts:
+        count_statements(script)
+    serial: float = time.perf_counter() - start
+    print(f"{'serial':>12}: {serial:6.2f} s")
+
+    workers: int = 1
+    while workers <= (os.cpu_count() or 1):
+        for name, pool in [("threads", ThreadPoolExecutor), ("processes", ProcessPoolExecutor)]:
+            with pool(max_workers=workers) as executor:
+                # Warm up so that process start and session creation are not measured.
+                list(executor.map(count_statements, scripts[:workers]))
+                elapsed: float = run(executor, scripts)
+            print(f"{name:>9} {workers:2}: {elapsed:6.2f} s, speed-up {serial / elapsed:4.1f}x")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
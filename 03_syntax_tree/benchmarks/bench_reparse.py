@@ -0,0 +1,48 @@
+"""
+Measures the latency of reparsing a large script after a small edit, like after a keystroke in an editor.
+
+Run from the phase directory with `python -m benchmarks.bench_reparse [functions]`.
+"""
+import sys
+import time
+from typing import Callable, List
+
+import ssincremental
+import ssparser
+from benchmarks.programs import generate_functions
+
+REPEATS: int = 20
+
+
+def latency(action: Callable[[], object]) -> float:
+    """
+    :return: The median time of the action in milliseconds.
+    """
+    times: List[float] = []
+    for _ in range(REPEATS):
+        start: float = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def main(functions: int):
+    source: str = generate_functions(functions)
+    tree: ssincremental.IncrementalTree = ssincremental.parse(source)
+    middle: int = source.index(f"Step{functions // 2}[")
+    edits = {
+        "function name": ssincremental.Edit(middle + 4, middle + 4, "0"),
+        "first variable": ssincremental.Edit(len("scalar counter = "), len("scalar counter = 0.0"), "1.5"),
+        "last statement": ssincremental.Edit(len(source) - 1, len(source), "\nprint_scalar 1.0\n"),
+    }
+
+    full: float = latency(lambda: ssparser.parse_data(source))
+    print(f"{len(source) / 1024:.0f} kB, {functions} functions, full parse {full:8.2f} ms")
+    for name, edit in edits.items():
+        elapsed: float = latency(lambda: ssincremental.reparse(tree, [edit]))
+        lexed: int = ssincremental.reparse(tree, [edit]).lexed
+        print(f"{name:>15}: reparse {elapsed:8.2f} ms, {full / elapsed:6.1f}x faster, {lexed} characters tokenized")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,32 @@
+"""
+Measures how the parse time grows with the amount of statements, from 1k to 1M statements.
+
+Run from the phase directory with `python -m benchmarks.bench_scaling [largest]`.
+The lists of the grammar are left-recursive, so the time per statement should stay about the same.
+With the earlier right-recursive rules every statement copied the rest of the list and the time per
+statement grew with the length of the program.
+"""
+import gc
+import sys
+import time
+
+import ssparser
+from benchmarks.programs import generate_program
+
+SIZES = (1000, 10000, 100000, 1000000)
+
+
+def main(largest: int):
+    session: ssparser.Parser = ssparser.get_session()
+    for statements in (size for size in SIZES if size <= largest):
+        program: str = generate_program(statements)
+        start: float = time.perf_counter()
+        tree = session.parse(program)
+        elapsed: float = time.perf_counter() - start
+        print(f"{statements:>8} statements: {elapsed:7.2f} s, {elapsed / statements * 1e6:5.1f} us/statement")
+        del tree
+        gc.collect()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1])
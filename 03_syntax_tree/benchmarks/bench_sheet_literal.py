@@ -0,0 +1,40 @@
+"""
+Parses sheet literals from 10k to 1M cells and reports the time and the memory of the tree per cell.
+
+Run from the phase directory with `python -m benchmarks.bench_sheet_literal [largest]`.
+The literal cells are stored in the number arrays of the rows, so both should stay about the same per cell.
+The memory is measured in a separate parse since tracemalloc slows the parsing down.
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+import ssparser
+from benchmarks.programs import generate_sheet
+
+COLUMNS = 1000
+SIZES = (10000, 100000, 1000000)
+
+
+def main(largest: int):
+    session: ssparser.Parser = ssparser.get_session()
+    for cells in (size for size in SIZES if size <= largest):
+        program: str = generate_sheet(rows=cells // COLUMNS, columns=COLUMNS)
+        start: float = time.perf_counter()
+        session.parse(program)
+        elapsed: float = time.perf_counter() - start
+        gc.collect()
+
+        tracemalloc.start()
+        tree = session.parse(program)
+        allocated: int = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tree
+        gc.collect()
+        print(f"{cells:>8} cells: {elapsed:6.2f} s, {elapsed / cells * 1e6:5.2f} us/cell, "
+              f"{allocated / cells:5.1f} B/cell")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1])
@@ -0,0 +1,51 @@
+"""
+Measures the import time of the parser with and without the table cache.
+
+Run from the phase directory with `python -m benchmarks.bench_startup`.
+Each import is done in a fresh interpreter because the tables are built when the module is imported.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROUNDS: int = 20
+
+
+def time_import(cache: bool, rounds: int = ROUNDS) -> List[float]:
+    """
+    Imports ssparser in a subprocess for given times.
+
+    :param cache: Whether the table cache is enabled.
+    :param rounds: How many times to import.
+    :return: Wall times of the subprocesses in seconds.
+    """
+    env: Dict[str, str] = dict(os.environ, SHEETSCRIPT_TABLE_CACHE="1" if cache else "0")
+    times: List[float] = []
+    for _ in range(rounds):
+        start: float = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import ssparser"], env=env, check=True, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    # Python startup itself is measured as a baseline so that the difference is visible.
+    empty: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        empty.append(time.perf_counter() - start)
+
+    # The first cached run writes the tables, it is not measured.
+    time_import(cache=True, rounds=1)
+    for name, times in [("python only", empty),
+                        ("without cache", time_import(cache=False)),
+                        ("with cache", time_import(cache=True))]:
+        print(f"{name:>14}: median {statistics.median(times) * 1000:7.1f} ms, min {min(times) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures what interning the names saves: the memory of the name strings and the cost of looking up names.
+
+Run from the phase directory with `python -m benchmarks.bench_symbols`.
+Without interning every name token has its own string, so the strings are counted once per name node for it.
+The lookups resolve every name node like the interpreter does, once through nested dicts keyed by the name and
+once through a list indexed by the symbol id. The best of a few rounds is reported.
+"""
+import sys
+import time
+from typing import Callable, Dict, List
+
+import ssoptimizer
+import ssparser
+import sssyntax as nodes
+from benchmarks.programs import generate_functions, generate_program
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def lookup_by_name(names: List[nodes.Node], scopes: List[Dict[str, int]]) -> int:
+    found: int = 0
+    for name in names:
+        for scope in scopes:
+            slot = scope.get(name.value)
+            if slot is not None:
+                found += slot
+                break
+    return found
+
+
+def lookup_by_symbol(names: List[nodes.Node], slots: List[int]) -> int:
+    found: int = 0
+    for name in names:
+        found += slots[name.symbol]
+    return found
+
+
+def main():
+    for title, program in [("20k statements", generate_program(statements=20000)),
+                           ("1000 functions", generate_functions(functions=1000))]:
+        tree: nodes.Node = ssparser.parse_data(program)
+        names: List[nodes.Node] = [node for node, _ in ssoptimizer.walk(tree) if hasattr(node, "symbol")]
+        lexed: int = sum(sys.getsizeof(name.value) for name in names)
+        interned: int = sum(sys.getsizeof(name) for name in tree.symbols.names)
+        # A local scope in front of the global one like inside a function.
+        scopes: List[Dict[str, int]] = [{}, {name: slot for slot, name in enumerate(tree.symbols.names)}]
+        slots: List[int] = list(range(len(tree.symbols)))
+        by_name: float = best(lambda: lookup_by_name(names, scopes))
+        by_symbol: float = best(lambda: lookup_by_symbol(names, slots))
+        print(f"{title:>15}: {len(names)} names, {len(tree.symbols)} distinct")
+        print(f"{'':>15}  strings: {lexed / 1e3:8.1f} kB as lexed, {interned / 1e3:8.1f} kB interned")
+        print(f"{'':>15}  lookups: by name {len(names) / by_name / 1e6:5.2f} M/s, "
+              f"by symbol {len(names) / by_symbol / 1e6:5.2f} M/s ({by_name / by_symbol:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
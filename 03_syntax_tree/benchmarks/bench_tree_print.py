@@ -0,0 +1,32 @@
+"""
+Prints the tree of a 100k-statement program and of a deep expression in every output type.
+
+Run from the phase directory with `python -m benchmarks.bench_tree_print [statements]`.
+The output goes to os.devnull through a normal buffered file so that the cost of the writes is included.
+"""
+import os
+import sys
+import time
+
+import ssparser
+import tree_print
+from benchmarks.programs import generate_program
+
+# The indented output of a deep tree grows with the square of the depth.
+DEPTH = 5000
+
+
+def main(statements: int):
+    tree = ssparser.parse_data(generate_program(statements))
+    deep = ssparser.parse_data("print_scalar " + " + ".join(["counter"] * DEPTH))
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for name, root in [(f"{statements} statements", tree), (f"{DEPTH} deep", deep)]:
+            for outtype in ("unicode", "ascii", "dot"):
+                start: float = time.perf_counter()
+                tree_print.treeprint(root, outtype, file=devnull)
+                elapsed: float = time.perf_counter() - start
+                print(f"{name:>18} {outtype:>7}: {elapsed:6.2f} s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,89 @@
+"""
+Generated SheetScript programs for the benchmarks.
+"""
+from typing import List
+
+
+def generate_program(statements: int) -> str:
+    """
+    Generates a valid program with some definitions and the given amount of statements.
+    The statements are a mix of assignments, prints and control structures.
+
+    :param statements: The amount of top level statements.
+    :return: The source code.
+    """
+    lines: List[str] = [
+        "scalar counter = 0.0",
+        "scalar total = 1.0 + 2.0 * 3.0",
+        "range _cells = range SH'A1..SH'B2",
+        "sheet SH = 10 * 10",
+        "function Twice[value : scalar] return scalar is",
+        "  return value * 2.0",
+        "end",
+    ]
+    for i in range(statements):
+        kind: int = i % 4
+        if kind == 0:
+            lines.append(f"counter := counter + {i % 10}.5")
+        elif kind == 1:
+            lines.append("print_scalar !total! total * Twice[counter] - 1.0")
+        elif kind == 2:
+            lines.append("if counter > total then SH'A1 := counter else total := total / 2.0 endif")
+        else:
+            lines.append("while counter < 10.0 do counter := counter + 1.0 done")
+    return "\n".join(lines) + "\n"
+
+
+def generate_identifiers(statements: int) -> str:
+    """
+    Generates a program whose expressions are mostly variable references.
+
+    :param statements: The amount of assignments, each refers to six variables.
+    :return: The source code.
+    """
+    names: List[str] = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta"]
+    lines: List[str] = [f"scalar {name} = 1.0" for name in names]
+    for i in range(statements):
+        target: str = names[i % len(names)]
+        lines.append(f"{target} := alpha + beta * gamma - delta / epsilon + zeta")
+    return "\n".join(lines) + "\n"
+
+
+def generate_sheet(rows: int, columns: int) -> str:
+    """
+    Generates a program with a single sheet literal and a print statement.
+
+    :param rows: The amount of rows in the sheet initializer.
+    :param columns: The amount of decimal literals on each row.
+    :return: The source code.
+    """
+    lines: List[str] = ["sheet SH = {"]
+    for row in range(rows):
+        lines.append(", ".join(f"{row % 100}.{column % 10}" for column in range(columns)))
+    lines.append("}")
+    lines.append("print_sheet SH")
+    return "\n".join(lines) + "\n"
+
+
+def generate_functions(functions: int, statements: int = 10) -> str:
+    """
+    Generates a program with many function and subroutine definitions like a large script in an editor.
+
+    :param functions: The amount of function definitions, every other is a subroutine.
+    :param statements: The amount of statements in each definition.
+    :return: The source code.
+    """
+    lines: List[str] = ["scalar counter = 0.0", "sheet SH = 10 * 10"]
+    for i in range(functions):
+        if i % 2:
+            lines.append(f"subroutine Show{i}[value : scalar] is")
+            lines.append("  scalar shown = value")
+        else:
+            lines.append(f"function Step{i}[value : scalar] return scalar is")
+        for j in range(statements):
+            lines.append(f"  if value > {j}.0 then counter := counter + value * {j % 10}.5 endif")
+        lines.append("  print_scalar shown" if i % 2 else "  return value + 1.0")
+        lines.append("end")
+    lines.append("counter := Step0[counter]")
+    lines.append("print_scalar counter")
+    return "\n".join(lines) + "\n"
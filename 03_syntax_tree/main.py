@@ -1,5 +1,13 @@
 import codecs
+import functools
+import os
+import sys
+from typing import Optional
 
+import ssbatch
+import ssbinary
+import sscache
+import ssoptimizer
 import ssparser
 import tree_print
 
@@ -9,9 +17,22 @@ def read_file(filename: str):
         return INFILE.read()
 
 
-def parse_file(filename: str):
-    file_data: str = read_file(filename=filename)
-    tree_root = ssparser.parse_data(data=file_data)
+def parse_file(filename: str, fold: bool = False, cache: Optional[sscache.ParseCache] = None,
+               save: Optional[str] = None):
+    if ssbinary.is_binary(filename):
+        # Saved with --save
+        tree_root = ssbinary.load(filename)
+    elif cache is not None:
+        tree_root = cache.parse(read_file(filename))
+    else:
+        with codecs.open(filename, 'r', encoding='utf-8') as INFILE:
+            tree_root = ssparser.parse_stream(source=INFILE)
+    if fold:
+        reduction: ssoptimizer.Reduction = ssoptimizer.fold_constants(tree_root)
+        print(f"Constant folding: {reduction}", file=sys.stderr)
+    if save is not None:
+        ssbinary.dump(tree_root, save)
+        return
     tree_print.treeprint(tree_root, "unicode")
 
 
@@ -28,11 +49,31 @@ if __name__ == '__main__':
     group = parser.add_mutually_exclusive_group()
     group.add_argument('--who', action='store_true', help='who wrote this')
     group.add_argument('-f', '--file', help='filename to process')
+    group.add_argument('-b', '--batch', nargs='+', metavar='PATTERN',
+                       help='process the files matching the glob patterns or in the directories')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes for --batch')
+    parser.add_argument('--unordered', action='store_true', help='write the results of --batch as they are done')
+    parser.add_argument('--fold', action='store_true', help='fold constant expressions before printing')
+    parser.add_argument('--cache-dir', help='keep the parsed trees in this directory and reuse them')
+    parser.add_argument('--save', metavar='FILE', help='write the tree in binary to FILE instead of printing it')
 
     ns = parser.parse_args()
     if ns.who:
         print('424562 Chi-Hao Lay')
+    elif ns.batch is not None:
+        # The workers have their own caches in memory, only the directory is shared.
+        cache = None if ns.cache_dir is None else sscache.ParseCache(directory=ns.cache_dir)
+        ssbatch.run_batch(functools.partial(parse_file, fold=ns.fold, cache=cache), ns.batch,
+                          jobs=ns.jobs, ordered=not ns.unordered)
     elif ns.file is None:
         parser.print_help()
     else:
-        parse_file(filename=ns.file)
+        cache = None if ns.cache_dir is None else sscache.ParseCache(directory=ns.cache_dir)
+        try:
+            parse_file(filename=ns.file, fold=ns.fold, cache=cache, save=ns.save)
+        except ssparser.ParseError as error:
+            # Every error of the file, one per line.
+            print(error, file=sys.stderr)
+            raise SystemExit(1)
+        if cache is not None:
+            print(f"Parse cache: {cache}", file=sys.stderr)
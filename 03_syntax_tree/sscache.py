@@ -0,0 +1,130 @@
+"""
+Cache for parsed syntax trees keyed by the hash of the source.
+
+Batch jobs parse the same files again and again, with the cache the tokenizing and parsing is done once.
+The trees are stored in the format of `ssbinary`, in memory in a LRU with a limited number of entries and
+optionally on disk as `<directory>/<grammar key>/<source key>.ast` so that other processes and later runs can
+use them. A new tree is loaded for every hit since the trees are changed in place, e.g. by constant folding.
+
+The grammar key is a hash of the lexer, parser, node and format modules, so any change to them leaves the old
+entries unused. Unlike the PLY tables the rule functions can build the nodes differently without changing
+their docstrings, which is why the whole modules are hashed.
+"""
+import collections
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+import ply
+
+import ssbinary
+import sslexer
+import ssparser
+import sssyntax as nodes
+
+# Increase this if the layout of the cache changes so that old entries are not loaded.
+CACHE_VERSION: int = 1
+
+_grammar_key: Optional[str] = None
+
+
+def grammar_key() -> str:
+    """
+    :return: A short hex digest of the modules that decide the tree of a source.
+    """
+    global _grammar_key
+    if _grammar_key is None:
+        digest = hashlib.sha1(f"{CACHE_VERSION} {ply.__version__}".encode("utf-8"))
+        for module in (sslexer, ssparser, nodes, ssbinary):
+            with open(module.__file__, "rb") as source:
+                digest.update(source.read())
+        _grammar_key = digest.hexdigest()[:16]
+    return _grammar_key
+
+
+class ParseCache:
+    """
+    Parse results in memory and optionally on disk, with counters for the hits and misses.
+    """
+
+    def __init__(self, size: int = 128, directory: Optional[str] = None):
+        """
+        :param size: The number of trees kept in memory.
+        :param directory: The cache directory, None keeps the trees only in memory.
+        """
+        self.size: int = size
+        self.directory: Optional[str] = directory
+        self.grammar: str = grammar_key()
+        self.entries: "collections.OrderedDict[str, bytes]" = collections.OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __str__(self) -> str:
+        total: int = self.hits + self.misses
+        rate: float = 100 * self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
+
+    def key(self, data: str) -> str:
+        return hashlib.sha1(f"{self.grammar}\n{data}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, self.grammar, f"{key}.ast")
+
+    def parse(self, data: str) -> nodes.Node:
+        """
+        Returns the root of the abstract syntax tree, from the cache if the same source was parsed before.
+
+        :param data: The source code.
+        """
+        key: str = self.key(data)
+        stored: Optional[bytes] = self.load(key)
+        if stored is not None:
+            try:
+                tree: nodes.Node = ssbinary.loads(stored)
+                self.hits += 1
+                return tree
+            except ssbinary.FormatError:
+                # A broken file on disk, it is replaced below.
+                pass
+        self.misses += 1
+        tree = ssparser.parse_data(data)
+        self.store(key, ssbinary.dumps(tree))
+        return tree
+
+    def load(self, key: str) -> Optional[bytes]:
+        stored: Optional[bytes] = self.entries.get(key)
+        if stored is not None:
+            self.entries.move_to_end(key)
+            return stored
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), "rb") as entry:
+                stored = entry.read()
+        except OSError:
+            return None
+        self.remember(key, stored)
+        return stored
+
+    def store(self, key: str, stored: bytes):
+        self.remember(key, stored)
+        if self.directory is None:
+            return
+        path: str = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written to a temporary file first so that other processes never read a partial entry.
+            handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(handle, "wb") as entry:
+                entry.write(stored)
+            os.replace(temporary, path)
+        except OSError:
+            # A read-only or full disk only makes the cache slower.
+            pass
+
+    def remember(self, key: str, stored: bytes):
+        self.entries[key] = stored
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
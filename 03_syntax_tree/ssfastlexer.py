@@ -0,0 +1,183 @@
+"""
+Faster lexer backend that gives the same tokens as the PLY lexer in `sslexer`.
+
+PLY matches its master regular expression at every position in a Python loop and calls the token functions
+(`t_IDENT`, `t_newline` and so on) for each match. Here the same master regular expression is run with
+`finditer`, so the search for the next token is done by the regex engine, and the token functions are
+inlined: the keywords are looked up from a dict, the info strings are sliced and the newlines only increase
+the line number. The characters skipped by `finditer` between two tokens must be ignored characters,
+anything else is an illegal character which is handled like `sslexer.t_error` does.
+
+The regular expression is taken from the PLY lexer, so the rules are defined only once in `sslexer` and the
+same alternative wins as in PLY.
+"""
+import functools
+import re
+import sys
+from typing import Iterator, List, Optional, Pattern, Tuple
+
+import ply.lex
+
+import sslexer
+
+# What is done for a matched group.
+TOKEN = 0
+INFO_STRING = 1
+IDENT = 2
+NEWLINE = 3
+IGNORE = 4
+
+LexToken = ply.lex.LexToken
+
+
+def _actions(lexer: ply.lex.Lexer) -> List[Tuple[int, Optional[str]]]:
+    """
+    :return: The action and the token type for each group index of the master regular expression.
+    """
+    special = {"INFO_STRING": INFO_STRING, "IDENT": IDENT, "newline": NEWLINE}
+    actions: List[Tuple[int, Optional[str]]] = []
+    for entry in lexer.lexre[0][1]:
+        if entry is None:
+            # Not a token group, e.g. a group inside a rule.
+            actions.append((IGNORE, None))
+        elif entry[1] is None:
+            # t_ignore_ rule
+            actions.append((IGNORE, None))
+        else:
+            actions.append((special.get(entry[1], TOKEN), entry[1]))
+    return actions
+
+
+if len(sslexer.lexer.lexre) != 1:
+    # PLY splits the expression if it has more than 100 groups.
+    raise ImportError("The fast lexer needs the PLY master regular expression in one part")
+IGNORED: str = sslexer.t_ignore
+
+
+def _master(possessive: bool) -> Tuple[Pattern, List[Tuple[int, Optional[str]]]]:
+    """
+    The ignored characters before a token are matched with it, otherwise finditer would try every alternative
+    at each of them. They are matched atomically so that the spaces before an illegal character are not tried
+    again one by one: with a possessive quantifier, or before Python 3.11 which doesn't have them, with a
+    lookahead and its backreference. The lookahead adds a group before the groups of PLY.
+
+    :return: The master regular expression and the action of each of its groups.
+    """
+    ply_master: Pattern = sslexer.lexer.lexre[0][0]
+    ignored: str = f"[{re.escape(IGNORED)}]"
+    gap: str = f"{ignored}*+" if possessive else f"(?=({ignored}*))\\1"
+    master: Pattern = re.compile(f"{gap}(?:{ply_master.pattern})", ply_master.flags)
+    actions: List[Tuple[int, Optional[str]]] = _actions(sslexer.lexer)
+    return master, actions[:1] + [(IGNORE, None)] * (master.groups - ply_master.groups) + actions[1:]
+
+
+MASTER, ACTIONS = _master(sys.version_info >= (3, 11))
+IGNORED_GAP = re.compile(f"[{re.escape(IGNORED)}]*")
+
+
+def scan(data: str, start: int, end: int, lineno: int, offset: int = 0,
+         errors: Optional[List[sslexer.SourceError]] = None,
+         state: Optional[ply.lex.Lexer] = None) -> Iterator[LexToken]:
+    """
+    Tokenizes data[start:end] like PLY would.
+
+    :param lineno: The line number at start.
+    :param offset: Added to `lexpos` of the tokens, the position of data in the whole source.
+    :param errors: The illegal characters are added here and skipped, None raises an Exception.
+    :param state: A PLY lexer whose `lineno` and `lexpos` are set at the end.
+    :return: Generator of LexToken instances, the last value of the generator is the line number at the end.
+    """
+    actions: List[Tuple[int, Optional[str]]] = ACTIONS
+    reserved = sslexer.reserved
+    position: int = start
+    for match in MASTER.finditer(data, start, end):
+        if match.start() != position:
+            # finditer skipped something that is not a token.
+            _skipped(data, position, match.start(), lineno, errors)
+        position = match.end()
+        index: int = match.lastindex
+        action, token_type = actions[index]
+        if action == NEWLINE:
+            lineno += 1
+            continue
+        if action == IGNORE:
+            continue
+        token = LexToken()
+        value: str = match.group(index)
+        token_start: int = position - len(value)
+        if action == IDENT:
+            token.type = reserved.get(value, "IDENT")
+        else:
+            token.type = token_type
+            if action == INFO_STRING:
+                value = value[1:-1]
+        token.value = value
+        token.lineno = lineno
+        token.lexpos = token_start + offset
+        yield token
+    if position != end:
+        _skipped(data, position, end, lineno, errors)
+    if state is not None:
+        state.lineno = lineno
+        state.lexpos = end
+    return lineno
+
+
+def _skipped(data: str, start: int, end: int, lineno: int, errors: Optional[List[sslexer.SourceError]]):
+    """
+    Checks the characters that finditer skipped, only ignored characters are allowed.
+    None of them is a newline since the newlines are matched, so the line number is the same for all.
+    """
+    for position in range(start, end):
+        character: str = data[position]
+        if character in IGNORED:
+            continue
+        if errors is None:
+            raise Exception(f"Illegal character '{character}' at line {lineno}")
+        errors.append(sslexer.SourceError(f"Illegal character '{character}'", lineno,
+                                          sslexer.find_column(data, position)))
+
+
+class FastLexer(sslexer.Lexer):
+    """
+    A lexer session like `sslexer.Lexer` that tokenizes with `scan`.
+
+    The PLY lexer of the session is only used to keep the data and the line number, so the parser and the
+    error messages see the same state as with PLY. Its line number is updated when the input ends.
+    """
+
+    def __init__(self, recover: bool = False):
+        super().__init__(recover)
+        self.recover: bool = recover
+
+    def _scan(self, data: str, start: int, end: int, lineno: int) -> Iterator[LexToken]:
+        self.lexer.lexdata = data
+        self.lexer.lexpos = start
+        self.lexer.lexlen = end
+        self.lexer.lineno = lineno
+        return scan(data, start, end, lineno, self.offset, self.errors if self.recover else None, self.lexer)
+
+    def input(self, data: str):
+        self.reset()
+        # PLY calls this for every token, so it is the C function next without a method in between.
+        self.token = functools.partial(next, self._scan(data, 0, len(data), 1), None)
+
+    def token(self) -> Optional[LexToken]:
+        # Replaced in input.
+        return None
+
+    def tokenize(self, data: str) -> List[LexToken]:
+        self.reset()
+        return list(self._scan(data, 0, len(data), 1))
+
+    def tokenize_region(self, data: str, start: int, end: int, lineno: int) -> List[LexToken]:
+        self.reset(lineno)
+        return list(self._scan(data, start, end, lineno))
+
+    def iter_tokens(self, source: sslexer.Source) -> Iterator[LexToken]:
+        self.reset()
+        lineno: int = 1
+        for chunk in sslexer.read_chunks(source):
+            yield from self._scan(chunk, 0, len(chunk), lineno)
+            lineno = self.lexer.lineno
+            self.offset += len(chunk)
@@ -0,0 +1,214 @@
+"""
+Incremental parsing for editors that reparse the source after every change.
+
+The source is split to segments at the top level: every function and subroutine definition is a segment from
+`function`/`subroutine` to its `end`, and the text between them is a segment of variable definitions. The last
+segment has the statements. After an edit only the segments that the edit touches are tokenized and parsed
+again, the nodes of the other segments are reused as they are and only their positions are moved.
+
+The line numbers of the tokens are kept correct, the region is tokenized in place starting from its line.
+The names of the new segments are interned to a copy of the old symbol table, so the reused nodes keep their ids.
+"""
+from typing import List, Optional, Tuple
+
+import ply.lex
+
+import ssparser
+import sssyntax as nodes
+
+BLOCK_START = ("FUNCTION", "SUBROUTINE")
+BLOCK_END = "END"
+
+
+class Edit:
+    """
+    Replaces source[start:end] with text, the offsets are in the source before any of the edits.
+    """
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start: int, end: int, text: str):
+        self.start: int = start
+        self.end: int = end
+        self.text: str = text
+
+
+class Segment:
+    """
+    A part of the source and the top-level nodes parsed from it.
+    """
+    __slots__ = ("start", "end", "line", "definitions", "statements", "located")
+
+    def __init__(self, start: int, end: int, line: int, definitions: List[nodes.Node],
+                 statements: Optional[List[nodes.Node]] = None, located: Optional[List[nodes.Node]] = None):
+        self.start: int = start
+        self.end: int = end
+        # The line number at start.
+        self.line: int = line
+        self.definitions: List[nodes.Node] = definitions
+        # Only the last segment has statements.
+        self.statements: Optional[List[nodes.Node]] = statements
+        # The nodes with a span, collected once so that moving the segment does not walk the nodes.
+        self.located: List[nodes.Node] = located_nodes(definitions + (statements or [])) if located is None \
+            else located
+
+    def moved(self, offset: int, lines: int) -> "Segment":
+        """
+        :return: The segment at its place after an edit before it. The nodes are reused, their spans are moved.
+        """
+        if offset:
+            for node in self.located:
+                node.lexpos += offset
+                node.lexend += offset
+        return Segment(self.start + offset, self.end + offset, self.line + lines, self.definitions, self.statements,
+                       self.located)
+
+
+def located_nodes(roots: List[nodes.Node]) -> List[nodes.Node]:
+    """
+    :return: The nodes that have a span from the roots and all their descendants.
+    """
+    found: List[nodes.Node] = []
+    stack: List[nodes.Node] = list(roots)
+    while stack:
+        node: nodes.Node = stack.pop()
+        if hasattr(node, "lexpos"):
+            found.append(node)
+        for field in node.child_fields:
+            child = getattr(node, field, None)
+            if isinstance(child, list):
+                stack.extend(item for item in child if isinstance(item, nodes.Node))
+            elif isinstance(child, nodes.Node):
+                stack.append(child)
+    return found
+
+
+class IncrementalTree:
+    """
+    The syntax tree of a source with the segments needed to reparse it.
+    """
+    __slots__ = ("source", "segments", "program", "lexed")
+
+    def __init__(self, source: str, segments: List[Segment], lexed: int, symbols: nodes.SymbolTable):
+        self.source: str = source
+        self.segments: List[Segment] = segments
+        # The amount of characters that were tokenized to build this tree.
+        self.lexed: int = lexed
+        definitions: List[nodes.Node] = [node for segment in segments for node in segment.definitions]
+        statements: List[nodes.Node] = segments[-1].statements
+        if definitions:
+            self.program: nodes.Node = nodes.Program(children_function_or_variable_definition=definitions,
+                                                     children_statement_list=statements)
+        else:
+            self.program = nodes.Program(children_statement_list=statements)
+        self.program.symbols = symbols
+        # The span of the program is from its first to its last top-level node like in `ssparser.located`.
+        first: Optional[Tuple[int, int]] = nodes.span((definitions or statements)[0])
+        last: Optional[Tuple[int, int]] = nodes.span(statements[-1])
+        if first is not None and last is not None:
+            self.program.lexpos = first[0]
+            self.program.lexend = last[1]
+
+
+def apply_edits(source: str, edits: List[Edit]) -> str:
+    """
+    :param edits: Edits that don't overlap.
+    :return: The edited source.
+    """
+    # From the last edit to the first so that the offsets of the earlier edits stay valid.
+    for edit in sorted(edits, key=lambda edit: edit.start, reverse=True):
+        source = source[:edit.start] + edit.text + source[edit.end:]
+    return source
+
+
+def parse_region(source: str, start: int, end: int, line: int,
+                 symbols: nodes.SymbolTable) -> Optional[List[Segment]]:
+    """
+    Tokenizes and parses source[start:end] to segments. The region has to start at the top level.
+
+    :param line: The line number at start.
+    :param symbols: The symbol table of the whole source where the names are interned.
+    :return: The segments or None if a function or subroutine continues after the end of the region.
+    """
+    session: ssparser.Parser = ssparser.get_session()
+    tokens: List[ply.lex.LexToken] = session.lexer.tokenize_region(source, start, end, line)
+    last: bool = end == len(source)
+
+    # Split the tokens to (start, end, line, tokens, is block).
+    parts: List[Tuple[int, int, int, List[ply.lex.LexToken], bool]] = []
+    gap_start, gap_line, gap_index = start, line, 0
+    block: Optional[int] = None
+    for index, token in enumerate(tokens):
+        if block is None and token.type in BLOCK_START:
+            parts.append((gap_start, token.lexpos, gap_line, tokens[gap_index:index], False))
+            block = index
+        elif block is not None and token.type == BLOCK_END:
+            gap_start, gap_line, gap_index = token.lexpos + len(token.value), token.lineno, index + 1
+            parts.append((tokens[block].lexpos, gap_start, tokens[block].lineno, tokens[block:gap_index], True))
+            block = None
+    if block is not None and not last:
+        return None
+    if block is not None:
+        # An unfinished definition at the end, parsed with the rest so that the parser reports the error.
+        gap_start, gap_line, gap_index = tokens[block].lexpos, tokens[block].lineno, block
+    parts.append((gap_start, end, gap_line, tokens[gap_index:], False))
+
+    segments: List[Segment] = []
+    for index, (part_start, part_end, part_line, part_tokens, is_block) in enumerate(parts):
+        if last and index == len(parts) - 1:
+            # The statements are at the end of the source.
+            program: nodes.Node = session.parse_tokens(part_tokens, symbols=symbols)
+            segments.append(Segment(part_start, part_end, part_line,
+                                    getattr(program, "children_function_or_variable_definition", []),
+                                    program.children_statement_list))
+        elif part_tokens:
+            segments.append(Segment(part_start, part_end, part_line,
+                                    session.parse_tokens(part_tokens, definitions=True, symbols=symbols)))
+        else:
+            segments.append(Segment(part_start, part_end, part_line, []))
+    return segments
+
+
+def parse(source: str) -> IncrementalTree:
+    """
+    Parses the whole source.
+
+    :param source: The source code.
+    """
+    symbols: nodes.SymbolTable = nodes.SymbolTable()
+    return IncrementalTree(source, parse_region(source, 0, len(source), 1, symbols), len(source), symbols)
+
+
+def reparse(old_tree: IncrementalTree, edits: List[Edit]) -> IncrementalTree:
+    """
+    Parses the edited source reusing the nodes of the segments that the edits don't touch.
+    A segment is touched if an edit is inside it or at either end of it.
+
+    :param old_tree: The tree from `parse` or an earlier `reparse`.
+    :param edits: Edits with offsets in the old source.
+    :return: The tree of the edited source. The old tree shares the reused nodes, so its spans are not valid
+        after this, the source and segments of the old tree are not changed.
+    """
+    if not edits:
+        return old_tree
+    old_source: str = old_tree.source
+    source: str = apply_edits(old_source, edits)
+    low: int = min(edit.start for edit in edits)
+    high: int = max(edit.end for edit in edits)
+    offset: int = len(source) - len(old_source)
+    lines: int = source.count("\n", low, high + offset) - old_source.count("\n", low, high)
+
+    segments: List[Segment] = old_tree.segments
+    first: int = next(index for index, segment in enumerate(segments) if segment.end >= low)
+    last: int = max(index for index, segment in enumerate(segments) if segment.start <= high)
+    # Copied so that the names of the new segments are not added to the table of the old tree.
+    symbols: nodes.SymbolTable = nodes.SymbolTable(old_tree.program.symbols.names)
+    while True:
+        region: Optional[List[Segment]] = parse_region(source, segments[first].start, segments[last].end + offset,
+                                                       segments[first].line, symbols)
+        if region is not None:
+            break
+        # A definition lost its end, so it continues to the next segment.
+        last += 1
+    lexed: int = segments[last].end + offset - segments[first].start
+    return IncrementalTree(source, segments[:first] + region
+                           + [segment.moved(offset, lines) for segment in segments[last + 1:]], lexed, symbols)
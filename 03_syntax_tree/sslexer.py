@@ -6,10 +6,17 @@ Actual lexer implementation for SheetScript.
 to improve flexibility and readability.
 """
 
-from typing import Dict, List
+import array
+import bisect
+import mmap
+import re
+import threading
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
 
 import ply.lex
 
+import sstables
+
 # Reserved keywords, recommended to not declared as token by docs 4.3..
 # The docs showed an example of using dict but it might be simpler to just use list and map it if necessary.
 # I have preserved the order given in the instructions in case the order matter later.
@@ -132,6 +139,62 @@ t_RANGE_IDENT: str = r"_[0-9A-Za-z_]+"  # just like IDENT but starts with unders
 t_SHEET_IDENT: str = r"[A-Z]+"  # capital letter only text
 t_FUNC_IDENT: str = r"[A-Z]{1}[0-9a-z_]+"
 
+class SourceError:
+    """
+    A lexical or syntax error in the source code.
+    """
+    __slots__ = ("message", "line", "column")
+
+    def __init__(self, message: str, line: int, column: int):
+        self.message: str = message
+        self.line: int = line
+        # Starts from 1 like the line.
+        self.column: int = column
+
+    def __repr__(self) -> str:
+        return f"SourceError({self.message!r}, {self.line}, {self.column})"
+
+    def __str__(self) -> str:
+        return f"{self.line}:{self.column}: {self.message}"
+
+
+def find_column(data: str, lexpos: int) -> int:
+    """
+    :return: The column of the position in data starting from 1.
+    """
+    return lexpos - data.rfind("\n", 0, lexpos)
+
+
+class LineIndex:
+    """
+    The start positions of the lines of a source for finding the line and column of a position, e.g. the
+    `lexpos` of a token or a node. The index is built on the first lookup, so it costs nothing while
+    tokenizing and parsing, and a lookup is a binary search.
+    """
+    __slots__ = ("data", "starts")
+
+    NEWLINE = re.compile("\n")
+
+    def __init__(self, data: str):
+        self.data: str = data
+        self.starts: Optional[array.array] = None
+
+    def build(self) -> array.array:
+        if self.starts is None:
+            starts: array.array = array.array("q", [0])
+            starts.extend(match.end() for match in self.NEWLINE.finditer(self.data))
+            self.starts = starts
+        return self.starts
+
+    def position(self, lexpos: int) -> Tuple[int, int]:
+        """
+        :return: The line and column of the position, both start from 1.
+        """
+        starts: array.array = self.build()
+        line: int = bisect.bisect_right(starts, lexpos)
+        return line, lexpos - starts[line - 1] + 1
+
+
 # According to PLY docs, t_ignore is used for ignoring characters and tokens.
 t_ignore: str = " \r"
 t_ignore_COMMENT: str = r"\.\.\..*\.\.\."
@@ -147,22 +210,202 @@ def t_newline(t):
 def t_error(t):
     """
     The required error handling for PLY.
-    Raises a generic Exception with illegal character at given line.
+    The illegal character is skipped and the error is added to the errors of the lexer session so that
+    the rest is still tokenized. Without a session raises a generic Exception with illegal character at given line.
 
     :param t: the token where error occurred
     """
-    raise Exception(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
+    errors = getattr(t.lexer, "errors", None)
+    if errors is None:
+        raise Exception(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
+    errors.append(SourceError(f"Illegal character '{t.value[0]}'", t.lexer.lineno,
+                              find_column(t.lexer.lexdata, t.lexpos)))
+    t.lexer.skip(1)
+
+
+if sstables.enabled:
+    # Optimized mode skips the rule validation and loads the master regex from the cached table.
+    lexer: ply.lex.Lexer = sstables.build_lexer(lambda lextab: ply.lex.lex(optimize=True, lextab=lextab),
+                                                sstables.rules_key(globals(), "t_"))
+else:
+    lexer: ply.lex.Lexer = ply.lex.lex()
+
+
+# Anything that iter_tokens accepts as source code. Bytes are expected to be UTF-8.
+Source = Union[str, bytes, mmap.mmap, IO]
+
+# Approximate size of the chunks read from files.
+# The chunks end at line boundaries since none of the tokens can span multiple lines.
+CHUNK_SIZE: int = 1 << 16
+
+
+def read_chunks(source: Source) -> Iterator[str]:
+    """
+    Splits the source to chunks of complete lines so that large files don't have to be read to memory at once.
+
+    :param source: A string, bytes, mmap or a file object opened in text or binary mode.
+    :return: Generator of text chunks.
+    """
+    if isinstance(source, str):
+        # Already in memory, nothing to gain from splitting.
+        yield source
+    elif isinstance(source, (bytes, bytearray, mmap.mmap)):
+        start: int = 0
+        size: int = len(source)
+        while start < size:
+            end: int = source.find(b"\n", start + CHUNK_SIZE)
+            end = size if end == -1 else end + 1
+            yield bytes(source[start:end]).decode("utf-8")
+            start = end
+    else:
+        lines: List[Union[str, bytes]] = []
+        length: int = 0
+        for line in source:
+            lines.append(line)
+            length += len(line)
+            if length >= CHUNK_SIZE:
+                yield _join_lines(lines)
+                lines = []
+                length = 0
+        if lines:
+            yield _join_lines(lines)
+
+
+def _join_lines(lines: List[Union[str, bytes]]) -> str:
+    if isinstance(lines[0], bytes):
+        return b"".join(lines).decode("utf-8")
+    return "".join(lines)
+
+
+class Lexer:
+    """
+    A lexer session that tokenizes one input at a time.
+
+    The module level `lexer` is shared so it cannot be used by two threads at once as the input position
+    and `lineno` are stored in it. The session clones it, the clone shares the compiled regular expressions
+    so creating a session is cheap. A session can be passed to the PLY parser as the lexer.
+    """
+
+    def __init__(self, recover: bool = False):
+        """
+        :param recover: Skip the illegal characters and collect them to `errors` instead of raising.
+        """
+        self.lexer: ply.lex.Lexer = lexer.clone()
+        # The illegal characters since the input was set.
+        self.errors: List[SourceError] = []
+        self.lexer.errors = self.errors if recover else None
+        # Where the data of the PLY lexer starts in the source, only iter_tokens reads it in chunks.
+        self.offset: int = 0
+        self._line_index: Optional[LineIndex] = None
+
+    def reset(self, lineno: int = 1):
+        self.errors.clear()
+        self.offset = 0
+        self.lexer.lineno = lineno
+
+    def line_index(self) -> LineIndex:
+        """
+        :return: The line index of the current input. With `iter_tokens` it has only the last chunk, use
+            `LineIndex` with the whole source instead.
+        """
+        data: str = self.lexer.lexdata
+        if self._line_index is None or self._line_index.data is not data:
+            self._line_index = LineIndex(data)
+        return self._line_index
+
+    def column(self, token: ply.lex.LexToken) -> int:
+        """
+        :param token: The last token read.
+        :return: The column of the token starting from 1.
+        """
+        return find_column(self.lexer.lexdata, token.lexpos - self.offset)
+
+    def input(self, data: str):
+        """
+        Starts tokenizing new input from the first line.
+
+        :param data: The source code.
+        """
+        self.reset()
+        self.lexer.input(data)
+
+    def token(self) -> ply.lex.LexToken:
+        """
+        :return: The next token or None at the end of input.
+        """
+        return self.lexer.token()
 
+    def tokenize(self, data: str) -> List[ply.lex.LexToken]:
+        """
+        :param data: The source code.
+        :return: A list of LexToken instances.
+        """
+        self.input(data)
+        return list(self.lexer)
 
-lexer: ply.lex.Lexer = ply.lex.lex()
+    def tokenize_region(self, data: str, start: int, end: int, lineno: int) -> List[ply.lex.LexToken]:
+        """
+        Tokenizes only data[start:end] without copying it. The `lineno` and `lexpos` of the tokens are the same
+        as if the whole data was tokenized, the region has to start and end between tokens.
+
+        :param data: The source code.
+        :param lineno: The line number at `start`.
+        :return: A list of LexToken instances.
+        """
+        self.reset(lineno)
+        self.lexer.input(data)
+        self.lexer.lexpos = start
+        self.lexer.lexlen = end
+        return list(self.lexer)
+
+    def iter_tokens(self, source: Source) -> Iterator[ply.lex.LexToken]:
+        """
+        Tokenizes the source lazily chunk by chunk, so the memory use does not grow with the input size.
+        The `lineno` and `lexpos` of the tokens are the same as if the whole source was tokenized at once.
+
+        :param source: See `read_chunks`.
+        :return: Generator of LexToken instances.
+        """
+        self.reset()
+        for chunk in read_chunks(source):
+            self.lexer.input(chunk)
+            for token in self.lexer:
+                token.lexpos += self.offset
+                yield token
+            self.offset += len(chunk)
+
+
+# One session per thread so that the functions below can be called concurrently.
+_sessions: threading.local = threading.local()
+
+
+def get_session() -> Lexer:
+    """
+    :return: The lexer session of the current thread.
+    """
+    session = getattr(_sessions, "lexer", None)
+    if session is None:
+        session = _sessions.lexer = Lexer()
+    return session
 
 
 def tokenize_data(data: str) -> List[ply.lex.LexToken]:
     """
     Performs the actual tokenization with PLY lexer.
+    This is thread-safe since each thread uses its own lexer session.
 
     :param data:
     :return: A list of LexToken instances.
     """
-    lexer.input(data)
-    return list(lexer)
+    return get_session().tokenize(data)
+
+
+def iter_tokens(source: Source) -> Iterator[ply.lex.LexToken]:
+    """
+    Tokenizes the source lazily, see `Lexer.iter_tokens`.
+    A new session is used because the generator may be suspended while the same thread tokenizes something else.
+
+    :param source: A string, bytes, mmap or a file object.
+    :return: Generator of LexToken instances.
+    """
+    return Lexer().iter_tokens(source)
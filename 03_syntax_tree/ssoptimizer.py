@@ -0,0 +1,139 @@
+"""
+Optimisation pass over the AST returned by `ssparser.parse_data`.
+
+Constant subexpressions are folded to decimal literals with the same rounding as running them: results have
+one fractional digit, multiplication and division are rounded half up and comparisons give 1.0 or 0.0.
+A runtime with another representation of scalars passes its own operators so that folding rounds like it.
+A negation of a negation is removed. Parenthesised expressions need no removing, `p_atom` already
+returns the inner expression instead of a node for the parentheses.
+
+The tree is walked without recursion so that long expressions don't hit the recursion limit.
+"""
+import decimal
+import operator
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import sssyntax as nodes
+
+ONE = decimal.Decimal("1.0")
+ZERO = decimal.Decimal("0.0")
+ONE_TENTH = decimal.Decimal("0.1")
+
+
+def _round(value: decimal.Decimal) -> decimal.Decimal:
+    return value.quantize(ONE_TENTH, rounding=decimal.ROUND_HALF_UP)
+
+
+def _comparison(compare: Callable[[decimal.Decimal, decimal.Decimal], bool]):
+    return lambda left, right: ONE if compare(left, right) else ZERO
+
+
+# The operators of the literals by their symbol, a result of None is not folded.
+Operators = Dict[str, Callable[[decimal.Decimal, decimal.Decimal], Optional[decimal.Decimal]]]
+
+FOLDABLE_OPERATORS: Operators = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": lambda left, right: _round(left * right),
+    # Division by zero is not folded so that it is reported when the program is run.
+    "/": lambda left, right: _round(left / right),
+    "=": _comparison(operator.eq),
+    "!=": _comparison(operator.ne),
+    "<": _comparison(operator.lt),
+    "<=": _comparison(operator.le),
+    ">": _comparison(operator.gt),
+    ">=": _comparison(operator.ge),
+}
+
+# Where a node is in the tree: the parent, the attribute and the index if the attribute is a list.
+Location = Tuple[Optional[nodes.Node], Optional[str], Optional[int]]
+
+
+class Reduction:
+    """
+    The number of nodes before and after the optimisation.
+    """
+    __slots__ = ("before", "after")
+
+    def __init__(self, before: int, after: int):
+        self.before: int = before
+        self.after: int = after
+
+    def __str__(self) -> str:
+        removed: int = self.before - self.after
+        percent: float = 100 * removed / self.before if self.before else 0.0
+        return f"{self.before} -> {self.after} nodes, {removed} removed ({percent:.1f}%)"
+
+
+def walk(root: nodes.Node) -> Iterator[Tuple[nodes.Node, Location]]:
+    """
+    :return: The nodes of the tree in pre-order with their locations, the root has no parent.
+    """
+    stack: List[Tuple[nodes.Node, Location]] = [(root, (None, None, None))]
+    while stack:
+        node, location = stack.pop()
+        yield node, location
+        children: List[Tuple[nodes.Node, Location]] = []
+        for field in node.child_fields:
+            child = getattr(node, field, None)
+            if isinstance(child, list):
+                children.extend((item, (node, field, index)) for index, item in enumerate(child)
+                                if isinstance(item, nodes.Node))
+            elif isinstance(child, nodes.Node):
+                children.append((child, (node, field, None)))
+        stack.extend(reversed(children))
+
+
+def count_nodes(root: nodes.Node) -> int:
+    return sum(1 for _ in walk(root))
+
+
+def fold_node(node: nodes.Node, operators: Operators = FOLDABLE_OPERATORS) -> Optional[nodes.Node]:
+    """
+    :param operators: Compute the binary operators of literals.
+    :return: The simpler node to use instead or None if the node stays.
+    """
+    if node.nodetype != nodes.TYPE_OP:
+        return None
+    right: nodes.Node = node.child_right
+    left: Optional[nodes.Node] = getattr(node, "child_left", None)
+    if left is None:
+        if node.value != "-":
+            return None
+        if right.nodetype == nodes.TYPE_DECIMAL:
+            # -Decimal("0.0") is 0.0, but the negated float zero is -0.0.
+            return nodes.DecimalLiteral(value=right.value.copy_negate())
+        if right.nodetype == nodes.TYPE_OP and right.value == "-" and not hasattr(right, "child_left"):
+            # - -x
+            return right.child_right
+        return None
+    if left.nodetype != nodes.TYPE_DECIMAL or right.nodetype != nodes.TYPE_DECIMAL:
+        return None
+    if node.value == "/" and not right.value:
+        return None
+    value: Optional[decimal.Decimal] = operators[node.value](left.value, right.value)
+    return None if value is None else nodes.DecimalLiteral(value=value)
+
+
+def fold_constants(root: nodes.Node, operators: Operators = FOLDABLE_OPERATORS) -> Reduction:
+    """
+    Folds the constant expressions of the tree in place.
+
+    :param root: The root node from `ssparser.parse_data`.
+    :param operators: Compute the binary operators of literals, by default with the decimals.
+    :return: The node counts before and after.
+    """
+    order: List[Tuple[nodes.Node, Location]] = list(walk(root))
+    # In reverse pre-order the children are folded before their parent.
+    for node, (parent, field, index) in reversed(order):
+        folded: Optional[nodes.Node] = fold_node(node, operators)
+        if folded is None or parent is None:
+            continue
+        if nodes.span(folded) is None:
+            # A new literal is where the expression was.
+            nodes.copy_span(node, folded)
+        if index is None:
+            setattr(parent, field, folded)
+        else:
+            getattr(parent, field)[index] = folded
+    return Reduction(len(order), count_nodes(root))
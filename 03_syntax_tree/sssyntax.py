@@ -1,6 +1,21 @@
 """
 A helper to construct the AST.
+
+Every nodetype has its own class with __slots__ so the nodes don't carry a __dict__.
+The child attributes follow the naming of tree_print, `child_` for single node and `children_` for list of nodes.
+
+The parser sets the span of the nodes like `p.lexspan` of PLY: `lexpos` is the position of the first token of
+the node in the source and `lexend` the position of the last token. `sslexer.LineIndex` gives the line and
+column of a position.
+
+The names of variables and functions are interned while parsing: every distinct name gets an integer id in the
+symbol table of the program (`Program.symbols`) and the name nodes have the id as `symbol`. The same name is
+then the same string object everywhere in the tree, and later phases can keep what they know of a name in lists
+indexed by the id instead of dictionaries keyed by the name.
 """
+import array
+import decimal
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 
 TYPE_ASSIGNMENT = "assignment"
 TYPE_ATOM = "atom"
@@ -19,6 +34,9 @@ TYPE_INFO_STRING = "info_string"
 TYPE_INT = "int_literal"
 TYPE_NAME = "name"
 TYPE_OP = "op"
+TYPE_PRINT_RANGE = "print_range"
+TYPE_PRINT_SCALAR = "print_scalar"
+TYPE_PRINT_SHEET = "print_sheet"
 TYPE_PROGRAM = "program"
 TYPE_RANGE_DEFINITION = "range_definition"
 TYPE_RANGE_IDENT = "RANGE_IDENT"
@@ -32,36 +50,360 @@ TYPE_SHEET_DEFINITION = "sheet_definition"
 TYPE_SHEET_IDENT = "SHEET_IDENT"
 TYPE_SHEET_INIT = "sheet_init"
 TYPE_SHEET_INIT_LIST = "sheet_init_list"
+TYPE_SHEET_NAME = "SHEET_INIT"
 TYPE_SHEET_ROW = "sheet_row"
 TYPE_SUBROUTINE_DEFINITION = "subroutine_definition"
 TYPE_SUBROUTINE_CALL = "subroutine_call"
 TYPE_TERM = "term"
 TYPE_VARIABLE_DEFINITION ="variable_definition"
+TYPE_WHILE = "while"
+
+# Variable scopes for the `scope` attribute of variable names.
+SCOPE_GLOBAL = 0
+SCOPE_LOCAL = 1
+
+# Attributes of the name nodes set by the parser, the id of the name in the symbol table.
+NAME_SLOTS = ("symbol",)
+
+# Attributes of variable names resolved by the interpreter, the index of the variable in its scope and the scope.
+VARIABLE_SLOTS = ("slot", "scope")
+
+# The range of the decimal literals stored in the number array of a sheet row, in tenths.
+SHEET_ROW_MIN = -(1 << 63)
+SHEET_ROW_MAX = (1 << 63) - 1
+
+# The node class of each nodetype, filled when the classes are defined.
+NODE_CLASSES: Dict[str, Type["Node"]] = {}
 
 
 class Node:
     """
     The base node for every other nodes for AST inherits this.
+
+    The subclasses set `nodetype` and list their child attributes in __slots__, the order of __slots__
+    is the order the children are printed. Unset children are left out as if they were never assigned.
     """
+    __slots__ = ("value", "lexpos", "lexend")
+
+    nodetype: str = None
+    # Precomputed from __slots__ so that the children can be found without inspecting the attributes.
+    child_fields: Tuple[str, ...] = ()
 
-    def __init__(self, nodetype: str, value: str = None, **kwargs):
-        self.nodetype: str = self._validate_nodetype(nodetype)
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "child_fields" not in cls.__dict__:
+            cls.child_fields = tuple(name for name in cls.__slots__ if name.startswith(("child_", "children_")))
+        NODE_CLASSES[cls.nodetype] = cls
+
+    def __init__(self, value: object = None, **children):
         if value is not None:
-            self.value: str = value
-
-        # Put the children as attributes.
-        for attr, value in kwargs.items():
-            setattr(self, attr, value)
-            """
-            if attr.startswith("children_") and type(value) is list:
-                setattr(self, attr, value)
-            elif attr.startswith("child_") and type(value) is Node:
-                setattr(self, attr, value)
-            else:
-                raise TypeError(f"Invalid child node {attr}, the value is {value}.")
-            """
-
-    def _validate_nodetype(self, nodetype: str):
-        #if nodetype not in [TYPE_PROGRAM, TYPE_VARIABLE_DEFINITION]:
-        #     raise TypeError("Nodetype not implemented!")
-        return nodetype
+            self.value = value
+
+        # Put the children as attributes, a name that is not in __slots__ raises AttributeError.
+        for attr, child in children.items():
+            setattr(self, attr, child)
+
+
+def span(node: Node) -> Optional[Tuple[int, int]]:
+    """
+    :return: The positions of the first and the last token of the node or None if the node has no span,
+        e.g. nodes made by the optimizer or the cells of a sheet row.
+    """
+    lexpos: Optional[int] = getattr(node, "lexpos", None)
+    if lexpos is None:
+        return None
+    return lexpos, node.lexend
+
+
+def copy_span(source: Node, target: Node) -> Node:
+    """
+    Gives target the span of source if it has one, e.g. when source is replaced with target.
+
+    :return: target
+    """
+    lexpos: Optional[int] = getattr(source, "lexpos", None)
+    if lexpos is not None:
+        target.lexpos = lexpos
+        target.lexend = source.lexend
+    return target
+
+
+class SymbolTable:
+    """
+    The distinct names of a program, the id of a name is its index in `names`.
+    """
+    __slots__ = ("ids", "names")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        for name in names:
+            self.intern(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"SymbolTable({self.names!r})"
+
+    def intern(self, name: str) -> int:
+        """
+        :return: The id of the name, a new name gets the next id.
+        """
+        symbol: Optional[int] = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+
+class Assignment(Node):
+    __slots__ = ("child_name", "child_cell_ref", "child_expression", "child_sheet_ident")
+    nodetype = TYPE_ASSIGNMENT
+
+
+class CellRef(Node):
+    __slots__ = ("child_range_ident", "child_sheet_ident", "child_coordinate_ident")
+    nodetype = TYPE_CELL_REF
+
+
+class CoordinateIdent(Node):
+    # Zero based position of the cell, resolved by the interpreter.
+    __slots__ = ("row", "column")
+    nodetype = TYPE_COORDINATE_IDENT
+
+
+class DecimalLiteral(Node):
+    # The value as the interpreter represents scalars, resolved by the interpreter.
+    __slots__ = ("number",)
+    nodetype = TYPE_DECIMAL
+
+
+class For(Node):
+    # Whether the iterations can run at once, resolved by the semantic analysis of phase 4.
+    __slots__ = ("children_range_list", "children_statement_list", "independent")
+    nodetype = TYPE_FOR
+
+
+class FormalArg(Node):
+    __slots__ = ("child_name",)
+    nodetype = TYPE_FORMAL_ARG
+
+
+class FunctionCall(Node):
+    __slots__ = ("child_name", "children_arguments")
+    nodetype = TYPE_FUNCTION_CALL
+
+
+class FunctionDefinition(Node):
+    __slots__ = ("child_name", "child_return_type", "children_formals", "children_variable_definitions",
+                 "children_statement_list")
+    nodetype = TYPE_FUNCTION_DEFINITION
+
+
+class FuncIdent(Node):
+    # The index of the function, resolved by the interpreter.
+    __slots__ = NAME_SLOTS + ("slot",)
+    nodetype = TYPE_FUNC_IDENT
+
+
+class Ident(Node):
+    __slots__ = NAME_SLOTS + VARIABLE_SLOTS
+    nodetype = TYPE_IDENT
+
+
+class If(Node):
+    __slots__ = ("child_condition", "children_then_statement_list", "children_else_statement_list")
+    nodetype = TYPE_IF
+
+
+class InfoString(Node):
+    __slots__ = ()
+    nodetype = TYPE_INFO_STRING
+
+
+class IntLiteral(Node):
+    __slots__ = ()
+    nodetype = TYPE_INT
+
+
+class Op(Node):
+    __slots__ = ("child_left", "child_right")
+    nodetype = TYPE_OP
+
+
+class PrintRange(Node):
+    __slots__ = ("child_info_string", "child_expression")
+    nodetype = TYPE_PRINT_RANGE
+
+
+class PrintScalar(Node):
+    __slots__ = ("child_info_string", "child_expression")
+    nodetype = TYPE_PRINT_SCALAR
+
+
+class PrintSheet(Node):
+    __slots__ = ("child_info_string", "child_name")
+    nodetype = TYPE_PRINT_SHEET
+
+
+class Program(Node):
+    # The SymbolTable of the names in the program.
+    __slots__ = ("children_function_or_variable_definition", "children_statement_list", "symbols")
+    nodetype = TYPE_PROGRAM
+
+
+class RangeDefinition(Node):
+    __slots__ = ("child_name", "child_expression")
+    nodetype = TYPE_RANGE_DEFINITION
+
+
+class RangeExpression(Node):
+    __slots__ = ("child_expression", "child_from", "child_to")
+    nodetype = TYPE_RANGE_EXPRESSION
+
+
+class RangeIdent(Node):
+    __slots__ = NAME_SLOTS + VARIABLE_SLOTS
+    nodetype = TYPE_RANGE_IDENT
+
+
+class Return(Node):
+    __slots__ = ("child_expression",)
+    nodetype = TYPE_RETURN
+
+
+class ReturnType(Node):
+    __slots__ = ()
+    nodetype = TYPE_RETURN_TYPE
+
+
+class Scalar(Node):
+    __slots__ = NAME_SLOTS + VARIABLE_SLOTS
+    nodetype = TYPE_SCALAR
+
+
+class ScalarDefinition(Node):
+    __slots__ = ("child_name", "child_expression")
+    nodetype = TYPE_SCALAR_DEFINITION
+
+
+class SheetDefinition(Node):
+    __slots__ = ("child_name", "child_sheet_init")
+    nodetype = TYPE_SHEET_DEFINITION
+
+
+class SheetIdent(Node):
+    __slots__ = NAME_SLOTS + VARIABLE_SLOTS
+    nodetype = TYPE_SHEET_IDENT
+
+
+class SheetInit(Node):
+    # Also used as the name of sheet formal argument.
+    __slots__ = ("children_sheet_init_list",) + NAME_SLOTS + VARIABLE_SLOTS
+    nodetype = TYPE_SHEET_INIT
+
+
+class SheetName(Node):
+    __slots__ = NAME_SLOTS + VARIABLE_SLOTS
+    nodetype = TYPE_SHEET_NAME
+
+
+class SheetRow(Node):
+    """
+    A row of a sheet literal without a node for each cell. The decimal literals are stored as tenths in
+    the `numbers` array and the other expressions in `expressions` by their column, their number is 0.
+
+    `child_` (a row with a single expression) and `children_simple_expr` make the cell nodes when
+    they are read, so the row is printed and walked like the other nodes.
+    """
+    __slots__ = ("numbers", "expressions")
+    nodetype = TYPE_SHEET_ROW
+    child_fields = ("child_", "children_simple_expr")
+
+    def __init__(self, cells: Iterable[Node] = ()):
+        super().__init__()
+        self.numbers: array.array = array.array("q")
+        self.expressions: Dict[int, Node] = {}
+        for cell in cells:
+            self.append(cell)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def append(self, cell: Node):
+        self.numbers.append(0)
+        self.set_cell(len(self.numbers) - 1, cell)
+
+    def set_cell(self, column: int, cell: Node):
+        tenths: Optional[int] = literal_tenths(cell)
+        if tenths is None:
+            self.numbers[column] = 0
+            self.expressions[column] = cell
+        else:
+            self.numbers[column] = tenths
+            self.expressions.pop(column, None)
+
+    def cell(self, column: int) -> Node:
+        expression: Optional[Node] = self.expressions.get(column)
+        if expression is not None:
+            return expression
+        return DecimalLiteral(value=decimal.Decimal(self.numbers[column]).scaleb(-1))
+
+    @property
+    def child_(self) -> Node:
+        if len(self.numbers) != 1:
+            raise AttributeError("child_")
+        return self.cell(0)
+
+    @property
+    def children_simple_expr(self) -> "SheetCells":
+        if len(self.numbers) == 1:
+            raise AttributeError("children_simple_expr")
+        return SheetCells(self)
+
+
+class SheetCells(list):
+    """
+    The cells of a sheet row as nodes, setting a cell changes the row too.
+    """
+    __slots__ = ("row",)
+
+    def __init__(self, row: SheetRow):
+        super().__init__(row.cell(column) for column in range(len(row)))
+        self.row: SheetRow = row
+
+    def __setitem__(self, index: int, cell: Node):
+        super().__setitem__(index, cell)
+        self.row.set_cell(index, cell)
+
+
+def literal_tenths(node: Node) -> Optional[int]:
+    """
+    :return: The value of a decimal literal in tenths or None if the node is not one or it does not fit a sheet row.
+    """
+    if node.nodetype != TYPE_DECIMAL:
+        return None
+    value: decimal.Decimal = node.value
+    if value.as_tuple().exponent != -1:
+        return None
+    tenths: int = int(value.scaleb(1))
+    if not SHEET_ROW_MIN <= tenths <= SHEET_ROW_MAX or (not tenths and value.is_signed()):
+        # -0.0 would lose its sign.
+        return None
+    return tenths
+
+
+class SubroutineCall(Node):
+    __slots__ = ("child_name", "children_arguments")
+    nodetype = TYPE_SUBROUTINE_CALL
+
+
+class SubroutineDefinition(Node):
+    __slots__ = ("child_name", "children_formals", "children_variable_definitions", "children_statement_list")
+    nodetype = TYPE_SUBROUTINE_DEFINITION
+
+
+class While(Node):
+    __slots__ = ("child_condition", "children_statement_list")
+    nodetype = TYPE_WHILE
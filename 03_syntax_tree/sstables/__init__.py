@@ -0,0 +1,160 @@
+"""
+Cache for the generated PLY lexer and parser tables.
+
+The tables are written to this package as `lextab_<key>.py` and `<name>_<key>.pickle`, the name is `parsetab`
+for the program parser.
+The key is a hash of the rule definitions (regular expressions of `t_` rules and docstrings of `p_` rules),
+so the tables are only regenerated when the rules change and otherwise loaded on start without validation.
+
+A table is generated to a temporary file that then replaces it, so a process that starts while another one
+writes the table never reads a partial table. A table that cannot be read is generated again.
+
+The cache can be disabled with environment variable `SHEETSCRIPT_TABLE_CACHE=0`,
+then the tables are generated on every start and nothing is written.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import threading
+from typing import Callable, Dict, List, TypeVar
+
+import ply
+
+# Increase this if the table format or the key changes so that old tables are not loaded.
+TABLE_VERSION: int = 1
+
+DIRECTORY: str = os.path.dirname(os.path.abspath(__file__))
+
+enabled: bool = os.environ.get("SHEETSCRIPT_TABLE_CACHE", "1") != "0"
+
+Built = TypeVar("Built")
+
+
+def rules_key(namespace: Dict[str, object], prefix: str) -> str:
+    """
+    Calculates the hash key for the rules in the given module namespace.
+
+    The string rules are hashed by their regular expression and the function rules by their docstring
+    in the order of definition since PLY uses that order.
+
+    :param namespace: The globals() of the lexer or parser module.
+    :param prefix: The rule prefix, "t_" for lexer and "p_" for parser.
+    :return: A short hex digest.
+    """
+    rules: List[str] = [f"{TABLE_VERSION}", ply.__version__, repr(namespace.get("tokens")),
+                        repr(namespace.get("start"))]
+    functions: List[object] = []
+    for name in sorted(namespace):
+        if not name.startswith(prefix):
+            continue
+        rule = namespace[name]
+        if isinstance(rule, str):
+            rules.append(f"{name}={rule}")
+        elif callable(rule):
+            functions.append(rule)
+    for function in sorted(functions, key=lambda f: f.__code__.co_firstlineno):
+        rules.append(f"{function.__name__}={function.__doc__}")
+    return hashlib.sha1("\n".join(rules).encode("utf-8")).hexdigest()[:16]
+
+
+def _remove_stale(pattern: str, current: str):
+    """
+    Removes the tables of the same kind with other keys as they cannot be used anymore.
+
+    :param pattern: Glob pattern of the table files of one kind.
+    :param current: The file name of the table that is being used.
+    """
+    if os.path.exists(os.path.join(DIRECTORY, current)):
+        return
+    for stale in glob.glob(os.path.join(DIRECTORY, pattern)):
+        try:
+            os.remove(stale)
+        except OSError:
+            # Another process may have removed it already, or the directory is read-only.
+            pass
+
+
+def lexer_table(key: str) -> str:
+    """
+    Returns the module name for `lextab` argument of PLY lexer, PLY only supports modules for lexer tables.
+
+    :param key: The key from `rules_key`.
+    """
+    _remove_stale("lextab_*.py", f"lextab_{key}.py")
+    return f"{__name__}.lextab_{key}"
+
+
+def parser_table(key: str, name: str = "parsetab") -> str:
+    """
+    Returns the file path for `picklefile` argument of PLY parser.
+    A pickle is used instead of a module because it loads faster than a module which has to be compiled.
+
+    :param key: The key from `rules_key`.
+    :param name: Separates the tables of parsers with other start symbols, so they don't remove each other.
+    """
+    _remove_stale(f"{name}_*.pickle", f"{name}_{key}.pickle")
+    return os.path.join(DIRECTORY, f"{name}_{key}.pickle")
+
+
+def _temporary_name() -> str:
+    """
+    :return: A name for a table that only this thread writes, it does not match the stale table patterns.
+    """
+    return f"tmp_{os.getpid()}_{threading.get_ident()}"
+
+
+def _replace(temporary: str, path: str):
+    """
+    Moves the generated table in place of path, or removes it if that fails.
+    """
+    try:
+        os.replace(temporary, path)
+    except OSError:
+        # PLY could not write it, e.g. the directory is read-only, or another process removed it.
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def build_lexer(build: Callable[[str], Built], key: str) -> Built:
+    """
+    Builds the lexer from the cached table.
+
+    :param build: Builds the lexer with the module name for `lextab` argument of PLY lexer.
+    :param key: The key from `rules_key`.
+    """
+    module: str = lexer_table(key)
+    path: str = os.path.join(DIRECTORY, f"lextab_{key}.py")
+    if os.path.exists(path):
+        try:
+            return build(module)
+        except (SyntaxError, AttributeError, NameError):
+            # A partial module written before the tables were replaced in one step.
+            pass
+    temporary: str = _temporary_name()
+    lexer: Built = build(f"{__name__}.{temporary}")
+    _replace(os.path.join(DIRECTORY, f"{temporary}.py"), path)
+    return lexer
+
+
+def build_parser(build: Callable[[str], Built], key: str, name: str = "parsetab") -> Built:
+    """
+    Builds a parser from the cached table.
+
+    :param build: Builds the parser with the file path for `picklefile` argument of PLY parser.
+    :param key: The key from `rules_key`.
+    :param name: See `parser_table`.
+    """
+    path: str = parser_table(key, name)
+    if os.path.exists(path):
+        try:
+            return build(path)
+        except (EOFError, pickle.UnpicklingError):
+            # A partial pickle written before the tables were replaced in one step.
+            pass
+    temporary: str = os.path.join(DIRECTORY, f"{_temporary_name()}.pickle")
+    parser: Built = build(temporary)
+    _replace(temporary, path)
+    return parser
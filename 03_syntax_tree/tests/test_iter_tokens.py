@@ -0,0 +1,44 @@
+import io
+import mmap
+import tempfile
+from typing import List, Tuple
+from unittest import TestCase, mock
+
+import sslexer
+import ssparser
+from benchmarks.programs import generate_program
+
+
+def token_tuples(tokens) -> List[Tuple[str, object, int, int]]:
+    return [(token.type, token.value, token.lineno, token.lexpos) for token in tokens]
+
+
+class IterTokensTest(TestCase):
+    def setUp(self):
+        self.data: str = generate_program(statements=200) + "print_scalar !öäå! 1.0\n"
+        self.expected = token_tuples(sslexer.tokenize_data(data=self.data))
+
+    def test_string(self):
+        self.assertEqual(token_tuples(sslexer.iter_tokens(self.data)), self.expected)
+
+    @mock.patch("sslexer.CHUNK_SIZE", 100)
+    def test_file_objects(self):
+        self.assertEqual(token_tuples(sslexer.iter_tokens(io.StringIO(self.data))), self.expected)
+        self.assertEqual(token_tuples(sslexer.iter_tokens(io.BytesIO(self.data.encode("utf-8")))), self.expected)
+
+    @mock.patch("sslexer.CHUNK_SIZE", 100)
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(self.data.encode("utf-8"))
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertEqual(token_tuples(sslexer.iter_tokens(mapped)), self.expected)
+
+    def test_is_lazy(self):
+        tokens = sslexer.iter_tokens(io.StringIO("scalar\n" + "@" * 10))
+        self.assertEqual(next(tokens).type, "SCALAR")
+
+    @mock.patch("sslexer.CHUNK_SIZE", 100)
+    def test_parse_stream(self):
+        tree = ssparser.parse_stream(io.StringIO(self.data))
+        self.assertEqual(len(tree.children_statement_list), 201)
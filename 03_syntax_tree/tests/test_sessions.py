@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest import TestCase
+
+import sslexer
+import ssparser
+
+
+class SessionTest(TestCase):
+    def test_lineno_starts_from_first_line(self):
+        sslexer.tokenize_data(data="scalar\n\n\nscalar")
+        tokens = sslexer.tokenize_data(data="scalar\nscalar")
+        self.assertEqual([token.lineno for token in tokens], [1, 2])
+
+    def test_tokenize_concurrently(self):
+        # Each input has a different number of lines so mixed up lexer state would show in lineno.
+        inputs: List[str] = ["\n".join(["ident := 1.0"] * lines) for lines in range(1, 200)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(sslexer.tokenize_data, inputs))
+        for lines, tokens in enumerate(results, start=1):
+            self.assertEqual(len(tokens), lines * 3)
+            self.assertEqual(tokens[-1].lineno, lines)
+
+    def test_parse_concurrently(self):
+        inputs: List[str] = ["\n".join(["print_scalar 1.0 + 2.0"] * statements) for statements in range(1, 100)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(ssparser.parse_data, inputs))
+        for statements, tree in enumerate(results, start=1):
+            self.assertEqual(len(tree.children_statement_list), statements)
+
+    def test_sessions_are_independent(self):
+        first = ssparser.Parser()
+        second = ssparser.Parser()
+        self.assertIsNot(first.parser, second.parser)
+        self.assertIsNot(first.lexer.lexer, second.lexer.lexer)
+        self.assertEqual(first.parse("print_scalar 1.0").nodetype, second.parse("print_scalar 1.0").nodetype)
@@ -0,0 +1,57 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import ssbatch
+from main import parse_file
+
+
+class SSBatchTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "sub"))
+        self.good = os.path.join(self.directory, "good.sheetscript")
+        self.nested = os.path.join(self.directory, "sub", "nested.sheetscript")
+        self.bad = os.path.join(self.directory, "bad.sheetscript")
+        shutil.copy("tests/code.sheetscript", self.good)
+        shutil.copy("tests/code.sheetscript", self.nested)
+        with open(self.bad, "w", encoding="utf-8") as source:
+            source.write("scalar xx = 1.0\nxx := := 2.0\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_files(self):
+        self.assertEqual(ssbatch.find_files([self.directory]), [self.bad, self.good, self.nested])
+        pattern = os.path.join(self.directory, "*.sheetscript")
+        self.assertEqual(ssbatch.find_files([pattern, self.good, "missing.sheetscript"]),
+                         [self.bad, self.good, "missing.sheetscript"])
+
+    def run_batch(self, jobs, ordered=True):
+        output, errors = io.StringIO(), io.StringIO()
+        summary = ssbatch.run_batch(parse_file, [self.directory], jobs=jobs, ordered=ordered,
+                                    output=output, errors=errors)
+        return summary, output.getvalue(), errors.getvalue()
+
+    def test_error_only_fails_the_file(self):
+        summary, output, errors = self.run_batch(jobs=1)
+        self.assertEqual((summary.files, summary.failed), (3, 1))
+        self.assertIn(f"{self.bad}: 2:7: Syntax error at ':='\n", errors)
+        self.assertIn(f"==> {self.good} <==\n", output)
+        self.assertIn(f"==> {self.nested} <==\n", output)
+        self.assertTrue(str(summary).startswith("3 files (1 failed)"))
+
+    def test_workers(self):
+        _, output, errors = self.run_batch(jobs=1)
+        summary, parallel_output, parallel_errors = self.run_batch(jobs=2)
+        self.assertEqual(summary.files, 3)
+        self.assertEqual(parallel_output, output)
+        # The last line is the summary with the time.
+        self.assertEqual(parallel_errors.splitlines()[:-1], errors.splitlines()[:-1])
+
+    def test_unordered(self):
+        summary, output, _ = self.run_batch(jobs=2, ordered=False)
+        self.assertEqual((summary.files, summary.failed), (3, 1))
+        self.assertEqual(output.count("==> "), 2)
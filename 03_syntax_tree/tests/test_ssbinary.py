@@ -0,0 +1,66 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import ssbinary
+import ssoptimizer
+import ssparser
+import sssyntax
+import tree_print
+from main import read_file
+
+
+def round_trip(data: str):
+    tree = ssparser.parse_data(data=data)
+    return tree_print.treeformat(tree, "ascii"), tree_print.treeformat(ssbinary.loads(ssbinary.dumps(tree)), "ascii")
+
+
+class SSBinaryTest(TestCase):
+    def test_round_trip(self):
+        programs = [
+            read_file("tests/code.sheetscript"),
+            "scalar value = 1.0\nsheet SH = { 1.5, value + 1.0, -0.0\n 2.0 }\nprint_sheet !info! SH",
+            # Deeper than the recursion limit
+            "print_scalar " + " + ".join(["counter"] * 3000),
+        ]
+        for program in programs:
+            with self.subTest(program=program[:40]):
+                before, after = round_trip(program)
+                self.assertEqual(after, before)
+
+    def test_spans(self):
+        tree = ssparser.parse_data(data=read_file("tests/code.sheetscript"))
+        loaded = ssbinary.loads(ssbinary.dumps(tree))
+        self.assertEqual([sssyntax.span(node) for node, _ in ssoptimizer.walk(loaded)],
+                         [sssyntax.span(node) for node, _ in ssoptimizer.walk(tree)])
+
+    def test_symbols(self):
+        tree = ssparser.parse_data(data=read_file("tests/code.sheetscript"))
+        loaded = ssbinary.loads(ssbinary.dumps(tree))
+        self.assertEqual(loaded.symbols.names, tree.symbols.names)
+        self.assertEqual([getattr(node, "symbol", None) for node, _ in ssoptimizer.walk(loaded)],
+                         [getattr(node, "symbol", None) for node, _ in ssoptimizer.walk(tree)])
+
+    def test_values_are_shared(self):
+        data = ssbinary.dumps(ssparser.parse_data(data="print_scalar " + " + ".join(["counter"] * 1000)))
+        self.assertEqual(data.count(b"counter"), 1)
+
+    def test_not_a_tree(self):
+        with self.assertRaises(ssbinary.FormatError):
+            ssbinary.loads(b"print_scalar 1.0")
+        with self.assertRaises(ssbinary.FormatError):
+            ssbinary.loads(ssbinary.MAGIC + b"broken")
+
+    def test_file(self):
+        tree = ssparser.parse_data(data=read_file("tests/code.sheetscript"))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "code.ast")
+            ssbinary.dump(tree, filename)
+            self.assertTrue(ssbinary.is_binary(filename))
+            self.assertFalse(ssbinary.is_binary("tests/code.sheetscript"))
+            self.assertEqual(tree_print.treeformat(ssbinary.load(filename), "ascii"),
+                             tree_print.treeformat(tree, "ascii"))
+            with open(filename, "r+b") as file:
+                file.truncate(os.path.getsize(filename) // 2)
+            with self.assertRaises(ssbinary.FormatError):
+                ssbinary.load(filename)
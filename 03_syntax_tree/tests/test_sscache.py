@@ -0,0 +1,61 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import ssbinary
+import sscache
+import ssparser
+import tree_print
+from main import read_file
+
+
+class SSCacheTest(TestCase):
+    def setUp(self):
+        self.data = read_file("tests/code.sheetscript")
+
+    def test_hits_and_misses(self):
+        cache = sscache.ParseCache()
+        first = cache.parse(self.data)
+        second = cache.parse(self.data)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # Every hit is a new tree so that changing it does not change the cached one.
+        self.assertIsNot(first, second)
+        self.assertEqual(tree_print.treeformat(second, "ascii"),
+                         tree_print.treeformat(ssparser.parse_data(self.data), "ascii"))
+        self.assertEqual(str(cache), "1 hits, 1 misses (50.0% hit rate)")
+
+    def test_least_recently_used_is_dropped(self):
+        cache = sscache.ParseCache(size=1)
+        cache.parse(self.data)
+        cache.parse("print_scalar 1.0")
+        cache.parse(self.data)
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sscache.ParseCache(directory=directory).parse(self.data)
+            cache = sscache.ParseCache(directory=directory)
+            cache.parse(self.data)
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+            self.assertTrue(os.path.exists(cache.path(cache.key(self.data))))
+
+    def test_grammar_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sscache.ParseCache(directory=directory).parse(self.data)
+            cache = sscache.ParseCache(directory=directory)
+            cache.grammar = "changed"
+            cache.parse(self.data)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_broken_entry(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = sscache.ParseCache(directory=directory)
+            path = cache.path(cache.key(self.data))
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as entry:
+                entry.write(ssbinary.MAGIC + b"broken")
+            cache.parse(self.data)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+            cache.entries.clear()
+            cache.parse(self.data)
+            self.assertEqual(cache.hits, 1)
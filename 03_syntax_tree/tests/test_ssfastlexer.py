@@ -0,0 +1,86 @@
+import io
+import random
+from unittest import TestCase, mock
+
+import ssfastlexer
+import sslexer
+import ssparser
+import tree_print
+from main import read_file
+
+# Pieces that are joined randomly, with characters where the alternatives of the rules overlap.
+PIECES = ["scalar", "range", "sheet", "xx", "ab_1", "a", "_r", "_", "SH", "A1", "AB123", "ABC1", "Fn", "F",
+          "0", "0.5", "-1.5", "12", "-0", "1.", "!info!", "!", "!=", "<", "<=", ">=", "=", ":=", ":", "..", ".",
+          "... comment ...", "'", "$", "#", "+", "-", "*", "/", "[", "]", "(", ")", "{", "}", ",", "@", "?",
+          " ", "  ", "\r", "\n", "\n\n", "end", "endif", "print_scalar"]
+
+
+def dump(tokens):
+    return [(token.type, token.value, token.lineno, token.lexpos) for token in tokens]
+
+
+def ply_tokens(data, errors=None):
+    lexer = sslexer.Lexer(recover=errors is not None)
+    tokens = lexer.tokenize(data)
+    if errors is not None:
+        errors.extend(str(error) for error in lexer.errors)
+    return dump(tokens)
+
+
+def fast_tokens(data, errors=None):
+    lexer = ssfastlexer.FastLexer(recover=errors is not None)
+    tokens = lexer.tokenize(data)
+    if errors is not None:
+        errors.extend(str(error) for error in lexer.errors)
+    return dump(tokens)
+
+
+class FastLexerTest(TestCase):
+    def test_same_tokens(self):
+        data = read_file("tests/code.sheetscript")
+        self.assertEqual(fast_tokens(data), ply_tokens(data))
+
+    def test_random_sources(self):
+        generator = random.Random(400)
+        for _ in range(300):
+            data = "".join(generator.choice(PIECES) for _ in range(generator.randrange(1, 60)))
+            ply_errors, fast_errors = [], []
+            self.assertEqual(fast_tokens(data, fast_errors), ply_tokens(data, ply_errors), repr(data))
+            self.assertEqual(fast_errors, ply_errors, repr(data))
+
+    def test_without_possessive_quantifier(self):
+        # Python before 3.11 matches the ignored characters with a lookahead.
+        master, actions = ssfastlexer._master(possessive=False)
+        data = read_file("tests/code.sheetscript") + "\n  @  xx ?\n"
+        with mock.patch.object(ssfastlexer, "MASTER", master), mock.patch.object(ssfastlexer, "ACTIONS", actions):
+            ply_errors, fast_errors = [], []
+            self.assertEqual(fast_tokens(data, fast_errors), ply_tokens(data, ply_errors))
+            self.assertEqual(fast_errors, ply_errors)
+
+    def test_illegal_character_raises(self):
+        with self.assertRaises(Exception) as context:
+            ssfastlexer.FastLexer().tokenize("xx\n  @")
+        self.assertEqual(str(context.exception), "Illegal character '@' at line 2")
+
+    def test_region_and_stream(self):
+        data = read_file("tests/code.sheetscript")
+        start = data.index("function")
+        end = data.index("end\n", start) + 4
+        line = data.count("\n", 0, start) + 1
+        self.assertEqual(dump(ssfastlexer.FastLexer().tokenize_region(data, start, end, line)),
+                         dump(sslexer.Lexer().tokenize_region(data, start, end, line)))
+        # Many chunks, the positions continue over them.
+        source = data * (sslexer.CHUNK_SIZE // len(data) + 2)
+        self.assertEqual(dump(ssfastlexer.FastLexer().iter_tokens(io.StringIO(source))),
+                         dump(sslexer.iter_tokens(io.StringIO(source))))
+
+    def test_parser(self):
+        data = read_file("tests/code.sheetscript")
+        self.assertEqual(tree_print.treeformat(ssparser.Parser(fast=True).parse(data), "ascii"),
+                         tree_print.treeformat(ssparser.Parser(fast=False).parse(data), "ascii"))
+        source = "scalar xx = 1.0\nxx := := 2.0 @\nprint_scalar xx"
+        ply_errors, fast_errors = [], []
+        ssparser.Parser(fast=False).parse(source, ply_errors)
+        ssparser.Parser(fast=True).parse(source, fast_errors)
+        self.assertEqual([str(error) for error in fast_errors], [str(error) for error in ply_errors])
+        self.assertEqual(len(fast_errors), 2)
@@ -0,0 +1,99 @@
+import contextlib
+import io
+from unittest import TestCase
+
+import ssincremental
+import ssoptimizer
+import ssparser
+import sssyntax
+import tree_print
+from main import read_file
+
+
+def spans(tree) -> list:
+    return [(node.nodetype, sssyntax.span(node)) for node, _ in ssoptimizer.walk(tree)]
+
+
+def dump(tree) -> str:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tree_print.treeprint(tree, "ascii")
+    return output.getvalue()
+
+
+class SSIncrementalTest(TestCase):
+    def setUp(self):
+        self.source = read_file("tests/code.sheetscript")
+        self.tree = ssincremental.parse(self.source)
+
+    def reparse(self, *edits: ssincremental.Edit) -> ssincremental.IncrementalTree:
+        tree = ssincremental.reparse(self.tree, list(edits))
+        self.assertEqual(tree.source, ssincremental.apply_edits(self.source, list(edits)))
+        self.assertEqual(dump(tree.program), dump(ssparser.parse_data(tree.source)))
+        return tree
+
+    def replace(self, old: str, new: str) -> ssincremental.Edit:
+        start = self.source.index(old)
+        return ssincremental.Edit(start, start + len(old), new)
+
+    def test_parse(self):
+        self.assertEqual(dump(self.tree.program), dump(ssparser.parse_data(self.source)))
+
+    def test_edit_function(self):
+        tree = self.reparse(self.replace("return value * 2.0", "scalar unused\n  return value + value"))
+        old = self.tree.program.children_function_or_variable_definition
+        new = tree.program.children_function_or_variable_definition
+        self.assertEqual([a is b for a, b in zip(old, new)], [True] * 6 + [False, True, True])
+        self.assertLess(tree.lexed, len(tree.source) // 4)
+
+    def test_edit_statements(self):
+        tree = self.reparse(self.replace("print_scalar #_area", "print_scalar 2.0 * #_area"))
+        self.assertTrue(all(a is b for a, b in zip(self.tree.program.children_function_or_variable_definition,
+                                                   tree.program.children_function_or_variable_definition)))
+
+    def test_edit_variables_and_functions(self):
+        self.reparse(self.replace("scalar total = 0.0", "scalar total = 1.0\nscalar more"),
+                     self.replace("print_scalar !amount! shown", "print_scalar shown"),
+                     ssincremental.Edit(len(self.source), len(self.source), "print_scalar total\n"))
+
+    def test_symbols(self):
+        tree = self.reparse(self.replace("return value * 2.0", "scalar added\n  return value * 2.0"))
+        names = self.tree.program.symbols.names
+        self.assertEqual(tree.program.symbols.names, names + ["added"])
+        self.assertNotIn("added", names)
+        definition = tree.program.children_function_or_variable_definition[0]
+        self.assertEqual(tree.program.symbols.names[definition.child_name.symbol], definition.child_name.value)
+
+    def test_add_and_remove_function(self):
+        start = self.source.index("subroutine Report")
+        tree = self.reparse(ssincremental.Edit(start, start, "function Half[value : scalar] return scalar is\n"
+                                                             "  return value / 2.0\nend\n"))
+        self.assertEqual(len(tree.program.children_function_or_variable_definition), 10)
+        end = self.source.index("end", start)
+        self.reparse(ssincremental.Edit(start, end + 3, ""))
+
+    def test_lost_end(self):
+        # Without its end the function continues into the next one, which is a syntax error on that line.
+        start = self.source.index("end\n\nfunction Sum_of")
+        with self.assertRaises(ssparser.ParseError) as context:
+            ssincremental.reparse(self.tree, [ssincremental.Edit(start, start + 3, "")])
+        self.assertEqual(context.exception.errors[0].line, 17)
+
+    def test_line_numbers(self):
+        tree = ssincremental.reparse(self.tree, [ssincremental.Edit(0, 0, "\n\n")])
+        self.assertEqual([segment.line for segment in tree.segments],
+                         [segment.line + 2 if index else 1 for index, segment in enumerate(self.tree.segments)])
+        start = tree.source.index("acc\nend")
+        with self.assertRaises(ssparser.ParseError) as context:
+            ssincremental.reparse(tree, [ssincremental.Edit(start, start + 3, "")])
+        # The end after the return on line 24 is unexpected.
+        self.assertEqual(str(context.exception.errors[0]), "25:1: Syntax error at 'end'")
+
+    def test_spans(self):
+        # The spans of the reused nodes after the edit are moved too.
+        for edit in [ssincremental.Edit(0, 0, "scalar added\n  "), self.replace("return value * 2.0", "return value")]:
+            with self.subTest(text=edit.text):
+                # The old tree shares the moved nodes, so every edit starts from a new one.
+                self.tree = ssincremental.parse(self.source)
+                tree = self.reparse(edit)
+                self.assertEqual(spans(tree.program), spans(ssparser.parse_data(tree.source)))
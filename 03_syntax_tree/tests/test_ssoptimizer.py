@@ -0,0 +1,55 @@
+import decimal
+from unittest import TestCase
+
+import ssoptimizer
+import ssparser
+import sssyntax as nodes
+from main import read_file
+
+
+def fold(expression: str, operators: ssoptimizer.Operators = ssoptimizer.FOLDABLE_OPERATORS) -> nodes.Node:
+    tree = ssparser.parse_data(data=f"print_scalar {expression}")
+    ssoptimizer.fold_constants(tree, operators)
+    return tree.children_statement_list[0].child_expression
+
+
+class SSOptimizerTest(TestCase):
+    def test_fold_constants(self):
+        tree = ssparser.parse_data(data="scalar scal1 = 1.0\nscalar scal2 = scal1 + 1.0 * 2.0 + 1.0\nprint_scalar scal2")
+        reduction = ssoptimizer.fold_constants(tree)
+        expression = tree.children_function_or_variable_definition[1].child_expression
+        self.assertEqual(expression.value, "+")
+        self.assertEqual(expression.child_left.value, "scal1")
+        self.assertEqual(expression.child_right.value, decimal.Decimal("3.0"))
+        self.assertEqual((reduction.before - reduction.after, reduction.after), (4, ssoptimizer.count_nodes(tree)))
+
+    def test_rounding(self):
+        self.assertEqual(fold("1.5 * 2.5").value, decimal.Decimal("3.8"))
+        self.assertEqual(fold("1.0 / 3.0").value, decimal.Decimal("0.3"))
+        self.assertEqual(fold("(2.0 > 1.0) + 1.0").value, decimal.Decimal("2.0"))
+
+    def test_negation(self):
+        self.assertEqual(fold("-(2.0 * 3.0)").value, decimal.Decimal("-6.0"))
+        self.assertEqual(fold("-(-value)").nodetype, nodes.TYPE_IDENT)
+        self.assertEqual(str(fold("- 0.0").value), "-0.0")
+        self.assertEqual(str(fold("-(1.0 - 1.0)").value), "-0.0")
+
+    def test_not_folded(self):
+        self.assertEqual(fold("1.0 / 0.0").value, "/")
+        self.assertEqual(fold("#range SH'A1..SH'B2").value, "#")
+
+    def test_operators(self):
+        operators = dict(ssoptimizer.FOLDABLE_OPERATORS, **{"*": lambda left, right: None})
+        expression = fold("2.0 * 3.0 + 1.0 / 2.0", operators)
+        self.assertEqual((expression.child_left.value, expression.child_right.value), ("*", decimal.Decimal("0.5")))
+
+    def test_long_expression(self):
+        reduction = ssoptimizer.fold_constants(ssparser.parse_data(data="print_scalar " + " + ".join(["1.0"] * 3000)))
+        self.assertEqual(reduction.after, 3)
+
+    def test_program(self):
+        tree = ssparser.parse_data(data=read_file("tests/code.sheetscript"))
+        before = ssoptimizer.count_nodes(tree)
+        reduction = ssoptimizer.fold_constants(tree)
+        self.assertEqual(reduction.before, before)
+        self.assertLess(reduction.after, before)
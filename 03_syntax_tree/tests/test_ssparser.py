@@ -0,0 +1,141 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import sslexer
+import ssoptimizer
+import ssparser
+import sssyntax
+
+PROGRAM = """scalar xx = 1.0
+xx := := 2.0
+print_scalar xx @
+while xx < do
+  print_scalar xx
+done
+if xx then
+  xx := 1.0 +
+endif
+print_scalar xx
+"""
+
+
+class ErrorRecoveryTest(TestCase):
+    def test_all_errors_in_one_pass(self):
+        errors = []
+        tree = ssparser.parse_data(PROGRAM, errors)
+        self.assertEqual([str(error) for error in errors], [
+            "2:7: Syntax error at ':='",
+            "3:17: Illegal character '@'",
+            "4:12: Syntax error at 'do'",
+            "9:1: Syntax error at 'endif'",
+        ])
+        # The statements with errors are left out, the if is kept since the error was inside it.
+        self.assertEqual([node.nodetype for node in tree.children_statement_list],
+                         ["print_scalar", "if", "print_scalar"])
+
+    def test_raises_parse_error(self):
+        with self.assertRaises(ssparser.ParseError) as context:
+            ssparser.parse_data(PROGRAM)
+        self.assertEqual(len(context.exception.errors), 4)
+        self.assertTrue(str(context.exception).startswith("2:7: Syntax error at ':='\n"))
+
+    def test_end_of_input(self):
+        errors = []
+        self.assertIsNone(ssparser.parse_data("scalar xx =", errors))
+        self.assertEqual(str(errors[0]), "1:12: Syntax error at end of input")
+
+    def test_definition(self):
+        errors = []
+        tree = ssparser.parse_data("function Fn[] return scalar is\n  return := 1.0\nend\nprint_scalar 1.0", errors)
+        self.assertEqual([(error.line, error.column) for error in errors], [(2, 10)])
+        self.assertEqual(len(tree.children_statement_list), 1)
+
+    def test_token_that_cannot_follow_a_statement(self):
+        # The statement error rule takes no tokens, the function after it is skipped instead of looping forever.
+        errors = []
+        tree = ssparser.parse_data("scalar xx =\nfunction Fn[] return scalar is\n  return 1.0\nend\n"
+                                   "print_scalar 1.0\n", errors)
+        self.assertEqual(str(errors[0]), "2:1: Syntax error at 'function'")
+        self.assertEqual(tree.children_statement_list[-1].nodetype, "print_scalar")
+
+    def test_same_tokens_again(self):
+        # The skipped token of the previous parse must not be skipped at once when the same tokens are parsed again.
+        session = ssparser.Parser()
+        source = "print_scalar 1.0 +\nprint_scalar 1.0\n"
+        tokens = session.lexer.tokenize_region(source, 0, len(source), 1)
+        results = []
+        for _ in range(2):
+            errors = []
+            tree = session.parse_tokens(tokens, errors=errors)
+            results.append(([str(error) for error in errors], [node.nodetype for node in tree.children_statement_list]))
+        self.assertEqual(results[0], results[1])
+
+    def test_stream_columns(self):
+        # The stream is tokenized in chunks, the columns are still counted from the start of the line.
+        source = "print_scalar 1.0\n" * (sslexer.CHUNK_SIZE // 8) + "print_scalar := 1.0\n"
+        errors = []
+        ssparser.parse_stream(io.StringIO(source), errors)
+        self.assertEqual([(error.line, error.column) for error in errors], [(sslexer.CHUNK_SIZE // 8 + 1, 14)])
+
+    def test_errors_are_not_kept(self):
+        # A long-lived process parses many sources with the same sessions.
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda source: ssparser.parse_data(source, []),
+                                        [PROGRAM, "print_scalar 1.0"] * 20))
+        self.assertTrue(all(tree is not None for tree in results))
+        self.assertEqual(ssparser.parse_data("print_scalar 1.0").nodetype, "program")
+
+    def test_tokenize_still_raises(self):
+        with self.assertRaises(Exception):
+            sslexer.tokenize_data("scalar xx = 1.0 @")
+
+
+class SpanTest(TestCase):
+    def test_spans(self):
+        source = "scalar xx = 1.0\nprint_scalar !info! xx * (2.0 + Fn[xx])\n"
+        tree = ssparser.parse_data(source)
+        statement = tree.children_statement_list[0]
+        index = sslexer.LineIndex(source)
+        self.assertEqual(index.position(statement.lexpos), (2, 1))
+        # lexend is the start of the last token like in PLY.
+        self.assertEqual(source[statement.lexpos:statement.lexend], "print_scalar !info! xx * (2.0 + Fn[xx")
+        self.assertEqual(index.position(statement.child_info_string.lexpos), (2, 14))
+        call = statement.child_expression.child_right.child_right
+        self.assertEqual(call.nodetype, "function_call")
+        self.assertEqual(index.position(call.child_name.lexpos), (2, 33))
+        self.assertEqual(sssyntax.span(tree.children_function_or_variable_definition[0]), (0, 12))
+
+    def test_line_index(self):
+        source = "xx\n\nyy := 1.0\n"
+        index = sslexer.LineIndex(source)
+        for lexpos in range(len(source) + 1):
+            self.assertEqual(index.position(lexpos),
+                             (source.count("\n", 0, lexpos) + 1, sslexer.find_column(source, lexpos)))
+
+    def test_folded_literal_keeps_span(self):
+        tree = ssparser.parse_data("print_scalar 1.0 + 2.0")
+        ssoptimizer.fold_constants(tree)
+        self.assertEqual(sssyntax.span(tree.children_statement_list[0].child_expression), (13, 19))
+
+
+class SymbolTest(TestCase):
+    def names(self, tree):
+        return [node for node, _ in ssoptimizer.walk(tree) if hasattr(node, "symbol")]
+
+    def test_symbols(self):
+        tree = ssparser.parse_data("scalar xx = 1.0\nsheet SH = 2 * 2\nrange _r = range SH'A1..SH'B2\n"
+                                   "function Fn[aa : scalar, BB : sheet] return scalar is\n  return aa\nend\n"
+                                   "print_scalar xx + Fn[xx, SH]\n")
+        self.assertCountEqual(tree.symbols.names, ["xx", "SH", "_r", "Fn", "aa", "BB"])
+        for node in self.names(tree):
+            self.assertEqual(tree.symbols.names[node.symbol], node.value)
+        uses = [node.value for node in self.names(tree) if node.value == "xx"]
+        self.assertEqual(len(uses), 3)
+        self.assertTrue(all(value is uses[0] for value in uses))
+
+    def test_table_per_program(self):
+        first = ssparser.parse_data("scalar aa\nprint_scalar aa")
+        second = ssparser.parse_data("scalar bb\nprint_scalar bb")
+        self.assertEqual(first.symbols.names, ["aa"])
+        self.assertEqual(second.symbols.names, ["bb"])
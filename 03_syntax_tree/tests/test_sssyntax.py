@@ -0,0 +1,65 @@
+import contextlib
+import decimal
+import io
+from unittest import TestCase
+
+import ssparser
+import sssyntax as nodes
+import tree_print
+from main import read_file
+
+
+class SSSyntaxTest(TestCase):
+    def setUp(self):
+        self.tree = ssparser.parse_data(data=read_file("tests/code.sheetscript"))
+
+    def test_nodes_have_no_dict(self):
+        self.assertFalse(hasattr(self.tree, "__dict__"))
+        self.assertFalse(hasattr(self.tree.children_statement_list[0], "__dict__"))
+
+    def test_node_classes(self):
+        for nodetype, node_class in nodes.NODE_CLASSES.items():
+            self.assertEqual(node_class.nodetype, nodetype)
+        self.assertIs(nodes.NODE_CLASSES[nodes.TYPE_PRINT_SCALAR], nodes.PrintScalar)
+
+    def test_child_fields(self):
+        self.assertEqual(nodes.If.child_fields,
+                         ("child_condition", "children_then_statement_list", "children_else_statement_list"))
+        self.assertEqual(nodes.Ident.child_fields, ())
+
+    def test_unknown_child(self):
+        with self.assertRaises(AttributeError):
+            nodes.Op(value="+", child_middle=nodes.Ident(value="ab"))
+
+    def test_unset_value(self):
+        self.assertFalse(hasattr(nodes.Program(children_statement_list=[]), "value"))
+
+    def test_get_childvars(self):
+        while_node = self.tree.children_statement_list[4]
+        self.assertEqual(while_node.nodetype, nodes.TYPE_WHILE)
+        self.assertEqual([label for label, _ in tree_print.get_childvars(while_node)],
+                         ["condition", "statement_list[0]"])
+
+    def test_treeprint(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tree_print.treeprint(self.tree, "ascii")
+        self.assertIn("+--condition: op (<)", output.getvalue())
+
+    def test_sheet_row_numbers(self):
+        tree = ssparser.parse_data("sheet SH = { 1.5, counter + 1.0, -0.0, 2.0\n 3.0 }\nprint_sheet SH\n")
+        first, second = tree.children_function_or_variable_definition[0].child_sheet_init.children_sheet_init_list
+        self.assertEqual(list(first.numbers), [15, 0, 0, 20])
+        # -0.0 would lose its sign in the array.
+        self.assertEqual(sorted(first.expressions), [1, 2])
+        self.assertEqual([cell.nodetype for cell in first.children_simple_expr],
+                         [nodes.TYPE_DECIMAL, nodes.TYPE_OP, nodes.TYPE_DECIMAL, nodes.TYPE_DECIMAL])
+        self.assertEqual(str(first.children_simple_expr[3].value), "2.0")
+        self.assertEqual([label for label, _ in tree_print.get_childvars(second)], [""])
+
+    def test_sheet_row_set_cell(self):
+        row = nodes.SheetRow([nodes.Ident(value="counter"), nodes.Ident(value="total")])
+        cells = row.children_simple_expr
+        cells[0] = nodes.DecimalLiteral(value=decimal.Decimal("-2.5"))
+        self.assertEqual(list(row.numbers), [-25, 0])
+        self.assertEqual(list(row.expressions), [1])
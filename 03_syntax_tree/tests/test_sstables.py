@@ -0,0 +1,53 @@
+import os
+import pickle
+from unittest import TestCase
+
+import ply.yacc
+
+import ssparser
+import sstables
+
+
+class SSTablesTest(TestCase):
+    def test_rules_key_is_stable(self):
+        self.assertEqual(sstables.rules_key(vars(ssparser), "p_"), sstables.rules_key(vars(ssparser), "p_"))
+
+    def test_rules_key_changes_with_docstring(self):
+        def p_rule(p):
+            """rule : IDENT"""
+
+        def p_rule_changed(p):
+            """rule : IDENT
+                    | DECIMAL_LITERAL"""
+
+        p_rule_changed.__name__ = "p_rule"
+        self.assertNotEqual(sstables.rules_key({"tokens": ["IDENT"], "p_rule": p_rule}, "p_"),
+                            sstables.rules_key({"tokens": ["IDENT"], "p_rule": p_rule_changed}, "p_"))
+
+    def test_parser_table_is_written(self):
+        if not sstables.enabled:
+            self.skipTest("table cache is disabled")
+        key: str = sstables.rules_key(vars(ssparser), "p_")
+        self.assertTrue(os.path.exists(sstables.parser_table(key)))
+
+    def test_partial_table_is_generated_again(self):
+        if not sstables.enabled:
+            self.skipTest("table cache is disabled")
+        key: str = sstables.rules_key(vars(ssparser), "p_")
+        path: str = sstables.parser_table(key, name="test_parsetab")
+        # Like a table that another process is still writing.
+        with open(sstables.parser_table(key), "rb") as table, open(path, "wb") as partial:
+            partial.write(table.read(1000))
+        try:
+            parser = sstables.build_parser(
+                lambda picklefile: ply.yacc.yacc(module=ssparser, debug=False, optimize=True, picklefile=picklefile,
+                                                 errorlog=ply.yacc.NullLogger()),
+                key, name="test_parsetab")
+            self.assertEqual(parser.parse("print_scalar 1.0", lexer=ssparser.get_session().lexer).nodetype, "program")
+            with open(path, "rb") as table:
+                # The version, method, signature, actions, gotos and productions are all there.
+                for _ in range(6):
+                    pickle.load(table)
+            self.assertEqual([name for name in os.listdir(sstables.DIRECTORY) if name.startswith("tmp_")], [])
+        finally:
+            os.remove(path)
@@ -0,0 +1,53 @@
+import contextlib
+import io
+from unittest import TestCase
+
+import ssparser
+import tree_print
+
+
+class TreePrintTest(TestCase):
+    def setUp(self):
+        self.tree = ssparser.parse_data(data="print_scalar !x! 1.0 + value")
+
+    def test_unicode(self):
+        self.assertEqual(tree_print.treeformat(self.tree), "\n".join([
+            "program",
+            "└──statement_list[0]: print_scalar",
+            "   ├──info_string: info_string (x)",
+            "   └──expression: op (+)",
+            "      ├──left: decimal (1.0)",
+            "      └──right: IDENT (value)",
+        ]) + "\n")
+
+    def test_dot(self):
+        # The edge to a child comes after the subtree of the child.
+        self.assertEqual(tree_print.treeformat(self.tree, "dot").splitlines()[-12:], [
+            'N0 [label="program"]',
+            'N1 [label="print_scalar"]',
+            'N2 [label="info_string (x)"]',
+            'N1->N2 [label="info_string"]',
+            'N3 [label="op (+)"]',
+            'N4 [label="decimal (1.0)"]',
+            'N3->N4 [label="left"]',
+            'N5 [label="IDENT (value)"]',
+            'N3->N5 [label="right"]',
+            'N1->N3 [label="expression"]',
+            'N0->N1 [label="statement_list[0]"]',
+            '}',
+        ])
+
+    def test_print_to_stdout_and_file(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tree_print.treeprint(self.tree, "ascii")
+        to_file = io.StringIO()
+        tree_print.treeprint(self.tree, "ascii", file=to_file)
+        self.assertEqual(output.getvalue(), to_file.getvalue())
+        self.assertEqual(output.getvalue(), tree_print.treeformat(self.tree, "ascii"))
+
+    def test_deep_tree(self):
+        # The expression is nested 5000 levels deep, more than the recursion limit.
+        tree = ssparser.parse_data(data="print_scalar " + " + ".join(["value"] * 5000))
+        for outtype in ("unicode", "ascii", "dot"):
+            self.assertEqual(tree_print.treeformat(tree, outtype).count("IDENT (value)"), 5000)
@@ -2,6 +2,9 @@
 # ----------------------------------------------------------------------
 # I did not write this, this was provided as a part of assignment.
 # https://course-gitlab.tuni.fi/compcs400-principles-of-programming-languages_2020-2021/public_examples/-/blob/master/03_syntax_tree/tree_print.py
+# The printers were changed later to use an explicit stack instead of recursion and to write in batches.
+
+import sys
 
 # Values to control the module's working
 
@@ -11,11 +14,34 @@ child_prefix_default = "child_"
 children_prefix_default = "children_"
 value_attr = "value"
 type_attr = "nodetype"
+# Nodes with __slots__ have no __dict__, they list their child attribute names in this tuple
+child_fields_attr = "child_fields"
+# Default of getattr for attributes that are not set
+unset = object()
 
 
 # Finding and creating a list of all children nodes of a node, based on
 # attribute names of a node
 
+# The labels of the child_fields of node classes, the attribute names are the same for every node of a class
+_field_labels = {}
+
+
+def field_labels(cls, fields, child_prefix, children_prefix):
+    '''Return (attribute name, label, is list) of the child attributes of a node class'''
+    key = (cls, child_prefix, children_prefix)
+    labels = _field_labels.get(key)
+    if labels is None:
+        labels = []
+        for name in fields:
+            if name.startswith(child_prefix):
+                labels.append((name, name[len(child_prefix):], False))
+            elif name.startswith(children_prefix):
+                labels.append((name, name[len(children_prefix):], True))
+        labels = _field_labels[key] = tuple(labels)
+    return labels
+
+
 def get_childvars(node, child_prefix=child_prefix_default,
                   children_prefix=children_prefix_default):
     '''Return all children nodes of a tree node
@@ -30,10 +56,32 @@ def get_childvars(node, child_prefix=child_prefix_default,
     (in which case None is used as the second element, as there is no child).'''
 
     childvars = []
+    # Nodes that list their children don't have to be searched, unset attributes are skipped
+    fields = getattr(node, child_fields_attr, None)
+    if fields is not None:
+        for name, label, is_list in field_labels(type(node), fields, child_prefix, children_prefix):
+            val = getattr(node, name, unset)
+            if val is unset:
+                continue
+            if not is_list:
+                childvars.append((label, val))
+            elif val is None:
+                childvars.append((label + "[NONE stored instead of a list!!!]", None))
+            elif not hasattr(val, "__iter__"):
+                childvars.append((label + "[Not a list!!!]", None))
+            elif not val:
+                childvars.append((label + "[EMPTY]", None))
+            else:
+                childvars.extend([(f"{label}[{i}]", child) for (i, child) in enumerate(val)])
+        return childvars
     # Only search for attributes if we have an object
     if hasattr(node, "__dict__"):
+        attributes = vars(node).items()
+    else:
+        attributes = []
+    if attributes:
         # Iterate though all attributes of the node object
-        for name, val in vars(node).items():
+        for name, val in attributes:
             # An attribute containing one child node
             if name.startswith(child_prefix):
                 label = name[len(child_prefix):]
@@ -53,7 +101,7 @@ def get_childvars(node, child_prefix=child_prefix_default,
                         childvars.append((label + "[EMPTY]", None))
                     # A non-empty list/iterable
                     else:
-                        childvars.extend([(label + "[" + str(i) + "]", child) for (i, child) in enumerate(val)])
+                        childvars.extend([(f"{label}[{i}]", child) for (i, child) in enumerate(val)])
     return childvars
 
 
@@ -98,8 +146,26 @@ def dotnodeid(nodenum):
     return "N" + str(nodenum)
 
 
-def treeprint_indent(node, outtype="unicode", label="", first_indent="", indent=""):
-    '''Print out an ASCII/Unicode version of a subtree in a tree.
+# The printers below don't recurse, they keep the nodes still to print in an explicit stack so that
+# deep trees don't hit the recursion limit. They yield the lines instead of printing them one by one.
+
+# How many characters are collected to one write in treeprint
+write_batch_size = 1 << 16
+
+
+def nodetext(node):
+    '''The nodetype and the value in parenthesis, or the whole node if it has no node type'''
+    text = getattr(node, type_attr, unset)
+    if text is unset:
+        text = "??? '" + str(node) + "' ???"
+    value = getattr(node, value_attr, unset)
+    if value is not unset:
+        text += " (" + str(value) + ")"
+    return text
+
+
+def iter_indent_lines(node, outtype="unicode", label="", first_indent="", indent=""):
+    '''Generate the lines of an ASCII/Unicode version of a subtree in a tree.
 
     node = the root of the subtree
     outtype = unicode/ascii
@@ -107,98 +173,135 @@ def treeprint_indent(node, outtype="unicode", label="", first_indent="", indent=
     first_indent = what to print at the beginning of the first line (indentation)
     indent = what to print at the beginning of the rest of the lines (indentation)'''
 
-    # Add label (if any) to the first line after the indentation
-    if label:
-        first_indent += label + ": "
-    if not node:
-        # If node is None, just print NONE
-        print(first_indent + "NONE")
+    if outtype == "unicode":
+        child_indent, normal_indent = child_indent_uni, normal_indent_uni
+        last_child_indent, last_normal_indent = last_child_indent_uni, last_normal_indent_uni
     else:
-        # If node has node type attribute, print that, otherwise try to print the whole
-        # node take help in finding the error
-        if hasattr(node, type_attr):
-            print(first_indent + getattr(node, type_attr), end="")
-        else:
-            print(first_indent + "??? '" + str(node) + "' ???", end="")
-        # If node has a value attribute, print the value of the node in parenthesis
-        if hasattr(node, value_attr):
-            print(" (" + str(node.value) + ")")
-        else:
-            print()
-        # Get all children of the node and iterate through them
-        childvars = get_childvars(node)
-        i = len(childvars)
-        for name, value in childvars:
-            i -= 1
-            if i > 0:
-                # Not the last child, use normal indentation
-                if outtype == "unicode":
-                    first_indent = child_indent_uni
-                    rest_indent = normal_indent_uni
-                else:
-                    first_indent = child_indent_asc
-                    rest_indent = normal_indent_asc
-            else:
+        child_indent, normal_indent = child_indent_asc, normal_indent_asc
+        last_child_indent, last_normal_indent = last_child_indent_asc, last_normal_indent_asc
+
+    # The indentation pieces of the ancestors are kept in one list, a node at depth d is indented by the
+    # first d pieces, so the stack holds only the depth instead of the indentation strings.
+    path = [indent]
+    stack = [(node, label, 0, False)]
+    while stack:
+        node, label, depth, last = stack.pop()
+        if depth:
+            del path[depth:]
+            prefix = "".join(path)
+            if last:
                 # The last child, use indentation for that case
-                if outtype == "unicode":
-                    first_indent = last_child_indent_uni
-                    rest_indent = last_normal_indent_uni
-                else:
-                    first_indent = last_child_indent_asc
-                    rest_indent = last_normal_indent_asc
-            # Recursively print the child subtrees, adding indentation
-            treeprint_indent(value, outtype, name, indent + first_indent,
-                             indent + rest_indent)
+                first_indent = prefix + last_child_indent
+                path.append(last_normal_indent)
+            else:
+                first_indent = prefix + child_indent
+                path.append(normal_indent)
+        # Add label (if any) to the first line after the indentation
+        if label:
+            first_indent += label + ": "
+        if not node:
+            # If node is None, just print NONE
+            yield first_indent + "NONE"
+            continue
+        yield first_indent + nodetext(node)
+        # The children are pushed in reverse so that the first child is printed first
+        childvars = get_childvars(node)
+        last = True
+        for name, value in reversed(childvars):
+            stack.append((value, name, depth + 1, last))
+            last = False
 
 
-def treeprint_dot(node, nodenum, nodecount):
-    '''Print a subtree in dot format.
+def iter_dot_lines(node, nodenum=0, nodecount=None):
+    '''Generate the lines of a subtree in dot format.
 
     nodenum = number of the node (for dot id generation)
     nodecount = a list containing the maximum used id'''
 
-    nodeline = dotnodeid(nodenum)
-    if not node:
-        # None is output as an ellipse with label NONE
-        nodeline += ' [shape="ellipse", label="NONE"]'
-        print(nodeline)
-    else:
-        # Normal nodes use the default shape
-        nodeline += ' [label="'
-        # If node has node type attribute, print that, otherwise try to print the whole
-        # node take help in finding the error
-        if hasattr(node, type_attr):
-            nodeline += getattr(node, type_attr)
-        else:
-            nodeline += "??? '" + str(node) + "' ???"
-        # If node has a value attribute, output the value in parenthesis
-        if hasattr(node, value_attr):
-            nodeline += " (" + str(node.value) + ")"
-        nodeline += '"]'
-        print(nodeline)
-        # Get all children of the node and iterate through them
-        childvars = get_childvars(node)
-        for name, value in childvars:
+    if nodecount is None:
+        nodecount = [nodenum]
+    # The stack has nodes to print as (node, number) and the children still to number as (parent number,
+    # label, child), a child gets its number when its older siblings have been printed.
+    # The edge lines are pushed as strings so that they are printed after the subtree of the child.
+    stack = [(node, nodenum)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+            continue
+        if len(item) == 3:
+            parentnum, name, value = item
             # Number the child by one more than current maximum (and update maximum)
             nodecount[0] += 1
             childnum = nodecount[0]
-            # Recursively print the child subtrees
-            treeprint_dot(value, childnum, nodecount)
-            # Output the named connection between parent and child
-            print(dotnodeid(nodenum) + "->" + dotnodeid(childnum) + ' [label="' + name + '"]')
+            # Output the named connection between parent and child after the child subtree
+            stack.append(dotnodeid(parentnum) + "->" + dotnodeid(childnum) + ' [label="' + name + '"]')
+            stack.append((value, childnum))
+            continue
+        node, nodenum = item
+        if not node:
+            # None is output as an ellipse with label NONE
+            yield dotnodeid(nodenum) + ' [shape="ellipse", label="NONE"]'
+            continue
+        # Normal nodes use the default shape
+        yield dotnodeid(nodenum) + ' [label="' + nodetext(node) + '"]'
+        for name, value in reversed(get_childvars(node)):
+            stack.append((nodenum, name, value))
+
+
+def iter_lines(rootnode, outtype="unicode"):
+    '''Generate the lines of a tree, see treeprint for the output types'''
+    if outtype == "dot":
+        yield dot_preamble
+        yield from iter_dot_lines(rootnode)
+        yield dot_postamble
+    else:
+        yield from iter_indent_lines(rootnode, outtype)
+
 
+def treeprint_indent(node, outtype="unicode", label="", first_indent="", indent=""):
+    '''Print out an ASCII/Unicode version of a subtree in a tree, see iter_indent_lines'''
+    write_lines(iter_indent_lines(node, outtype, label, first_indent, indent))
+
+
+def treeprint_dot(node, nodenum, nodecount):
+    '''Print a subtree in dot format, see iter_dot_lines'''
+    write_lines(iter_dot_lines(node, nodenum, nodecount))
+
+
+def write_lines(lines, file=None):
+    '''Write the lines in batches instead of calling print for every line'''
+    if file is None:
+        file = sys.stdout
+    batch = []
+    size = 0
+    for line in lines:
+        batch.append(line)
+        size += len(line) + 1
+        if size >= write_batch_size:
+            batch.append("")
+            file.write("\n".join(batch))
+            batch = []
+            size = 0
+    if batch:
+        batch.append("")
+        file.write("\n".join(batch))
 
-def treeprint(rootnode, outtype="unicode"):
+
+def treeformat(rootnode, outtype="unicode"):
+    '''Returns the printout of treeprint as a string'''
+    lines = list(iter_lines(rootnode, outtype))
+    lines.append("")
+    return "\n".join(lines)
+
+
+def treeprint(rootnode, outtype="unicode", file=None):
     '''Prints out a tree, given its root.
 
        The second argument is the output type:
        "unicode" (default) prints a text-version of the tree using Unicode block characters.
        "ascii" prints an ASCII-only version, with |, -, +.
        "dot" prints a tree in dot format (can be converted to a graphical tree
-       using dot command in graphwiz).'''
-    if outtype == "dot":
-        print(dot_preamble)
-        treeprint_dot(rootnode, 0, [0])
-        print(dot_postamble)
-    else:
-        treeprint_indent(rootnode, outtype)
+       using dot command in graphwiz).
+       The lines are written to file, standard output by default.'''
+    write_lines(iter_lines(rootnode, outtype), file)
@@ -0,0 +1,39 @@
+"""
+Compares the interpreter and the compiled programs on the loop-heavy programs.
+
+Run from the phase directory with `python -m benchmarks.bench_compiler [iterations]`.
+The compile time includes parsing, the cached compile is the second compile of the same source.
+"""
+import io
+import sys
+import time
+
+import sscompiler
+import ssinterpreter
+import ssparser
+from benchmarks.programs import loop_programs
+
+
+def main(iterations: int):
+    for name, program in loop_programs(iterations).items():
+        tree = ssparser.parse_data(program)
+        start: float = time.perf_counter()
+        ssinterpreter.run(tree, output=io.StringIO())
+        interpreted: float = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = sscompiler.compile_data(program)
+        compiling: float = time.perf_counter() - start
+        start = time.perf_counter()
+        sscompiler.compile_data(program)
+        cached: float = time.perf_counter() - start
+        start = time.perf_counter()
+        compiled.run(output=io.StringIO())
+        running: float = time.perf_counter() - start
+
+        print(f"{name:>15}: interpreted {interpreted:6.3f} s, compiled {running:6.3f} s "
+              f"({interpreted / running:4.1f}x), compile {compiling * 1000:5.1f} ms, cached {cached * 1000:5.3f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,27 @@
+"""
+Runs loop-heavy programs with the interpreter.
+
+Run from the phase directory with `python -m benchmarks.bench_interpreter [iterations]`.
+"""
+import io
+import sys
+import time
+
+import ssinterpreter
+import ssparser
+from benchmarks.programs import loop_programs
+
+
+def main(iterations: int):
+    for name, program in loop_programs(iterations).items():
+        tree = ssparser.parse_data(program)
+        output = io.StringIO()
+        start: float = time.perf_counter()
+        ssinterpreter.run(tree, output=output)
+        elapsed: float = time.perf_counter() - start
+        print(f"{name:>15}: {elapsed:6.3f} s, {iterations / elapsed:10.0f} iterations/s, "
+              f"result {output.getvalue().strip()}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
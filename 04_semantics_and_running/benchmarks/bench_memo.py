@@ -0,0 +1,46 @@
+"""
+Compares running with and without memoizing the pure functions.
+
+Run from the phase directory with `python -m benchmarks.bench_memo [depth] [rows]`.
+`fibonacci` is the naive recursion, `shares` divides every cell by the sum of its column, which calls the sum
+function with the same range for every row, see `memo_programs`. The best of a few rounds is reported.
+"""
+import io
+import sys
+import time
+from typing import Callable, List
+
+import sscompiler
+import ssinterpreter
+import ssparser
+from benchmarks.programs import memo_programs
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(depth: int, rows: int):
+    for name, program in memo_programs(depth, rows).items():
+        tree = ssparser.parse_data(program)
+        compiled = sscompiler.compile_data(program)
+        memos: List[ssinterpreter.Memo] = ssinterpreter.run(tree, output=io.StringIO())
+        print(f"{name}: {', '.join(map(str, memos))}")
+        for mode, run in (("interpreted", lambda memo_size: ssinterpreter.run(tree, output=io.StringIO(),
+                                                                              memo_size=memo_size)),
+                          ("compiled", lambda memo_size: compiled.run(output=io.StringIO(), memo_size=memo_size))):
+            plain: float = best(lambda: run(0))
+            memoized: float = best(lambda: run(ssinterpreter.MEMO_SIZE))
+            print(f"  {mode:>11}: {plain * 1000:9.2f} ms, memoized {memoized * 1000:7.2f} ms "
+                  f"({plain / memoized:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 22, int(sys.argv[2]) if len(sys.argv) > 2 else 999)
@@ -0,0 +1,79 @@
+"""
+Compares the representations of scalars: floats, the decimals and the tenths of the exact mode.
+
+Run from the phase directory with `python -m benchmarks.bench_numbers [iterations]`.
+First each operator is timed alone on the same values in each representation, then the loop-heavy programs
+are run with the interpreter and compiled in each. The best of a few rounds is reported.
+"""
+import decimal
+import io
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+import sscompiler
+import ssinterpreter
+import ssparser
+from benchmarks.programs import loop_programs
+
+ROUNDS = 5
+REPRESENTATIONS: Dict[str, ssinterpreter.Numbers] = {
+    "float": ssinterpreter.FloatNumbers(),
+    "decimal": ssinterpreter.DecimalNumbers(),
+    "tenths": ssinterpreter.FixedNumbers(),
+}
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def apply(operator: Callable[[object, object], object], lefts: List[object], rights: List[object]):
+    for left, right in zip(lefts, rights):
+        operator(left, right)
+
+
+def operators(count: int):
+    generator = random.Random(21)
+    # The values as literals so that each representation converts the same numbers.
+    texts: List[str] = [f"{generator.randint(-99999, 99999) / 10:.1f}" for _ in range(count)]
+    texts = [text if text not in ("0.0", "-0.0") else "0.1" for text in texts]
+    print(f"{'operator':>15}  " + "  ".join(f"{name:>12}" for name in REPRESENTATIONS) + "  (M operations/s)")
+    for symbol in ("+", "*", "/", "<"):
+        rates: List[float] = []
+        for numbers in REPRESENTATIONS.values():
+            values: List[object] = [numbers.literal(decimal.Decimal(text)) for text in texts]
+            rights: List[object] = values[1:] + values[:1]
+            operator = numbers.operators()[symbol]
+            rates.append(count / best(lambda: apply(operator, values, rights)) / 1e6)
+        print(f"{symbol:>15}  " + "  ".join(f"{rate:12.2f}" for rate in rates))
+
+
+def programs(iterations: int):
+    for title in ("interpreted", "compiled"):
+        print(f"{title:>15}  " + "  ".join(f"{name:>12}" for name in REPRESENTATIONS) + "  (s)")
+        for name, program in loop_programs(iterations).items():
+            times: List[float] = []
+            for numbers in REPRESENTATIONS.values():
+                tree = ssparser.parse_data(program)
+                if title == "compiled":
+                    compiled = sscompiler.Compiler(numbers=numbers).compile(tree)
+                    times.append(best(lambda: compiled.run(output=io.StringIO())))
+                else:
+                    times.append(best(lambda: ssinterpreter.run(tree, output=io.StringIO(), numbers=numbers)))
+            print(f"{name:>15}  " + "  ".join(f"{elapsed:12.3f}" for elapsed in times))
+
+
+def main(iterations: int):
+    operators(iterations)
+    programs(iterations)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,52 @@
+"""
+Compares running a model again with recalculating it after one input cell changes.
+
+Run from the phase directory with `python -m benchmarks.bench_recalc [rows]`.
+The model has three formulas per row and the totals of the columns, see `model_program`. The first run of the
+workbook records the dependencies, which costs more than a plain run. A change of one input cell then runs
+only the formulas of its row and the totals. The best of a few rounds is reported.
+"""
+import io
+import sys
+import time
+from typing import Callable, List
+
+import ssinterpreter
+import ssparser
+import ssrecalc
+from benchmarks.programs import model_program
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(rows: int):
+    tree = ssparser.parse_data(model_program(rows))
+    run: float = best(lambda: ssinterpreter.run(tree, output=io.StringIO()))
+    traced: float = best(lambda: ssrecalc.Workbook(tree, output=io.StringIO()))
+    workbook: ssrecalc.Workbook = ssrecalc.Workbook(tree, output=io.StringIO())
+    units: int = len(workbook.units)
+    counts: List[int] = []
+
+    def change():
+        workbook.set_cell("IN", f"A{rows // 2}", "2.5")
+        counts.append(workbook.recalculate())
+
+    recalculated: float = best(change)
+    print(f"{rows} rows, {units} statements")
+    print(f"  run:          {run * 1000:8.2f} ms")
+    print(f"  first run:    {traced * 1000:8.2f} ms, records the dependencies ({traced / run:.1f}x)")
+    print(f"  recalculate:  {recalculated * 1000:8.2f} ms, {counts[-1]} statements run "
+          f"({run / recalculated:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 999)
@@ -0,0 +1,42 @@
+"""
+Measures the semantic analysis on programs of growing size to show that it is linear in the program.
+
+Run from the phase directory with `python -m benchmarks.bench_semantics [lines]`.
+Each program is parsed once and analysed a few times, a new tree is not needed since the analysis only sets
+the same annotations again. The best of the rounds is reported as time per line and per node, which should
+stay the same when the program grows.
+"""
+import sys
+import time
+from typing import Callable, List
+
+import ssoptimizer
+import ssparser
+import sssemantics
+from benchmarks.programs import analysis_program
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(lines: int):
+    for size in (lines // 4, lines // 2, lines):
+        program: str = analysis_program(size)
+        tree = ssparser.parse_data(program)
+        count: int = ssoptimizer.count_nodes(tree)
+        line_count: int = program.count("\n")
+        elapsed: float = best(lambda: sssemantics.analyze(tree))
+        print(f"{line_count:>7} lines, {count:>8} nodes: {elapsed:6.3f} s, "
+              f"{elapsed / line_count * 1e6:5.2f} us/line, {elapsed / count * 1e6:5.2f} us/node")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
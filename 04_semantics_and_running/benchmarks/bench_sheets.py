@@ -0,0 +1,40 @@
+"""
+Runs programs on 1M-cell sheets in the float and the exact mode.
+
+Run from the phase directory with `python -m benchmarks.bench_sheets`.
+The peak memory is measured with tracemalloc in a separate run since tracing slows down the allocations,
+numpy reports its arrays to it.
+"""
+import io
+import time
+import tracemalloc
+
+import ssinterpreter
+import ssparser
+from benchmarks.programs import sheet_programs
+
+
+def measure(program: str, exact: bool):
+    """
+    :return: Tuple (seconds, peak MB).
+    """
+    tree = ssparser.parse_data(program)
+    start: float = time.perf_counter()
+    ssinterpreter.run(tree, output=io.StringIO(), exact=exact)
+    elapsed: float = time.perf_counter() - start
+    tracemalloc.start()
+    ssinterpreter.run(tree, output=io.StringIO(), exact=exact)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    print(f"{'':>15}  {'float64':>20}  {'exact':>20}")
+    for name, program in sheet_programs().items():
+        results = [measure(program, exact) for exact in (False, True)]
+        print(f"{name:>15}: " + "  ".join(f"{elapsed:7.3f} s {peak:7.1f} MB" for elapsed, peak in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compares running the independent for loops with arrays and cell by cell.
+
+Run from the phase directory with `python -m benchmarks.bench_vector [columns]`.
+The loops go through sheets of 999 rows, by default 702 columns which is the largest range the coordinates can
+refer to (701298 cells), see `array_program`. The best of a few rounds is reported.
+"""
+import io
+import sys
+import time
+from typing import Callable, List
+
+import sscompiler
+import ssinterpreter
+import ssparser
+from benchmarks.programs import array_program
+
+ROUNDS = 5
+
+
+def best(function: Callable[[], object]) -> float:
+    times: List[float] = []
+    for _ in range(ROUNDS):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(columns: int):
+    program: str = array_program(columns)
+    tree = ssparser.parse_data(program)
+    print(f"{columns * 999} cells, 3 loops")
+    for exact in (False, True):
+        compiled = sscompiler.compile_data(program, exact=exact)
+        for mode, run in (("interpreted", lambda vectorize: ssinterpreter.run(tree, output=io.StringIO(), exact=exact,
+                                                                              vectorize=vectorize)),
+                          ("compiled", lambda vectorize: compiled.run(output=io.StringIO(), vectorize=vectorize))):
+            cells: float = best(lambda: run(False))
+            arrays: float = best(lambda: run(True))
+            print(f"  {'exact' if exact else 'float'} {mode:>11}: cell by cell {cells * 1000:9.1f} ms, "
+                  f"arrays {arrays * 1000:7.1f} ms ({cells / arrays:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 702)
@@ -0,0 +1,185 @@
+"""
+Loop-heavy SheetScript programs for the runtime benchmarks.
+"""
+from typing import Dict
+
+from ssrecalc import format_coordinate
+
+
+def loop_programs(iterations: int) -> Dict[str, str]:
+    """
+    :param iterations: Roughly the number of loop iterations in each program.
+    :return: The programs by name.
+    """
+    # The sheets have 1000 cells.
+    rounds: int = max(iterations // 1000, 1)
+    return {
+        "while counter": f"""
+scalar counter = 0.0
+while counter < {iterations}.0 do
+  counter := counter + 1.0
+done
+print_scalar counter
+""",
+        "arithmetic": f"""
+scalar counter = 0.0
+scalar total = 0.0
+while counter < {iterations}.0 do
+  total := total + counter * 0.5 - counter / 4.0
+  if total > 1000.0 then total := 0.0 endif
+  counter := counter + 1.0
+done
+print_scalar total
+""",
+        "function calls": f"""
+function Step[value : scalar, limit : scalar] return scalar is
+  if value < limit then return value + 1.0 endif
+  return value
+end
+scalar counter = 0.0
+while counter < {iterations}.0 do
+  counter := Step[counter, {iterations}.0]
+done
+print_scalar counter
+""",
+        "for over cells": f"""
+sheet SH = 100 * 10
+sheet OTHER = 100 * 10
+range _other = range OTHER'A1..OTHER'CV10
+scalar round = 0.0
+while round < {rounds}.0 do
+  for range SH'A1..SH'CV10, _other do
+    $ := $ + $:_other + 1.0
+  done
+  round := round + 1.0
+done
+print_scalar SH'CV10
+""",
+    }
+
+
+def sheet_programs() -> Dict[str, str]:
+    """
+    :return: Programs on sheets of 1000 * 1000 cells by name.
+    """
+    # The coordinates reach only 702 columns (ZZ) and 999 rows, so the largest range has 701298 cells.
+    sheet: str = "sheet SH = 1000 * 1000\n"
+    return {
+        "define": sheet + "print_scalar SH'A1\n",
+        "copy": sheet + "sheet OTHER\nOTHER := SH\n",
+        "count range": sheet + "print_scalar #range SH'A1..SH'ZZ999\n",
+        "move range": sheet + "range _r = range SH'A1..SH'ZZ999\nprint_scalar #_r[298, 1]\n",
+        "print range": sheet + "print_range range SH'A1..SH'ZZ999\n",
+        "for over range": sheet + """
+scalar value = 0.0
+for range SH'A1..SH'ZZ100 do
+  value := value + 0.5
+  $ := value
+done
+print_scalar SH'ZZ100
+""",
+    }
+
+
+def analysis_program(lines: int) -> str:
+    """
+    :param lines: Roughly the number of lines in the program.
+    :return: A program of many small functions and statements calling them, for the semantic analysis.
+    """
+    # Each function and the statements calling it take 12 lines.
+    functions: int = max(lines // 12, 1)
+    parts = ["sheet SH = 10 * 10\nrange _area = range SH'A1..SH'B2\nscalar total = 0.0\n"]
+    for index in range(functions):
+        parts.append(f"""function Step{index}[value : scalar, _cells : range] return scalar is
+  scalar local = value * 2.0
+  for _cells do
+    local := local + $
+  done
+  return local + #_cells
+end
+""")
+    for index in range(functions):
+        parts.append(f"""total := Step{index}[total, _area] - SH'A1
+if total > 100.0 then
+  total := Step{index // 2}[1.0, range SH'A1..SH'B2]
+endif
+SH'B2 := total / 2.0
+""")
+    return "".join(parts)
+
+
+def model_program(rows: int) -> str:
+    """
+    :param rows: The number of rows in the sheets, at most 999 since the coordinates have three digits.
+    :return: A spreadsheet-like model: every output cell is a formula of input cells, and the totals of
+        the columns are computed with a function.
+    """
+    parts = [f"sheet IN = 4 * {rows}\nsheet OUT = 4 * {rows}\nsheet TOTAL = 4 * 1\nscalar rate = 1.5\n",
+             """function Sum[_cells : range] return scalar is
+  scalar total = 0.0
+  for _cells do total := total + $ done
+  return total
+end
+"""]
+    for row in range(1, rows + 1):
+        parts.append(f"OUT'A{row} := IN'A{row} * rate + IN'B{row}\n"
+                     f"OUT'B{row} := OUT'A{row} - IN'C{row} / 2.0\n"
+                     f"if IN'D{row} > 0.0 then OUT'C{row} := OUT'B{row} * IN'D{row} endif\n")
+    for column in "ABC":
+        parts.append(f"TOTAL'{column}1 := Sum[range OUT'{column}1..OUT'{column}{rows}]\n")
+    parts.append("print_sheet TOTAL\n")
+    return "".join(parts)
+
+
+def memo_programs(depth: int, rows: int) -> Dict[str, str]:
+    """
+    :param depth: The argument of the recursion.
+    :param rows: The number of rows in the sheets, at most 999.
+    :return: Programs that call pure functions with the same arguments again, by name.
+    """
+    return {
+        "fibonacci": f"""
+function Fib[num : scalar] return scalar is
+  if num < 2.0 then return num endif
+  return Fib[num - 1.0] + Fib[num - 2.0]
+end
+print_scalar Fib[{depth}.0]
+""",
+        "shares": f"""
+sheet IN = 1 * {rows}
+sheet OUT = 1 * {rows}
+range _in = range IN'A1..IN'A{rows}
+range _out = range OUT'A1..OUT'A{rows}
+scalar value = 1.0
+function Sum[_cells : range] return scalar is
+  scalar total = 0.0
+  for _cells do total := total + $ done
+  return total
+end
+for _in do
+  $ := value
+  value := value + 1.0
+done
+for _out, _in do $ := $:_in * 100.0 / Sum[_in] done
+print_scalar Sum[_out]
+""",
+    }
+
+
+def array_program(columns: int) -> str:
+    """
+    :param columns: The number of columns in the sheets of 999 rows, at most 702 (ZZ) which gives 701298 cells.
+    :return: Loops over whole sheets that only write `$`, the independent loops that run with arrays.
+    """
+    last: str = format_coordinate(998, columns - 1)
+    return f"""
+sheet IN = {columns} * 999
+sheet OUT = {columns} * 999
+range _in = range IN'A1..IN'{last}
+range _out = range OUT'A1..OUT'{last}
+scalar rate = 1.5
+for _in do $ := 2.5 done
+for _out, _in do $ := $:_in * rate + 0.5 done
+for _out do $ := ($ > 4.0) * $ / 3.0 - IN'A1 done
+print_scalar OUT'{last}
+"""
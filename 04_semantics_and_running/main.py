@@ -0,0 +1,117 @@
+import codecs
+import sys
+from typing import List
+
+import ssbinary
+import sscompiler
+import ssinterpreter
+import ssoptimizer
+import ssparser
+import sssemantics
+import tree_print
+
+
+def read_file(filename: str):
+    with codecs.open(filename, 'r', encoding='utf-8') as INFILE:
+        return INFILE.read()
+
+
+def report_errors(error: ssparser.ParseError):
+    """
+    Prints all the lexical and syntax errors of the program, nothing is run if there are any.
+    """
+    for source_error in error.errors:
+        print(f"Error: {source_error}")
+    raise SystemExit
+
+
+def report_semantic_errors(error: sssemantics.SemanticError, filename: str, binary: bool):
+    """
+    Prints all the semantic errors, with the line and column if the source is available.
+    """
+    messages = [message for _, message in error.errors] if binary else error.located(read_file(filename))
+    for message in messages:
+        print(f"Error: {message}")
+    raise SystemExit
+
+
+def report_memos(memos: List[ssinterpreter.Memo]):
+    for memo in memos:
+        print(f"Memo {memo}", file=sys.stderr)
+
+
+def run_file(filename: str, tree: bool = False, exact: bool = False, compiled: bool = False, fold: bool = False,
+             memo: bool = False):
+    # A tree saved with `main.py --save` of phase 3 is loaded without parsing.
+    binary: bool = ssbinary.is_binary(filename)
+    if compiled and not tree:
+        try:
+            if binary:
+                memos = sscompiler.compile_tree(ssbinary.load(filename), exact=exact).run()
+            else:
+                memos = sscompiler.run(read_file(filename), exact=exact)
+            if memo:
+                report_memos(memos)
+        except ssinterpreter.ExecutionError as error:
+            print(f"Error: {error}")
+            raise SystemExit
+        except ssparser.ParseError as error:
+            report_errors(error)
+        except sssemantics.SemanticError as error:
+            report_semantic_errors(error, filename, binary)
+        return
+    if binary:
+        tree_root = ssbinary.load(filename)
+    else:
+        with codecs.open(filename, 'r', encoding='utf-8') as INFILE:
+            try:
+                tree_root = ssparser.parse_stream(source=INFILE)
+            except ssparser.ParseError as error:
+                report_errors(error)
+    # The constants are always folded before running, for the tree only if asked.
+    if fold or not tree:
+        operators: ssoptimizer.Operators = ssinterpreter.numbers_for(exact).folding_operators()
+        reduction: ssoptimizer.Reduction = ssoptimizer.fold_constants(tree_root, operators)
+        if fold:
+            print(f"Constant folding: {reduction}", file=sys.stderr)
+    if tree:
+        tree_print.treeprint(tree_root, "unicode")
+        return
+    try:
+        memos = ssinterpreter.run(tree_root, exact=exact)
+        if memo:
+            report_memos(memos)
+    except ssinterpreter.ExecutionError as error:
+        print(f"Error: {error}")
+        raise SystemExit
+    except sssemantics.SemanticError as error:
+        report_semantic_errors(error, filename, binary)
+
+
+if __name__ == '__main__':
+    """
+    The initial CLI implementation is taken from example given at
+    https://course-gitlab.tuni.fi/compcs400-principles-of-programming-languages_2020-2021/public_examples/-/blob/master/roman-numerals/tokenizer.py
+
+    I think it was said in lectures that this part can be copied.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--who', action='store_true', help='who wrote this')
+    group.add_argument('-f', '--file', help='filename to process')
+    parser.add_argument('-t', '--tree', action='store_true', help='print the syntax tree instead of running')
+    parser.add_argument('-e', '--exact', action='store_true', help='use exact fixed-point scalars instead of floats')
+    parser.add_argument('-c', '--compile', action='store_true', help='compile to Python instead of interpreting')
+    parser.add_argument('--fold', action='store_true', help='report the constant folding, fold also the tree')
+    parser.add_argument('--memo', action='store_true', help='report the hits of the memoized pure functions')
+
+    ns = parser.parse_args()
+    if ns.who:
+        print('424562 Chi-Hao Lay')
+    elif ns.file is None:
+        parser.print_help()
+    else:
+        run_file(filename=ns.file, tree=ns.tree, exact=ns.exact, compiled=ns.compile, fold=ns.fold,
+                 memo=ns.memo)
@@ -0,0 +1,318 @@
+"""
+Compact binary format of the AST that is loaded without the lexer and the parser.
+
+The data has a header and flat little-endian arrays, so a file can be memory-mapped and the arrays are read
+where they are without copying them:
+
+- numbers: int64, the literals of the sheet rows in tenths.
+- nodes: int32 triples for the nodes in pre-order, the root is node 0. A triple is the nodetype as an
+  index to the nodetype table, the value as an index to the value table or -1, and the offset of the
+  node's edges.
+- edges: int32, for each child attribute of a node the number of children (-1 for unset, 1 for a
+  `child_`, the length for a `children_`) followed by the node indices of the children. A sheet row has
+  the number of cells, the offset of its numbers and the number of its expressions followed by
+  (column, node index) pairs.
+- values: int32 pairs, where the value ends in the value text and 1 if it is a decimal, 0 for a string.
+- symbols: int32, the value index of each name in the symbol table of the program. The name nodes get the
+  id of their value from it.
+- spans: int64 pairs for the nodes, `lexpos` and `lexend` or -1 if the node has no span.
+- the nodetype table (names separated by newlines) and the value text, both UTF-8.
+
+The children always come after their parent, so the nodes are built from the last to the first and every
+child exists when its parent is built. Only what the parser sets is stored, the attributes resolved by the
+interpreter are not.
+"""
+import array
+import decimal
+import gc
+import mmap
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+import sssyntax as nodes
+
+MAGIC: bytes = b"SSAST"
+# Increase this if the format changes.
+FORMAT_VERSION: int = 4
+
+# magic, version, the counts of nodes, edges, numbers, values and symbols, the lengths of the nodetype table and
+# value text
+HEADER: struct.Struct = struct.Struct("<5sBxxIIIIIII")
+# The arrays start at a multiple of 8 so that the numbers can be read as int64 in place.
+ALIGNMENT = 8
+
+NO_VALUE = -1
+UNSET = -1
+NO_SPAN = -1
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class FormatError(Exception):
+    """
+    Raised for data that is not a serialised tree of this format.
+    """
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _child_nodes(node: nodes.Node) -> List[nodes.Node]:
+    if node.nodetype == nodes.TYPE_SHEET_ROW:
+        return list(node.expressions.values())
+    children: List[nodes.Node] = []
+    for field in node.child_fields:
+        child = getattr(node, field, None)
+        if isinstance(child, list):
+            children.extend(child)
+        elif child is not None:
+            children.append(child)
+    return children
+
+
+def _little_endian(values: array.array) -> bytes:
+    if sys.byteorder != "little":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def dumps(root: nodes.Node) -> bytes:
+    """
+    :param root: The root node from `ssparser.parse_data`.
+    :return: The serialised tree.
+    """
+    # The nodes in pre-order.
+    order: List[nodes.Node] = []
+    stack: List[nodes.Node] = [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(reversed(_child_nodes(node)))
+    indices: Dict[int, int] = {id(node): index for index, node in enumerate(order)}
+
+    nodetypes: Dict[str, int] = {}
+    values: Dict[Tuple[type, str], int] = {}
+    node_records: array.array = array.array("i")
+    edges: array.array = array.array("i")
+    numbers: array.array = array.array("q")
+    spans: array.array = array.array("q")
+    for node in order:
+        spans.extend(nodes.span(node) or (NO_SPAN, NO_SPAN))
+        value = getattr(node, "value", None)
+        if value is None:
+            value_index: int = NO_VALUE
+        elif isinstance(value, (str, decimal.Decimal)):
+            value_index = values.setdefault((type(value), str(value)), len(values))
+        else:
+            raise TypeError(f"Cannot serialise value {value!r} of {node.nodetype}")
+        node_records.extend((nodetypes.setdefault(node.nodetype, len(nodetypes)), value_index, len(edges)))
+        if node.nodetype == nodes.TYPE_SHEET_ROW:
+            edges.extend((len(node.numbers), len(numbers), len(node.expressions)))
+            for column, expression in node.expressions.items():
+                edges.extend((column, indices[id(expression)]))
+            numbers.extend(node.numbers)
+            continue
+        for field in node.child_fields:
+            child = getattr(node, field, None)
+            if child is None:
+                edges.append(UNSET)
+            elif isinstance(child, list):
+                edges.append(len(child))
+                edges.extend(indices[id(item)] for item in child)
+            else:
+                edges.extend((1, indices[id(child)]))
+
+    symbols: Optional[nodes.SymbolTable] = getattr(root, "symbols", None)
+    symbol_records: array.array = array.array("i")
+    if symbols is not None:
+        symbol_records.extend(values.setdefault((str, name), len(values)) for name in symbols.names)
+
+    value_texts: List[bytes] = [text.encode("utf-8") for _, text in values]
+    value_records: array.array = array.array("i")
+    end: int = 0
+    for (value_type, _), text in zip(values, value_texts):
+        end += len(text)
+        value_records.extend((end, value_type is decimal.Decimal))
+    nodetype_table: bytes = "\n".join(nodetypes).encode("utf-8")
+    value_text: bytes = b"".join(value_texts)
+
+    header: bytes = HEADER.pack(MAGIC, FORMAT_VERSION, len(order), len(edges), len(numbers), len(values),
+                                len(symbol_records), len(nodetype_table), len(value_text))
+    parts: List[bytes] = [header, bytes(_aligned(len(header)) - len(header))]
+    for part in (numbers, node_records, edges, value_records, symbol_records):
+        parts.append(_little_endian(part))
+    # The int32 arrays may end between multiples of 8.
+    int32_size: int = (len(node_records) + len(edges) + len(value_records) + len(symbol_records)) * 4
+    parts.append(bytes(_aligned(int32_size) - int32_size))
+    parts.append(_little_endian(spans))
+    parts.append(nodetype_table)
+    parts.append(value_text)
+    return b"".join(parts)
+
+
+def _array(buffer: memoryview, offset: int, typecode: str, count: int, views: List[memoryview]) -> Tuple[memoryview, int]:
+    """
+    :param views: The view of the array is added here so that it can be released.
+    :return: The array at offset as a view of the buffer and the offset after it.
+    """
+    end: int = offset + count * array.array(typecode).itemsize
+    if end > len(buffer):
+        raise FormatError("Broken syntax tree: the data is too short")
+    if sys.byteorder != "little":
+        values: array.array = array.array(typecode, buffer[offset:end].tobytes())
+        values.byteswap()
+        view: memoryview = memoryview(values)
+    else:
+        view = buffer[offset:end].cast(typecode)
+    views.append(view)
+    return view, end
+
+
+def loads(data: Buffer) -> nodes.Node:
+    """
+    :param data: A tree from `dumps`, any buffer such as bytes or mmap.
+    :return: The root node.
+    :raises FormatError: If the data is not a tree of this format version.
+    """
+    views: List[memoryview] = []
+    try:
+        with memoryview(data) as buffer:
+            return _load(buffer, views)
+    except (IndexError, TypeError, ValueError, decimal.InvalidOperation) as error:
+        # ValueError is also UnicodeDecodeError
+        raise FormatError(f"Broken syntax tree: {error}") from None
+    finally:
+        # The views have to be released before a memory map can be closed.
+        for view in views:
+            view.release()
+
+
+def _load(buffer: memoryview, views: List[memoryview]) -> nodes.Node:
+    if len(buffer) < HEADER.size or buffer[:len(MAGIC)] != MAGIC:
+        raise FormatError("Not a serialised syntax tree")
+    (_, version, node_count, edge_count, number_count, value_count, symbol_count,
+     nodetype_length, value_length) = HEADER.unpack_from(buffer)
+    if version != FORMAT_VERSION:
+        raise FormatError(f"Syntax tree format {version} is not {FORMAT_VERSION}")
+    offset: int = _aligned(HEADER.size)
+    numbers, offset = _array(buffer, offset, "q", number_count, views)
+    node_records, offset = _array(buffer, offset, "i", node_count * 3, views)
+    edges, offset = _array(buffer, offset, "i", edge_count, views)
+    value_records, offset = _array(buffer, offset, "i", value_count * 2, views)
+    symbol_records, offset = _array(buffer, offset, "i", symbol_count, views)
+    spans, offset = _array(buffer, _aligned(offset), "q", node_count * 2, views)
+    if offset + nodetype_length + value_length > len(buffer):
+        raise FormatError("Broken syntax tree: the data is too short")
+    nodetype_table: str = str(buffer[offset:offset + nodetype_length], "utf-8")
+    offset += nodetype_length
+    try:
+        classes: List[Type[nodes.Node]] = [nodes.NODE_CLASSES[nodetype]
+                                           for nodetype in nodetype_table.split("\n") if nodetype]
+    except KeyError as error:
+        raise FormatError(f"Unknown nodetype {error}") from None
+    values: List[object] = []
+    start: int = offset
+    ends: List[int] = value_records.tolist()
+    for end, is_decimal in zip(ends[::2], ends[1::2]):
+        text: str = str(buffer[start:offset + end], "utf-8")
+        values.append(decimal.Decimal(text) if is_decimal else text)
+        start = offset + end
+    symbol_values: List[int] = symbol_records.tolist()
+    symbols: nodes.SymbolTable = nodes.SymbolTable(values[value_index] for value_index in symbol_values)
+    if len(symbols) != len(symbol_values):
+        raise FormatError("Broken syntax tree: a name is twice in the symbol table")
+
+    # Only new nodes are made here, so the garbage collector would go through them again and again for nothing.
+    collecting: bool = gc.isenabled()
+    gc.disable()
+    try:
+        root: nodes.Node = _build(classes, values, node_records, edges, numbers, spans,
+                                  {value_index: symbol for symbol, value_index in enumerate(symbol_values)})
+    finally:
+        if collecting:
+            gc.enable()
+    if symbol_values:
+        root.symbols = symbols
+    return root
+
+
+def _build(classes: List[Type[nodes.Node]], values: List[object], node_records: memoryview, edges: memoryview,
+           numbers: memoryview, spans: memoryview, symbols: Dict[int, int]) -> nodes.Node:
+    """
+    :param symbols: The symbol ids of the names by their value index.
+    """
+    # The class, the child attributes with whether they are lists and whether it is a name for each nodetype.
+    layouts: List[Tuple[Type[nodes.Node], Tuple[Tuple[str, bool], ...], bool]] = [
+        (node_class, tuple((field, field.startswith("children_")) for field in node_class.child_fields),
+         "symbol" in node_class.__slots__)
+        for node_class in classes
+    ]
+    count: int = len(node_records) // 3
+    if not count:
+        raise ValueError("there are no nodes")
+    built: List[nodes.Node] = [None] * count
+    for index in range(count - 1, -1, -1):
+        record: int = index * 3
+        node_class, fields, is_name = layouts[node_records[record]]
+        node: nodes.Node = node_class.__new__(node_class)
+        value_index: int = node_records[record + 1]
+        if value_index != NO_VALUE:
+            node.value = values[value_index]
+            if is_name and value_index in symbols:
+                node.symbol = symbols[value_index]
+        lexpos: int = spans[index * 2]
+        if lexpos != NO_SPAN:
+            node.lexpos = lexpos
+            node.lexend = spans[index * 2 + 1]
+        edge: int = node_records[record + 2]
+        if node_class is nodes.SheetRow:
+            cells, start, expressions = edges[edge], edges[edge + 1], edges[edge + 2]
+            node.numbers = array.array("q", numbers[start:start + cells])
+            pairs: List[int] = edges[edge + 3:edge + 3 + 2 * expressions].tolist()
+            node.expressions = {pairs[pair]: built[pairs[pair + 1]] for pair in range(0, len(pairs), 2)}
+        else:
+            for field, is_list in fields:
+                children: int = edges[edge]
+                edge += 1
+                if children == UNSET:
+                    continue
+                if is_list:
+                    setattr(node, field, [built[child] for child in edges[edge:edge + children].tolist()])
+                else:
+                    setattr(node, field, built[edges[edge]])
+                edge += children
+        built[index] = node
+    return built[0]
+
+
+def dump(root: nodes.Node, filename: str):
+    """
+    Writes the tree to a file, see `dumps`.
+    """
+    with open(filename, "wb") as output:
+        output.write(dumps(root))
+
+
+def load(filename: str) -> nodes.Node:
+    """
+    Reads a tree written by `dump`. The file is memory-mapped and the arrays are read from the mapping.
+
+    :raises FormatError: If the file is not a tree of this format version.
+    """
+    with open(filename, "rb") as source:
+        if not is_binary(filename):
+            raise FormatError("Not a serialised syntax tree")
+        mapped: mmap.mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    with mapped:
+        return loads(mapped)
+
+
+def is_binary(filename: str) -> bool:
+    """
+    :return: True if the file starts like a tree written by `dump`.
+    """
+    with open(filename, "rb") as source:
+        return source.read(len(MAGIC)) == MAGIC
@@ -0,0 +1,603 @@
+"""
+Compiles SheetScript to Python source.
+
+The program is checked with `sssemantics` and every function of the program becomes a Python function.
+The variables of functions are Python locals and the global variables are globals of the generated module,
+so reading a variable or doing arithmetic costs no dispatch. The runtime objects (sheets, ranges and the
+number representation) are the ones of the interpreter, so both give the same output.
+
+The compiled code objects are cached by a hash of the source, so compiling the same script again
+skips both the parsing and the compiling. The pure functions are wrapped with a `Memo` of the run, and the
+independent for loops try the arrays first, like in the interpreter.
+"""
+import collections
+import hashlib
+import math
+import sys
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+import ssinterpreter
+import ssoptimizer
+import ssparser
+import sssemantics
+import sssyntax as nodes
+from ssinterpreter import ExecutionError, Memo, Numbers
+
+CACHE_SIZE: int = 32
+
+# Operators that are written inline instead of calling the Numbers method, {0} is the left and {1} the right.
+# The float sums are rounded like in FloatNumbers.
+INLINE_OPERATORS: Dict[type, Dict[str, str]] = {
+    ssinterpreter.FloatNumbers: {
+        "+": "_floor(({0} + {1}) * 10.0 + 0.5) / 10.0",
+        "-": "_floor(({0} - {1}) * 10.0 + 0.5) / 10.0",
+    },
+    ssinterpreter.DecimalNumbers: {
+        "+": "({0} + {1})",
+        "-": "({0} - {1})",
+    },
+    ssinterpreter.FixedNumbers: {
+        "+": "({0} + {1})",
+        "-": "({0} - {1})",
+    },
+}
+
+COMPARISONS: Dict[str, str] = {"=": "==", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+# The depth of the expressions that are written as one Python expression. Python fails to compile expressions that
+# nest too many parentheses, so the deeper ones are computed one operation at a time in a helper function.
+NESTING_LIMIT: int = 40
+
+# The expressions that are written as they are also in a helper function, they have no effects and cannot fail.
+PLAIN_TYPES = {nodes.TYPE_DECIMAL, nodes.TYPE_IDENT, nodes.TYPE_RANGE_IDENT, nodes.TYPE_SHEET_IDENT}
+
+
+class DeepExpression(Exception):
+    """
+    An expression nests deeper than `NESTING_LIMIT`.
+    """
+
+
+class CompiledProgram:
+    """
+    The code object of a compiled program and the constants it refers to.
+    """
+    __slots__ = ("code", "source", "constants", "numbers")
+
+    def __init__(self, code, source: str, constants: Dict[str, object], numbers: Numbers):
+        self.code = code
+        self.source: str = source
+        self.constants: Dict[str, object] = constants
+        # The representation of scalars that the code was compiled for.
+        self.numbers: Numbers = numbers
+
+    def run(self, output: TextIO = sys.stdout, memo_size: int = ssinterpreter.MEMO_SIZE,
+            vectorize: bool = True) -> List[Memo]:
+        """
+        Runs the program. Every run gets new globals and memos so the runs don't affect each other.
+
+        :param memo_size: See `ssinterpreter.Interpreter`.
+        :param vectorize: See `ssinterpreter.Interpreter`.
+        :return: The memos of the pure functions, for their statistics.
+        :raises ExecutionError: If running fails.
+        """
+        memos: List[Memo] = []
+        namespace: Dict[str, object] = runtime(self.numbers, output, memos, memo_size, vectorize)
+        namespace.update(self.constants)
+        exec(self.code, namespace)
+        with ssinterpreter.deep_recursion():
+            namespace["_program"]()
+        return memos
+
+
+def runtime(numbers: Numbers, output: TextIO, memos: List[Memo], memo_size: int,
+            vectorize: bool) -> Dict[str, object]:
+    """
+    :param memos: Gets the memos of the functions.
+    :return: The helpers that the generated code calls, by name.
+    """
+    format_number: Callable[[object], str] = numbers.format
+
+    def write(info: Optional[str], text: str):
+        print(text if info is None else f"{info} {text}", file=output)
+
+    def print_range(info: Optional[str], cells: ssinterpreter.Range):
+        write(info, " ".join(map(format_number, cells.values().tolist())))
+
+    def print_sheet(info: Optional[str], sheet: ssinterpreter.Sheet):
+        lines: List[str] = [] if info is None else [info]
+        lines.extend(" ".join(map(format_number, row)) for row in sheet.cells.tolist())
+        print("\n".join(lines), file=output)
+
+    def read_index(cells: ssinterpreter.Range, index: int):
+        return ssinterpreter.read_cell(*cells.cell(index))
+
+    def write_index(cells: ssinterpreter.Range, index: int, value):
+        ssinterpreter.write_cell(*cells.cell(index), value)
+
+    def fail(message: str):
+        raise ExecutionError(message)
+
+    def floor(value: float) -> int:
+        # Like in FloatNumbers.add, math.floor fails for the infinity and NaN that a too large sum becomes.
+        try:
+            return math.floor(value)
+        except (OverflowError, ValueError):
+            raise ExecutionError(ssinterpreter.TOO_LARGE)
+
+    def memoize(function: Callable, slot: int, name: str, formals: List[str]) -> Callable:
+        if not memo_size:
+            return function
+        memo: Memo = Memo(name, numbers, formals, memo_size)
+        memos.append(memo)
+
+        def drop():
+            # The namespace of the generated code, the calls go through the global f<slot>.
+            helpers[f"f{slot}"] = function
+
+        return memo.wrap(function, drop)
+
+    def vectorized(cells: ssinterpreter.Range, count: int, compute: Callable) -> bool:
+        return vectorize and ssinterpreter.run_vectorized(cells, count, compute)
+
+    helpers: Dict[str, object] = {
+        "_Range": ssinterpreter.Range,
+        "_between": ssinterpreter.range_between,
+        "_cell_of": ssinterpreter.range_cell,
+        "_count": numbers.count,
+        "_divide": numbers.divide,
+        "_fail": fail,
+        "_floor": floor,
+        "_format": format_number,
+        "_literal_sheet": lambda name, rows, cells: ssinterpreter.literal_sheet(numbers, name, rows, cells),
+        "_memoize": memoize,
+        "_multiply": numbers.multiply,
+        "_new_sheet": lambda name, rows, columns: ssinterpreter.new_sheet(numbers, name, rows, columns),
+        "_one": numbers.one,
+        "_operators": numbers.operators(),
+        "_print": write,
+        "_print_range": print_range,
+        "_print_sheet": print_sheet,
+        "_read": ssinterpreter.read_cell,
+        "_read_index": read_index,
+        "_vector": numbers.array_operators(),
+        "_vectorized": vectorized,
+        "_write": ssinterpreter.write_cell,
+        "_write_index": write_index,
+        "_zero": numbers.zero,
+    }
+    return helpers
+
+
+class Compiler:
+    """
+    Generates the Python source of a program, one compiler per program.
+
+    The expressions compile to Python expressions and the statements to lines, an expression deeper than
+    `NESTING_LIMIT` compiles to a helper function written before its statement. For loops keep their first
+    range and index in the locals `_r<depth>` and `_i<depth>`, so `$` is compiled knowing its loop.
+    """
+
+    def __init__(self, exact: bool = False, numbers: Optional[Numbers] = None):
+        """
+        :param exact: Use exact scalars instead of floats.
+        :param numbers: The representation of scalars, by default the one of the mode.
+        """
+        self.numbers: Numbers = numbers or ssinterpreter.numbers_for(exact)
+        self.inline: Dict[str, str] = INLINE_OPERATORS.get(type(self.numbers), {})
+        # Whether the independent loops can be run with arrays.
+        self.vectorize: bool = self.numbers.array_operators() is not None
+        self.lines: List[str] = []
+        self.indent: int = 0
+        self.constants: Dict[str, object] = {}
+        self.constant_names: Dict[Tuple[type, str], str] = {}
+        self.functions: List[sssemantics.Function] = []
+        # The depth of the innermost for loop in the function being compiled, 0 outside of loops.
+        self.loop_depth: int = 0
+        # The depth of the expression being compiled and the temporaries of the helper being written, by node id.
+        self.depth: int = 0
+        self.temporaries: Dict[int, str] = {}
+        self.helpers: int = 0
+
+        self.statements: Dict[str, Callable[[nodes.Node], None]] = {
+            nodes.TYPE_ASSIGNMENT: self.compile_assignment,
+            nodes.TYPE_FOR: self.compile_for,
+            nodes.TYPE_IF: self.compile_if,
+            nodes.TYPE_PRINT_RANGE: self.compile_print,
+            nodes.TYPE_PRINT_SCALAR: self.compile_print,
+            nodes.TYPE_PRINT_SHEET: self.compile_print,
+            nodes.TYPE_RANGE_DEFINITION: self.compile_definition,
+            nodes.TYPE_RETURN: self.compile_return,
+            nodes.TYPE_SCALAR_DEFINITION: self.compile_definition,
+            nodes.TYPE_SHEET_DEFINITION: self.compile_sheet_definition,
+            nodes.TYPE_SUBROUTINE_CALL: self.compile_subroutine_call,
+            nodes.TYPE_WHILE: self.compile_while,
+        }
+        self.expressions: Dict[str, Callable[[nodes.Node], str]] = {
+            nodes.TYPE_CELL_REF: self.compile_cell_ref,
+            nodes.TYPE_DECIMAL: self.compile_decimal,
+            nodes.TYPE_FUNCTION_CALL: self.compile_function_call,
+            nodes.TYPE_IDENT: self.variable,
+            nodes.TYPE_OP: self.compile_op,
+            nodes.TYPE_RANGE_EXPRESSION: self.compile_range_expression,
+            nodes.TYPE_RANGE_IDENT: self.variable,
+            nodes.TYPE_SHEET_IDENT: self.variable,
+        }
+
+    def compile(self, program: nodes.Node) -> CompiledProgram:
+        """
+        :param program: The root node from `ssparser.parse_data`.
+        :raises sssemantics.SemanticError: If the program has semantic errors.
+        """
+        analyzer: sssemantics.Analyzer = sssemantics.analyze(program, literal=self.numbers.literal)
+        definitions: List[nodes.Node] = getattr(program, "children_function_or_variable_definition", [])
+        self.functions = analyzer.functions
+        globals_count: int = len(analyzer.globals)
+
+        self.line(f"{self.global_names(globals_count)} = None")
+        for function in analyzer.functions:
+            self.compile_function(function, globals_count)
+        self.line("def _program():")
+        self.indent += 1
+        if globals_count:
+            self.line(f"global {self.global_names(globals_count, ', ')}")
+        self.block([definition for definition in definitions if definition.nodetype not in sssemantics.FUNCTION_TYPES]
+                   + program.children_statement_list)
+        self.indent -= 1
+
+        source: str = "\n".join(self.lines) + "\n"
+        return CompiledProgram(compile(source, "<sheetscript>", "exec"), source, self.constants, self.numbers)
+
+    def line(self, text: str):
+        self.lines.append("    " * self.indent + text)
+
+    def block(self, statements: List[nodes.Node]):
+        if not statements:
+            self.line("pass")
+        for statement in statements:
+            self.statements[statement.nodetype](statement)
+
+    @staticmethod
+    def global_names(count: int, separator: str = " = ") -> str:
+        return separator.join(f"g{slot}" for slot in range(count)) if count else "_unused"
+
+    def compile_function(self, function: sssemantics.Function, globals_count: int):
+        definition: nodes.Node = function.definition
+        formals: List[nodes.Node] = getattr(definition, "children_formals", [])
+        arguments: str = ", ".join(self.variable(formal.child_name) for formal in formals)
+        self.line(f"def f{definition.child_name.slot}({arguments}):")
+        self.indent += 1
+        if globals_count:
+            self.line(f"global {self.global_names(globals_count, ', ')}")
+        if function.variables > len(formals):
+            self.line(" = ".join(f"v{slot}" for slot in range(len(formals), function.variables)) + " = None")
+        self.loop_depth = 0
+        self.block(getattr(definition, "children_variable_definitions", []) + definition.children_statement_list)
+        if definition.nodetype == nodes.TYPE_FUNCTION_DEFINITION:
+            self.line(f"_fail({repr(f'Function {definition.child_name.value!r} ended without return')})")
+        self.indent -= 1
+        if function.memoizable:
+            # The calls, also the recursive ones, go through the global name.
+            slot: int = definition.child_name.slot
+            self.line(f"f{slot} = _memoize(f{slot}, {slot}, {definition.child_name.value!r}, {function.formals!r})")
+
+    # Statements
+
+    def compile_definition(self, node: nodes.Node):
+        expression = getattr(node, "child_expression", None)
+        if expression is not None:
+            value: str = self.expression(expression)
+        else:
+            value = "_zero" if node.nodetype == nodes.TYPE_SCALAR_DEFINITION else "_Range()"
+        self.line(f"{self.variable(node.child_name)} = {value}")
+
+    def compile_sheet_definition(self, node: nodes.Node):
+        name: str = repr(node.child_name.value)
+        init = getattr(node, "child_sheet_init", None)
+        if init is None:
+            value: str = f"_new_sheet({name}, 0, 0)"
+        elif init.nodetype == nodes.TYPE_OP:
+            # columns * rows
+            value = f"_new_sheet({name}, {int(init.child_right.value)}, {int(init.child_left.value)})"
+        else:
+            # The literals are passed as the number arrays of the rows, only the other cells are compiled.
+            rows: List[nodes.Node] = init.children_sheet_init_list
+            rows_name: str = f"_rows{len(self.constants)}"
+            self.constants[rows_name] = [row.numbers for row in rows]
+            cells: str = ", ".join(f"({index}, {column}): {self.expression(expression)}"
+                                   for index, row in enumerate(rows)
+                                   for column, expression in sorted(row.expressions.items()))
+            value = f"_literal_sheet({name}, {rows_name}, {{{cells}}})"
+        self.line(f"{self.variable(node.child_name)} = {value}")
+
+    def compile_assignment(self, node: nodes.Node):
+        cell_ref = getattr(node, "child_cell_ref", None)
+        if cell_ref is not None:
+            value: str = self.expression(node.child_expression)
+            if self.is_current_cell(cell_ref):
+                self.line(f"_write_index(_r{self.loop_depth}, _i{self.loop_depth}, {value})")
+            elif hasattr(cell_ref, "child_coordinate_ident"):
+                self.line(f"_write({self.cell(cell_ref)[1:-1]}, {value})")
+            else:
+                self.line(f"_write(*{self.cell(cell_ref)}, {value})")
+        elif hasattr(node, "child_sheet_ident"):
+            self.line(f"{self.variable(node.child_name)}.copy_from({self.variable(node.child_sheet_ident)})")
+        else:
+            self.line(f"{self.variable(node.child_name)} = {self.expression(node.child_expression)}")
+
+    def compile_print(self, node: nodes.Node):
+        info = getattr(node, "child_info_string", None)
+        info_value: str = repr(None if info is None else info.value)
+        if node.nodetype == nodes.TYPE_PRINT_SCALAR:
+            self.line(f"_print({info_value}, _format({self.expression(node.child_expression)}))")
+        elif node.nodetype == nodes.TYPE_PRINT_RANGE:
+            self.line(f"_print_range({info_value}, {self.expression(node.child_expression)})")
+        else:
+            self.line(f"_print_sheet({info_value}, {self.variable(node.child_name)})")
+
+    def compile_if(self, node: nodes.Node):
+        self.line(f"if {self.condition(node.child_condition)}:")
+        self.indented(node.children_then_statement_list)
+        statements = getattr(node, "children_else_statement_list", None)
+        if statements is not None:
+            self.line("else:")
+            self.indented(statements)
+
+    def compile_while(self, node: nodes.Node):
+        self.line(f"while {self.condition(node.child_condition)}:")
+        self.indented(node.children_statement_list)
+
+    def compile_for(self, node: nodes.Node):
+        # The ranges are evaluated once in order, $ refers to the cell of the first range.
+        depth: int = self.loop_depth + 1
+        expressions: List[str] = [self.expression(expression) for expression in node.children_range_list]
+        self.line(f"_r{depth} = {expressions[0]}")
+        lengths: List[str] = [f"len(_r{depth})"] + [f"len({expression})" for expression in expressions[1:]]
+        count: str = lengths[0] if len(lengths) == 1 else f"min({', '.join(lengths)})"
+        self.loop_depth = depth
+        values: Optional[str] = None
+        if node.independent and self.vectorize:
+            # The loop body is a single assignment to $, see `sssemantics`.
+            try:
+                values = self.vector_expression(node.children_statement_list[0].child_expression)
+            except DeepExpression:
+                # The arrays would nest too deep, the loop runs cell by cell.
+                pass
+        if values is not None:
+            self.line(f"_n{depth} = {count}")
+            self.line(f"if not _vectorized(_r{depth}, _n{depth}, lambda _l: {values}):")
+            self.indent += 1
+            count = f"_n{depth}"
+        self.line(f"for _i{depth} in range({count}):")
+        self.indented(node.children_statement_list)
+        if values is not None:
+            self.indent -= 1
+        self.loop_depth = depth - 1
+
+    def compile_subroutine_call(self, node: nodes.Node):
+        self.line(self.call(node))
+
+    def compile_return(self, node: nodes.Node):
+        self.line(f"return {self.expression(node.child_expression)}")
+
+    def indented(self, statements: List[nodes.Node]):
+        self.indent += 1
+        self.block(statements)
+        self.indent -= 1
+
+    # Expressions
+
+    def expression(self, node: nodes.Node) -> str:
+        temporary: Optional[str] = self.temporaries.get(id(node))
+        if temporary is not None:
+            return temporary
+        if self.depth:
+            return self.nested(self.expressions[node.nodetype], node)
+        try:
+            return self.nested(self.expressions[node.nodetype], node)
+        except DeepExpression:
+            return self.helper(node)
+
+    def nested(self, compile_node: Callable[[nodes.Node], str], node: nodes.Node) -> str:
+        """
+        :return: The expression compiled one level deeper.
+        :raises DeepExpression: If the expression nests deeper than `NESTING_LIMIT`.
+        """
+        if self.depth >= NESTING_LIMIT:
+            raise DeepExpression()
+        self.depth += 1
+        try:
+            return compile_node(node)
+        finally:
+            self.depth -= 1
+
+    def helper(self, node: nodes.Node) -> str:
+        """
+        Writes a function that computes the expression with a temporary for each operation, in the order that
+        the nested expression would compute them. The function is written before the statement, the variables are
+        read when it is called so it can also be a while condition.
+
+        :return: The call of the function.
+        """
+        name: str = f"_e{self.helpers}"
+        self.helpers += 1
+        self.line(f"def {name}():")
+        self.indent += 1
+        stack: List[Tuple[nodes.Node, bool]] = [(node, False)]
+        while stack:
+            current, ready = stack.pop()
+            if current.nodetype in PLAIN_TYPES:
+                continue
+            if ready:
+                temporary: str = f"_t{len(self.temporaries)}"
+                self.line(f"{temporary} = {self.expressions[current.nodetype](current)}")
+                self.temporaries[id(current)] = temporary
+            else:
+                stack.append((current, True))
+                stack.extend((operand, False) for operand in reversed(operands(current)))
+        self.line(f"return {self.temporaries[id(node)]}")
+        self.temporaries.clear()
+        self.indent -= 1
+        return f"{name}()"
+
+    def condition(self, node: nodes.Node) -> str:
+        # A comparison in a condition is used as the bool without converting it to a scalar.
+        if node.nodetype == nodes.TYPE_OP and node.value in COMPARISONS and hasattr(node, "child_left"):
+            return f"({self.expression(node.child_left)} {COMPARISONS[node.value]} {self.expression(node.child_right)})"
+        return self.expression(node)
+
+    def variable(self, name: nodes.Node) -> str:
+        return f"v{name.slot}" if name.scope else f"g{name.slot}"
+
+    def constant(self, value) -> str:
+        if isinstance(value, (float, int)):
+            return repr(value)
+        key: Tuple[type, str] = (type(value), str(value))
+        if key not in self.constant_names:
+            self.constant_names[key] = f"_k{len(self.constant_names)}"
+            self.constants[self.constant_names[key]] = value
+        return self.constant_names[key]
+
+    def compile_decimal(self, node: nodes.Node) -> str:
+        return self.constant(node.number)
+
+    def compile_op(self, node: nodes.Node) -> str:
+        left = getattr(node, "child_left", None)
+        right: str = self.expression(node.child_right)
+        if left is None:
+            return f"_count(len({right}))" if node.value == "#" else f"(-{right})"
+        left_value: str = self.expression(left)
+        if node.value in COMPARISONS:
+            return f"(_one if {left_value} {COMPARISONS[node.value]} {right} else _zero)"
+        if node.value in self.inline:
+            return self.inline[node.value].format(left_value, right)
+        if node.value == "*":
+            return f"_multiply({left_value}, {right})"
+        if node.value == "/":
+            return f"_divide({left_value}, {right})"
+        return f"_operators[{node.value!r}]({left_value}, {right})"
+
+    def is_current_cell(self, node: nodes.Node) -> bool:
+        return (self.loop_depth > 0 and not hasattr(node, "child_coordinate_ident")
+                and not hasattr(node, "child_range_ident"))
+
+    def cell(self, node: nodes.Node) -> str:
+        """
+        :param node: A cell_ref node.
+        :return: An expression for the tuple (sheet, row, column) of the cell.
+        """
+        coordinate = getattr(node, "child_coordinate_ident", None)
+        if coordinate is not None:
+            return f"({self.variable(node.child_sheet_ident)}, {coordinate.row}, {coordinate.column})"
+        range_ident = getattr(node, "child_range_ident", None)
+        if range_ident is None:
+            return f"_r{self.loop_depth}.cell(_i{self.loop_depth})"
+        return f"_cell_of({self.variable(range_ident)}, _i{self.loop_depth}, {range_ident.value!r})"
+
+    def compile_cell_ref(self, node: nodes.Node) -> str:
+        coordinate = getattr(node, "child_coordinate_ident", None)
+        if coordinate is not None:
+            return f"_read({self.variable(node.child_sheet_ident)}, {coordinate.row}, {coordinate.column})"
+        if self.is_current_cell(node):
+            return f"_read_index(_r{self.loop_depth}, _i{self.loop_depth})"
+        return f"_read(*{self.cell(node)})"
+
+    def compile_range_expression(self, node: nodes.Node) -> str:
+        expression = getattr(node, "child_expression", None)
+        if expression is not None:
+            # range_expr[columns, rows] moves the range
+            columns: int = int(node.child_from.value)
+            rows: int = int(node.child_to.value)
+            return f"{self.expression(expression)}.moved({rows}, {columns})"
+        return f"_between({self.cell(node.child_from)}, {self.cell(node.child_to)})"
+
+    def vector_expression(self, node: nodes.Node) -> str:
+        """
+        :return: The expression of an independent loop for all its cells with the `VectorLoop` `_l`.
+        """
+        if node.nodetype == nodes.TYPE_CELL_REF:
+            coordinate = getattr(node, "child_coordinate_ident", None)
+            if coordinate is not None:
+                return f"_l.cell({self.variable(node.child_sheet_ident)}, {coordinate.row}, {coordinate.column})"
+            range_ident = getattr(node, "child_range_ident", None)
+            return f"_l.values({'_l.cells' if range_ident is None else self.variable(range_ident)})"
+        if node.nodetype != nodes.TYPE_OP or node.value == "#":
+            return self.expression(node)
+        right: str = self.nested(self.vector_expression, node.child_right)
+        left = getattr(node, "child_left", None)
+        if left is None:
+            return f"_vector['negate']({right})"
+        return f"_vector[{node.value!r}]({self.nested(self.vector_expression, left)}, {right})"
+
+    def compile_function_call(self, node: nodes.Node) -> str:
+        return self.call(node)
+
+    def call(self, node: nodes.Node) -> str:
+        arguments: List[str] = [self.expression(argument) for argument in getattr(node, "children_arguments", [])]
+        return f"f{node.child_name.slot}({', '.join(arguments)})"
+
+
+def operands(node: nodes.Node) -> List[nodes.Node]:
+    """
+    :return: The expressions that the expression node computes first, in the order they are computed.
+    """
+    if node.nodetype == nodes.TYPE_OP:
+        left = getattr(node, "child_left", None)
+        return [node.child_right] if left is None else [left, node.child_right]
+    if node.nodetype == nodes.TYPE_FUNCTION_CALL:
+        return list(getattr(node, "children_arguments", []))
+    expression = getattr(node, "child_expression", None)
+    return [] if expression is None else [expression]
+
+
+_cache: "collections.OrderedDict[str, CompiledProgram]" = collections.OrderedDict()
+
+
+def source_key(data: str, exact: bool = False) -> str:
+    return hashlib.sha1(f"{int(exact)}\0{data}".encode("utf-8")).hexdigest()
+
+
+def compile_data(data: str, exact: bool = False) -> CompiledProgram:
+    """
+    Parses, folds the constants and compiles the source, or returns the cached program compiled from the same source.
+
+    :param data: The source of the program.
+    :param exact: Use exact scalars instead of floats.
+    """
+    key: str = source_key(data, exact)
+    compiled: Optional[CompiledProgram] = _cache.get(key)
+    if compiled is not None:
+        _cache.move_to_end(key)
+        return compiled
+    compiled = compile_tree(ssparser.parse_data(data), exact=exact)
+    _cache[key] = compiled
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return compiled
+
+
+def compile_tree(tree: nodes.Node, exact: bool = False) -> CompiledProgram:
+    """
+    Folds the constants and compiles a tree that is already parsed, e.g. loaded with `ssbinary`. It is not cached.
+
+    :param tree: The root node from `ssparser.parse_data`, folded in place.
+    :param exact: Use exact scalars instead of floats.
+    """
+    compiler: Compiler = Compiler(exact=exact)
+    ssoptimizer.fold_constants(tree, compiler.numbers.folding_operators())
+    return compiler.compile(tree)
+
+
+def run(data: str, output: TextIO = sys.stdout, exact: bool = False,
+        memo_size: int = ssinterpreter.MEMO_SIZE, vectorize: bool = True) -> List[Memo]:
+    """
+    Compiles the source, if it is not compiled already, and runs it.
+
+    :param data: The source of the program.
+    :param output: Where the print statements write.
+    :param exact: Use exact scalars instead of floats.
+    :param memo_size: See `ssinterpreter.Interpreter`.
+    :param vectorize: See `ssinterpreter.Interpreter`.
+    :return: The memos of the pure functions, for their statistics.
+    """
+    return compile_data(data, exact=exact).run(output, memo_size, vectorize)
@@ -0,0 +1,1054 @@
+"""
+Tree-walking interpreter for SheetScript.
+
+Before running, the program is checked with `sssemantics`: every variable gets an index in the global scope or
+in the scope of its function, and the index is stored to the name nodes. The values are then kept in lists
+instead of dictionaries keyed by name. The checked program has no undefined names, wrong argument counts or
+types, so they are not checked again while running. Statements and expressions are dispatched with tables keyed
+by nodetype.
+
+Scalars have one fractional digit like the literals, results of arithmetic are rounded to one fractional digit.
+The sheets are numpy arrays. By default the scalars are floats and the sheets float64, in the exact mode
+the scalars are integers counting tenths and the sheets int64. `DecimalNumbers` gives the same results with
+decimals and is kept as the reference for the exact mode.
+
+The results of the pure functions (see `sssemantics`) are memoized by their arguments, see `Memo`. The for
+loops whose iterations are independent run as numpy operations on the whole ranges, see `VectorLoop`.
+"""
+import array
+import collections
+import contextlib
+import decimal
+import hashlib
+import math
+import operator
+import sys
+from typing import Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+
+import numpy
+
+import ssoptimizer
+import sssemantics
+import sssyntax as nodes
+
+ZERO = decimal.Decimal("0.0")
+ONE = decimal.Decimal("1.0")
+ONE_TENTH = decimal.Decimal("0.1")
+# Moves the decimal point without rounding to the 28 digits of the default context.
+EXACT_CONTEXT = decimal.Context(prec=decimal.MAX_PREC)
+# The Python frames that running may use, a call of a SheetScript function takes several of them.
+RECURSION_LIMIT = 50000
+# The largest integer from which every smaller integer is an exact float.
+EXACT_FLOAT_INTEGER = 1 << 53
+# The error for a float result that does not fit a float.
+TOO_LARGE = "Value is too large"
+# The number of results kept for each pure function.
+MEMO_SIZE = 256
+# A memo with fewer hits than a tenth of its misses is dropped at this many misses.
+MEMO_TRIAL = 1000
+# The exact mode computes the arrays in int64 only when the values stay below this.
+ARRAY_LIMIT = 1 << 62
+
+
+class ExecutionError(Exception):
+    """
+    Raised for errors while running the program, the errors found before running are
+    `sssemantics.SemanticError`.
+    """
+
+
+class NotVectorizable(Exception):
+    """
+    Raised when a loop cannot be run with arrays after all, it is then run cell by cell.
+    """
+
+
+class Numbers:
+    """
+    The representation of scalars, chosen once for the interpreter.
+    """
+    dtype: object = None
+    zero: object = None
+    one: object = None
+
+    def literal(self, value: decimal.Decimal):
+        raise NotImplementedError
+
+    def as_decimal(self, value) -> decimal.Decimal:
+        """
+        :return: The decimal literal of a scalar, `literal` gives the same scalar back.
+        """
+        raise NotImplementedError
+
+    def tenths(self, values: array.array):
+        """
+        :param values: The literals of a sheet row in tenths.
+        :return: The scalars to put in the sheet.
+        """
+        raise NotImplementedError
+
+    def count(self, count: int):
+        raise NotImplementedError
+
+    def format(self, value) -> str:
+        raise NotImplementedError
+
+    def key(self, value):
+        """
+        :return: The value as a dictionary key. The negative zero is equal to zero but prints differently,
+            so the zeros are keyed by their text.
+        """
+        return value or str(value)
+
+    def add(self, left, right):
+        raise NotImplementedError
+
+    def subtract(self, left, right):
+        raise NotImplementedError
+
+    def multiply(self, left, right):
+        raise NotImplementedError
+
+    def divide(self, left, right):
+        raise NotImplementedError
+
+    def operators(self) -> Dict[str, Callable]:
+        """
+        :return: The binary operators by their symbol.
+        """
+        one, zero = self.one, self.zero
+
+        def comparison(compare: Callable[[object, object], bool]):
+            # Comparisons are scalars too so that they can be printed and used in arithmetic.
+            return lambda left, right: one if compare(left, right) else zero
+
+        return {
+            "+": self.add,
+            "-": self.subtract,
+            "*": self.multiply,
+            "/": self.divide,
+            "=": comparison(operator.eq),
+            "!=": comparison(operator.ne),
+            "<": comparison(operator.lt),
+            "<=": comparison(operator.le),
+            ">": comparison(operator.gt),
+            ">=": comparison(operator.ge),
+        }
+
+    def folding_operators(self) -> ssoptimizer.Operators:
+        """
+        :return: The operators for `ssoptimizer.fold_constants` computed with these scalars, so that folding does
+            not change the output. A result that fails, e.g. a too large one, is not folded and fails when run.
+        """
+        def folding(compute: Callable[[object, object], object]):
+            def fold(left: decimal.Decimal, right: decimal.Decimal) -> Optional[decimal.Decimal]:
+                try:
+                    return self.as_decimal(compute(self.literal(left), self.literal(right)))
+                except ExecutionError:
+                    return None
+            return fold
+
+        return {symbol: folding(compute) for symbol, compute in self.operators().items()}
+
+    def array_operators(self) -> Optional[Dict[str, Callable]]:
+        """
+        :return: The operators for numpy arrays of the sheet dtype and scalars, giving the same values as
+            `operators` for each element, and "negate". None if the scalars cannot be computed as arrays.
+        """
+        return None
+
+    def array_comparisons(self) -> Dict[str, Callable]:
+        one, zero = self.one, self.zero
+
+        def comparison(compare: Callable[[object, object], object]):
+            return lambda left, right: numpy.where(compare(left, right), one, zero)
+
+        return {symbol: comparison(compare) for symbol, compare in (
+            ("=", operator.eq), ("!=", operator.ne), ("<", operator.lt), ("<=", operator.le), (">", operator.gt),
+            (">=", operator.ge))}
+
+
+class DecimalNumbers(Numbers):
+    """
+    Exact scalars, multiplication and division are rounded half up to one fractional digit.
+    """
+    dtype = object
+    zero = ZERO
+    one = ONE
+
+    def literal(self, value: decimal.Decimal) -> decimal.Decimal:
+        return value
+
+    def as_decimal(self, value: decimal.Decimal) -> decimal.Decimal:
+        return value
+
+    def tenths(self, values: array.array) -> List[decimal.Decimal]:
+        return [decimal.Decimal(value).scaleb(-1) for value in values]
+
+    def count(self, count: int) -> decimal.Decimal:
+        return decimal.Decimal(count).quantize(ONE_TENTH)
+
+    def format(self, value: decimal.Decimal) -> str:
+        return str(value)
+
+    add = staticmethod(operator.add)
+    subtract = staticmethod(operator.sub)
+
+    def multiply(self, left: decimal.Decimal, right: decimal.Decimal) -> decimal.Decimal:
+        return (left * right).quantize(ONE_TENTH, rounding=decimal.ROUND_HALF_UP)
+
+    def divide(self, left: decimal.Decimal, right: decimal.Decimal) -> decimal.Decimal:
+        if not right:
+            raise ExecutionError("Division by zero")
+        return (left / right).quantize(ONE_TENTH, rounding=decimal.ROUND_HALF_UP)
+
+
+class FixedNumbers(Numbers):
+    """
+    Exact scalars as integers scaled by 10 (tenths) and sheets of int64, the default of the exact mode.
+
+    The results are the same as with `DecimalNumbers`: the sums are exact, and the products and quotients are
+    rounded half away from zero like `ROUND_HALF_UP`. The integer operations are many times faster than
+    the decimals and the sheets are plain numpy arrays instead of object arrays. The only difference is that
+    there is no negative zero, `-0.1 * 0.1` is `0.0` and not `-0.0`. The decimals also round to 28 digits
+    which the integers don't, and a sheet cell holds about 18 digits.
+    """
+    dtype = numpy.int64
+    zero = 0
+    one = 10
+
+    def literal(self, value: decimal.Decimal) -> int:
+        return int(value.scaleb(1, EXACT_CONTEXT))
+
+    def as_decimal(self, value: int) -> decimal.Decimal:
+        return decimal.Decimal(value).scaleb(-1, EXACT_CONTEXT)
+
+    def tenths(self, values: array.array) -> numpy.ndarray:
+        return numpy.frombuffer(values, dtype=numpy.int64)
+
+    def count(self, count: int) -> int:
+        return count * 10
+
+    def format(self, value: int) -> str:
+        whole, tenth = divmod(abs(value), 10)
+        try:
+            digits: str = str(whole)
+        except ValueError:
+            # str has a limit of digits (sys.get_int_max_str_digits), the exact decimal of the integer doesn't.
+            digits = str(decimal.Decimal(whole))
+        return f"-{digits}.{tenth}" if value < 0 else f"{digits}.{tenth}"
+
+    add = staticmethod(operator.add)
+    subtract = staticmethod(operator.sub)
+
+    def multiply(self, left: int, right: int) -> int:
+        # The product is in hundredths.
+        product: int = left * right
+        if product < 0:
+            return -((5 - product) // 10)
+        return (product + 5) // 10
+
+    def divide(self, left: int, right: int) -> int:
+        if not right:
+            raise ExecutionError("Division by zero")
+        # left / right is the quotient as a number, in tenths it is 10 * left / right.
+        quotient, remainder = divmod(abs(left) * 10, abs(right))
+        if remainder * 2 >= abs(right):
+            quotient += 1
+        return -quotient if (left < 0) != (right < 0) else quotient
+
+    def array_operators(self) -> Dict[str, Callable]:
+        # int64 does not grow like the Python integers, so the operands are checked first.
+        def bound(value) -> int:
+            if isinstance(value, numpy.ndarray):
+                return max(int(value.max()), -int(value.min())) if value.size else 0
+            return abs(int(value))
+
+        def check(value: int):
+            if value >= ARRAY_LIMIT:
+                raise NotVectorizable
+
+        def add(left, right):
+            check(bound(left) + bound(right))
+            return left + right
+
+        def subtract(left, right):
+            check(bound(left) + bound(right))
+            return left - right
+
+        def multiply(left, right):
+            check(bound(left) * bound(right) + 5)
+            product = left * right
+            return numpy.where(product < 0, -((5 - product) // 10), (product + 5) // 10)
+
+        def divide(left, right):
+            if numpy.any(right == 0):
+                # The zero may be an old value that an earlier iteration writes, the loop finds out cell by cell.
+                raise NotVectorizable
+            check(bound(left) * 10 + bound(right))
+            quotient, remainder = numpy.divmod(numpy.abs(left) * 10, numpy.abs(right))
+            quotient = quotient + (remainder * 2 >= numpy.abs(right))
+            return numpy.where((left < 0) != (right < 0), -quotient, quotient)
+
+        def negate(value):
+            check(bound(value))
+            return -value
+
+        operators: Dict[str, Callable] = self.array_comparisons()
+        operators.update({"+": add, "-": subtract, "*": multiply, "/": divide, "negate": negate})
+        return operators
+
+
+class FloatNumbers(Numbers):
+    """
+    Float scalars rounded to one fractional digit after every operation so that the values compare like
+    the decimals. The rounding of the ties can still differ from the exact mode when the float is not exact.
+    """
+    dtype = numpy.float64
+    zero = 0.0
+    one = 1.0
+
+    def literal(self, value: decimal.Decimal) -> float:
+        return float(value)
+
+    def as_decimal(self, value: float) -> decimal.Decimal:
+        # The shortest repr converts back to the same float.
+        return decimal.Decimal(repr(value))
+
+    def tenths(self, values: array.array) -> numpy.ndarray:
+        tenths: numpy.ndarray = numpy.frombuffer(values, dtype=numpy.int64)
+        if tenths.min() < -EXACT_FLOAT_INTEGER or tenths.max() > EXACT_FLOAT_INTEGER:
+            return numpy.array([float(decimal.Decimal(value).scaleb(-1)) for value in values])
+        # The integers are exact floats and the division is correctly rounded, so the values are the same
+        # as converting the literals.
+        return tenths / 10.0
+
+    def count(self, count: int) -> float:
+        return float(count)
+
+    def format(self, value: float) -> str:
+        return "%.1f" % value
+
+    # The sums have no ties, so rounding to the nearest tenth is enough. round(value, 1) would be many times slower.
+    # math.floor fails for the infinity and NaN that a too large result becomes.
+    def add(self, left: float, right: float) -> float:
+        try:
+            return math.floor((left + right) * 10.0 + 0.5) / 10.0
+        except (OverflowError, ValueError):
+            raise ExecutionError(TOO_LARGE)
+
+    def subtract(self, left: float, right: float) -> float:
+        try:
+            return math.floor((left - right) * 10.0 + 0.5) / 10.0
+        except (OverflowError, ValueError):
+            raise ExecutionError(TOO_LARGE)
+
+    def multiply(self, left: float, right: float) -> float:
+        try:
+            return _round_half_up(left * right)
+        except (OverflowError, ValueError):
+            raise ExecutionError(TOO_LARGE)
+
+    def divide(self, left: float, right: float) -> float:
+        if not right:
+            raise ExecutionError("Division by zero")
+        try:
+            return _round_half_up(left / right)
+        except (OverflowError, ValueError):
+            raise ExecutionError(TOO_LARGE)
+
+    def array_operators(self) -> Dict[str, Callable]:
+        # The same float operations as for the scalars, so every element is rounded the same way.
+        def finite(values):
+            # The scalars fail with an error at the first value that is too large, the loop finds it cell by cell.
+            if not numpy.isfinite(values).all():
+                raise NotVectorizable
+            return values
+
+        def round_half_up(values):
+            return finite(numpy.copysign(numpy.floor(numpy.abs(values) * 10.0 + 0.5), values) / 10.0)
+
+        def divide(left, right):
+            if numpy.any(right == 0.0):
+                raise NotVectorizable
+            return round_half_up(left / right)
+
+        operators: Dict[str, Callable] = self.array_comparisons()
+        operators.update({
+            "+": lambda left, right: finite(numpy.floor((left + right) * 10.0 + 0.5) / 10.0),
+            "-": lambda left, right: finite(numpy.floor((left - right) * 10.0 + 0.5) / 10.0),
+            "*": lambda left, right: round_half_up(left * right),
+            "/": divide,
+            "negate": operator.neg,
+        })
+        return operators
+
+
+def _round_half_up(value: float) -> float:
+    return math.copysign(math.floor(abs(value) * 10.0 + 0.5), value) / 10.0
+
+
+def numbers_for(exact: bool) -> Numbers:
+    """
+    :param exact: The exact mode, see the module docstring.
+    :return: The representation of scalars for the mode.
+    """
+    return FixedNumbers() if exact else FloatNumbers()
+
+
+class Sheet:
+    """
+    A two dimensional numpy array of scalars, indexed by row and column from zero.
+    """
+    __slots__ = ("name", "cells")
+
+    def __init__(self, name: str, cells: numpy.ndarray):
+        self.name: str = name
+        self.cells: numpy.ndarray = cells
+
+    def copy_from(self, other: "Sheet"):
+        self.cells = other.cells.copy()
+
+
+# A cell is referred by its sheet, row and column.
+Cell = Tuple[Sheet, int, int]
+
+
+class Range:
+    """
+    A rectangle of cells in a sheet, the cells are ordered row by row.
+    The values are a view to the sheet so reading a range reads the current values of the sheet.
+    """
+    __slots__ = ("sheet", "row", "column", "rows", "columns")
+
+    def __init__(self, sheet: Optional[Sheet] = None, row: int = 0, column: int = 0, rows: int = 0, columns: int = 0):
+        self.sheet: Optional[Sheet] = sheet
+        self.row: int = row
+        self.column: int = column
+        self.rows: int = rows
+        self.columns: int = columns
+        if sheet is not None:
+            sheet_rows, sheet_columns = sheet.cells.shape
+            if row < 0 or column < 0 or row + rows > sheet_rows or column + columns > sheet_columns:
+                raise ExecutionError(f"Range is outside of sheet {sheet.name}")
+
+    def __len__(self) -> int:
+        return self.rows * self.columns
+
+    def view(self) -> numpy.ndarray:
+        """
+        :return: The cells of the range as a two dimensional view of the sheet.
+        """
+        if self.sheet is None:
+            return numpy.empty((0, 0))
+        return self.sheet.cells[self.row:self.row + self.rows, self.column:self.column + self.columns]
+
+    def values(self) -> numpy.ndarray:
+        return self.view().ravel()
+
+    def cell(self, index: int) -> Cell:
+        row, column = divmod(index, self.columns)
+        return self.sheet, self.row + row, self.column + column
+
+    def moved(self, rows: int, columns: int) -> "Range":
+        return Range(self.sheet, self.row + rows, self.column + columns, self.rows, self.columns)
+
+
+def new_sheet(numbers: Numbers, name: str, rows: int = 0, columns: int = 0) -> Sheet:
+    return Sheet(name, numpy.full((rows, columns), numbers.zero, dtype=numbers.dtype))
+
+
+def literal_sheet(numbers: Numbers, name: str, rows: List[array.array],
+                  cells: Dict[Tuple[int, int], object]) -> Sheet:
+    """
+    :param rows: The `numbers` of the sheet rows, the literals in tenths. The short rows are filled with zeros.
+    :param cells: The values of the other cells by (row, column).
+    """
+    sheet: Sheet = new_sheet(numbers, name, len(rows), max(len(row) for row in rows))
+    for index, row in enumerate(rows):
+        sheet.cells[index, :len(row)] = numbers.tenths(row)
+    for (row, column), value in cells.items():
+        sheet.cells[row, column] = value
+    return sheet
+
+
+def read_cell(sheet: Sheet, row: int, column: int):
+    if row < 0 or column < 0:
+        # Row 0 of a coordinate like A0, numpy would take the cell from the end.
+        raise ExecutionError(f"Cell is outside of sheet {sheet.name}")
+    try:
+        # item() gives a Python float instead of numpy.float64 which is slower in the arithmetic.
+        return sheet.cells.item(row, column)
+    except IndexError:
+        raise ExecutionError(f"Cell is outside of sheet {sheet.name}")
+
+
+def write_cell(sheet: Sheet, row: int, column: int, value):
+    if row < 0 or column < 0:
+        raise ExecutionError(f"Cell is outside of sheet {sheet.name}")
+    try:
+        sheet.cells[row, column] = value
+    except IndexError:
+        raise ExecutionError(f"Cell is outside of sheet {sheet.name}")
+    except OverflowError:
+        # Only the int64 sheets of the exact mode have a limit.
+        raise ExecutionError(f"Value is too large for sheet {sheet.name}")
+
+
+def range_cell(cells: Range, index: int, name: str) -> Cell:
+    """
+    :return: The cell of the range variable `name` for the current index of a for loop.
+    """
+    if index >= len(cells):
+        raise ExecutionError(f"Range {name} has no cell {index + 1}")
+    return cells.cell(index)
+
+
+def range_between(start: Cell, end: Cell) -> Range:
+    sheet, first_row, first_column = start
+    other, last_row, last_column = end
+    if sheet is not other:
+        raise ExecutionError("Range must be within one sheet")
+    if first_row > last_row or first_column > last_column:
+        raise ExecutionError("Range must go from top left to bottom right")
+    return Range(sheet, first_row, first_column, last_row - first_row + 1, last_column - first_column + 1)
+
+
+class VectorLoop:
+    """
+    A for loop that writes only `$` with the same expression for every cell, run as arrays. The expression is
+    computed for all the cells before writing, which is the same as running the loop cell by cell only if no
+    iteration reads a cell that an earlier iteration writes. The values read are recorded and checked for that
+    before writing.
+    """
+    __slots__ = ("cells", "count", "reads", "coordinates")
+
+    def __init__(self, cells: Range, count: int):
+        """
+        :param cells: The first range of the loop, the one written.
+        :param count: The number of iterations.
+        """
+        self.cells: Range = cells
+        self.count: int = count
+        self.reads: List[Range] = []
+        self.coordinates: List[Cell] = []
+
+    def values(self, cells: Range) -> numpy.ndarray:
+        """
+        :return: The values of the cells that `$` of the range refers to in each iteration.
+        :raises NotVectorizable: If the range is shorter than the loop, the loop stops with an error at its end.
+        """
+        if len(cells) < self.count:
+            raise NotVectorizable
+        if cells is not self.cells:
+            self.reads.append(cells)
+        return cells.values()[:self.count]
+
+    def cell(self, sheet: Sheet, row: int, column: int):
+        self.coordinates.append((sheet, row, column))
+        return read_cell(sheet, row, column)
+
+    def inside(self, sheet: Sheet, row: int, column: int) -> bool:
+        cells: Range = self.cells
+        return (sheet is cells.sheet and cells.row <= row < cells.row + cells.rows
+                and cells.column <= column < cells.column + cells.columns)
+
+    def overlaps(self, other: Range) -> bool:
+        cells: Range = self.cells
+        return (other.sheet is cells.sheet and other.row < cells.row + cells.rows and cells.row < other.row + other.rows
+                and other.column < cells.column + cells.columns and cells.column < other.column + other.columns)
+
+    def independent(self) -> bool:
+        cells: Range = self.cells
+        for other in self.reads:
+            # The same range is read like `$`, each cell before it is written.
+            same: bool = (other.row, other.column, other.rows, other.columns) == (
+                cells.row, cells.column, cells.rows, cells.columns)
+            if self.overlaps(other) and not same:
+                return False
+        return not any(self.inside(*cell) for cell in self.coordinates)
+
+    def write(self, values):
+        """
+        :param values: An array of the values of the cells, or one scalar for all of them.
+        """
+        cells: Range = self.cells
+        try:
+            if self.count == len(cells):
+                cells.view()[...] = values.reshape(cells.rows, cells.columns) if numpy.ndim(values) else values
+            else:
+                rows, columns = numpy.divmod(numpy.arange(self.count), cells.columns)
+                cells.sheet.cells[cells.row + rows, cells.column + columns] = values
+        except OverflowError:
+            raise ExecutionError(f"Value is too large for sheet {cells.sheet.name}")
+
+
+def run_vectorized(cells: Range, count: int, compute: Callable[[VectorLoop], object]) -> bool:
+    """
+    Runs a loop that `sssemantics` found independent (`independent` of the for node) with arrays.
+
+    :param compute: Computes the values of the assignment to `$` with the arrays of the loop.
+    :return: False if the loop must be run cell by cell instead, nothing is written then.
+    """
+    if not count:
+        return False
+    loop: VectorLoop = VectorLoop(cells, count)
+    try:
+        # A result that is too large is an error only cell by cell, where it is found, so numpy shouldn't warn.
+        with numpy.errstate(over="ignore", invalid="ignore"):
+            values = compute(loop)
+    except (NotVectorizable, ExecutionError):
+        # The arrays have the cells before the loop, an error may be gone when an earlier iteration has written
+        # them. The loop run cell by cell reports the errors that remain.
+        return False
+    if not loop.independent():
+        return False
+    loop.write(values)
+    return True
+
+
+class Memo:
+    """
+    The latest results of one pure function by its arguments, the least recently used result is dropped first.
+
+    The key has the scalars as they are and the ranges by their shape and a hash of their values, so a range
+    with the same values in another place or sheet gives the same result. A function that is rarely called with
+    the same arguments would only pay for the keys, so its memo is dropped after a trial.
+    """
+
+    def __init__(self, name: str, numbers: Numbers, formals: List[str], size: int = MEMO_SIZE):
+        """
+        :param formals: The types of the formal arguments.
+        """
+        self.name: str = name
+        self.numbers: Numbers = numbers
+        self.ranges: bool = sssemantics.RANGE in formals
+        self.size: int = size
+        self.results: "collections.OrderedDict[tuple, object]" = collections.OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.dropped: bool = False
+
+    def __str__(self) -> str:
+        dropped: str = ", dropped" if self.dropped else ""
+        return f"{self.name}: {self.hits} hits, {self.misses} misses ({100 * self.hit_rate:.1f}% hit rate{dropped})"
+
+    @property
+    def hit_rate(self) -> float:
+        calls: int = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def key(self, arguments: Sequence[object]) -> tuple:
+        if self.ranges:
+            return tuple(self.range_key(argument) if isinstance(argument, Range) else self.numbers.key(argument)
+                         for argument in arguments)
+        # Only a zero can be the negative zero, the other scalars are keys as they are.
+        if self.numbers.zero in arguments:
+            return tuple(map(self.numbers.key, arguments))
+        return tuple(arguments)
+
+    def range_key(self, cells: Range) -> tuple:
+        view: numpy.ndarray = cells.view()
+        if view.dtype == object:
+            # The decimals are objects, their bytes would be pointers.
+            return view.shape, tuple(map(self.numbers.key, view.ravel().tolist()))
+        return view.shape, hashlib.blake2b(numpy.ascontiguousarray(view), digest_size=16).digest()
+
+    def get(self, key: tuple):
+        """
+        :return: The result for the arguments, None if it is not known.
+        """
+        result = self.results.get(key)
+        if result is None:
+            self.missed()
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return result
+
+    def missed(self):
+        self.misses += 1
+        if self.misses == MEMO_TRIAL and self.hits * 10 < self.misses:
+            self.dropped = True
+            self.results.clear()
+
+    def put(self, key: tuple, result):
+        self.results[key] = result
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def wrap(self, function: Callable, drop: Callable[[], None]) -> Callable:
+        """
+        :param drop: Called when the memo is dropped, to call `function` directly from then on.
+        :return: The function that calls `function` only for new arguments, used by the compiled code.
+        """
+        # The same as get and put without the method calls, the compiled calls are cheap otherwise.
+        key, results, size = self.key, self.results, self.size
+
+        def memoized(*arguments):
+            arguments_key: tuple = key(arguments)
+            result = results.get(arguments_key)
+            if result is None:
+                self.missed()
+                if self.dropped:
+                    drop()
+                    return function(*arguments)
+                result = function(*arguments)
+                results[arguments_key] = result
+                if len(results) > size:
+                    results.popitem(last=False)
+            else:
+                self.hits += 1
+                results.move_to_end(arguments_key)
+            return result
+
+        return memoized
+
+
+class Interpreter:
+    """
+    Runs a program from the root node returned by the parser.
+
+    The statements return None, except `return` which returns the value, so the value can be passed up
+    through the nested statement lists without exceptions.
+    """
+
+    def __init__(self, output: TextIO = sys.stdout, exact: bool = False, numbers: Optional[Numbers] = None,
+                 memo_size: int = MEMO_SIZE, vectorize: bool = True):
+        """
+        :param output: Where the print statements write.
+        :param exact: Use exact scalars instead of floats.
+        :param numbers: The representation of scalars, by default the one of the mode.
+        :param memo_size: The number of results kept for each pure function, 0 does not memoize.
+        :param vectorize: Run the independent for loops with arrays when the numbers allow it.
+        """
+        self.output: TextIO = output
+        self.numbers: Numbers = numbers or numbers_for(exact)
+        self.operators: Dict[str, Callable] = self.numbers.operators()
+        # None if the loops are run cell by cell.
+        self.array_operators: Optional[Dict[str, Callable]] = self.numbers.array_operators() if vectorize else None
+        self.memo_size: int = memo_size
+        self.globals: List[object] = []
+        self.globals_count: int = 0
+        self.functions: List[sssemantics.Function] = []
+        # The memo of each function by slot, None if it is not memoized.
+        self.memos: List[Optional[Memo]] = []
+        # The ranges of the innermost for loop and the index of the current cell.
+        self.loop: Optional[Tuple[List[Range], int]] = None
+
+        self.statements: Dict[str, Callable[[nodes.Node, List[object]], object]] = {
+            nodes.TYPE_ASSIGNMENT: self.exec_assignment,
+            nodes.TYPE_FOR: self.exec_for,
+            nodes.TYPE_IF: self.exec_if,
+            nodes.TYPE_PRINT_RANGE: self.exec_print_range,
+            nodes.TYPE_PRINT_SCALAR: self.exec_print_scalar,
+            nodes.TYPE_PRINT_SHEET: self.exec_print_sheet,
+            nodes.TYPE_RANGE_DEFINITION: self.exec_range_definition,
+            nodes.TYPE_RETURN: self.exec_return,
+            nodes.TYPE_SCALAR_DEFINITION: self.exec_scalar_definition,
+            nodes.TYPE_SHEET_DEFINITION: self.exec_sheet_definition,
+            nodes.TYPE_SUBROUTINE_CALL: self.exec_subroutine_call,
+            nodes.TYPE_WHILE: self.exec_while,
+        }
+        self.expressions: Dict[str, Callable[[nodes.Node, List[object]], object]] = {
+            nodes.TYPE_CELL_REF: self.eval_cell_ref,
+            nodes.TYPE_DECIMAL: self.eval_decimal,
+            nodes.TYPE_FUNCTION_CALL: self.eval_function_call,
+            nodes.TYPE_IDENT: self.eval_variable,
+            nodes.TYPE_OP: self.eval_op,
+            nodes.TYPE_RANGE_EXPRESSION: self.eval_range_expression,
+            nodes.TYPE_RANGE_IDENT: self.eval_variable,
+            nodes.TYPE_SHEET_IDENT: self.eval_variable,
+        }
+
+    def run(self, program: nodes.Node):
+        """
+        Checks and runs the program.
+
+        :param program: The root node from `ssparser.parse_data`.
+        :raises sssemantics.SemanticError: If the program has semantic errors, nothing is run then.
+        :raises ExecutionError: If running fails.
+        """
+        self.analyze(program)
+        self.globals = [None] * self.globals_count
+        definitions: List[nodes.Node] = getattr(program, "children_function_or_variable_definition", [])
+        variables: List[nodes.Node] = [definition for definition in definitions
+                                       if definition.nodetype not in sssemantics.FUNCTION_TYPES]
+        with deep_recursion():
+            self.execute(variables, self.globals)
+            self.execute(program.children_statement_list, self.globals)
+
+    def analyze(self, program: nodes.Node) -> sssemantics.Analyzer:
+        """
+        Resolves the names of the program and converts the literals to the scalars of the interpreter.
+
+        :return: The analyzer with the scope tables.
+        :raises sssemantics.SemanticError: With all the errors found.
+        """
+        analyzer: sssemantics.Analyzer = sssemantics.analyze(program, literal=self.numbers.literal)
+        self.functions = analyzer.functions
+        self.globals_count = len(analyzer.globals)
+        self.memos = [Memo(function.definition.child_name.value, self.numbers, function.formals, self.memo_size)
+                      if self.memo_size and function.memoizable else None for function in self.functions]
+        return analyzer
+
+    # Statements
+
+    def execute(self, statements: List[nodes.Node], frame: List[object]):
+        """
+        Executes the statements in order.
+
+        :return: The value of a return statement or None.
+        """
+        table = self.statements
+        for statement in statements:
+            result = table[statement.nodetype](statement, frame)
+            if result is not None:
+                return result
+        return None
+
+    def exec_scalar_definition(self, node: nodes.Node, frame: List[object]):
+        expression = getattr(node, "child_expression", None)
+        frame[node.child_name.slot] = self.numbers.zero if expression is None else self.evaluate(expression, frame)
+
+    def exec_range_definition(self, node: nodes.Node, frame: List[object]):
+        expression = getattr(node, "child_expression", None)
+        frame[node.child_name.slot] = Range() if expression is None else self.evaluate(expression, frame)
+
+    def exec_sheet_definition(self, node: nodes.Node, frame: List[object]):
+        name: str = node.child_name.value
+        init = getattr(node, "child_sheet_init", None)
+        if init is None:
+            sheet: Sheet = new_sheet(self.numbers, name)
+        elif init.nodetype == nodes.TYPE_OP:
+            # columns * rows
+            sheet = new_sheet(self.numbers, name, rows=int(init.child_right.value), columns=int(init.child_left.value))
+        else:
+            rows: List[nodes.Node] = init.children_sheet_init_list
+            cells: Dict[Tuple[int, int], object] = {
+                (index, column): self.evaluate(expression, frame)
+                for index, row in enumerate(rows) for column, expression in sorted(row.expressions.items())
+            }
+            sheet = literal_sheet(self.numbers, name, [row.numbers for row in rows], cells)
+        frame[node.child_name.slot] = sheet
+
+    def exec_assignment(self, node: nodes.Node, frame: List[object]):
+        cell_ref = getattr(node, "child_cell_ref", None)
+        if cell_ref is not None:
+            sheet, row, column = self.locate(cell_ref, frame)
+            write_cell(sheet, row, column, self.evaluate(node.child_expression, frame))
+        elif hasattr(node, "child_sheet_ident"):
+            self.variable(node.child_name, frame).copy_from(self.variable(node.child_sheet_ident, frame))
+        else:
+            name: nodes.Node = node.child_name
+            (frame if name.scope else self.globals)[name.slot] = self.evaluate(node.child_expression, frame)
+
+    def exec_print_scalar(self, node: nodes.Node, frame: List[object]):
+        self.print(node, self.numbers.format(self.evaluate(node.child_expression, frame)))
+
+    def exec_print_range(self, node: nodes.Node, frame: List[object]):
+        values: numpy.ndarray = self.evaluate(node.child_expression, frame).values()
+        self.print(node, " ".join(map(self.numbers.format, values.tolist())))
+
+    def exec_print_sheet(self, node: nodes.Node, frame: List[object]):
+        sheet: Sheet = self.variable(node.child_name, frame)
+        info = getattr(node, "child_info_string", None)
+        lines: List[str] = [] if info is None else [info.value]
+        lines.extend(" ".join(map(self.numbers.format, row)) for row in sheet.cells.tolist())
+        print("\n".join(lines), file=self.output)
+
+    def print(self, node: nodes.Node, text: str):
+        info = getattr(node, "child_info_string", None)
+        print(text if info is None else f"{info.value} {text}", file=self.output)
+
+    def exec_if(self, node: nodes.Node, frame: List[object]):
+        if self.evaluate(node.child_condition, frame):
+            return self.execute(node.children_then_statement_list, frame)
+        statements = getattr(node, "children_else_statement_list", None)
+        if statements is not None:
+            return self.execute(statements, frame)
+        return None
+
+    def exec_while(self, node: nodes.Node, frame: List[object]):
+        condition: nodes.Node = node.child_condition
+        statements: List[nodes.Node] = node.children_statement_list
+        while self.evaluate(condition, frame):
+            result = self.execute(statements, frame)
+            if result is not None:
+                return result
+        return None
+
+    def exec_for(self, node: nodes.Node, frame: List[object]):
+        # The ranges are iterated together, $ refers to the cell of the first range.
+        ranges: List[Range] = [self.evaluate(expression, frame) for expression in node.children_range_list]
+        statements: List[nodes.Node] = node.children_statement_list
+        count: int = min(len(cells) for cells in ranges)
+        if node.independent and self.array_operators is not None:
+            expression: nodes.Node = statements[0].child_expression
+            if run_vectorized(ranges[0], count, lambda loop: self.eval_vector(expression, frame, loop)):
+                return None
+        outer = self.loop
+        try:
+            for index in range(count):
+                self.loop = (ranges, index)
+                result = self.execute(statements, frame)
+                if result is not None:
+                    return result
+        finally:
+            self.loop = outer
+        return None
+
+    def exec_subroutine_call(self, node: nodes.Node, frame: List[object]):
+        self.call(node, frame)
+
+    def exec_return(self, node: nodes.Node, frame: List[object]):
+        return self.evaluate(node.child_expression, frame)
+
+    # Expressions
+
+    def evaluate(self, node: nodes.Node, frame: List[object]):
+        return self.expressions[node.nodetype](node, frame)
+
+    def variable(self, name: nodes.Node, frame: List[object]):
+        return (frame if name.scope else self.globals)[name.slot]
+
+    def eval_variable(self, node: nodes.Node, frame: List[object]):
+        return (frame if node.scope else self.globals)[node.slot]
+
+    def eval_decimal(self, node: nodes.Node, frame: List[object]):
+        return node.number
+
+    def eval_op(self, node: nodes.Node, frame: List[object]):
+        left = getattr(node, "child_left", None)
+        if left is not None:
+            return self.operators[node.value](self.evaluate(left, frame), self.evaluate(node.child_right, frame))
+        operand = self.evaluate(node.child_right, frame)
+        if node.value == "#":
+            return self.numbers.count(len(operand))
+        return -operand
+
+    def eval_cell_ref(self, node: nodes.Node, frame: List[object]):
+        sheet, row, column = self.locate(node, frame)
+        return read_cell(sheet, row, column)
+
+    def locate(self, node: nodes.Node, frame: List[object]) -> Cell:
+        """
+        :param node: A cell_ref node.
+        :return: The sheet, row and column of the cell.
+        """
+        coordinate = getattr(node, "child_coordinate_ident", None)
+        if coordinate is not None:
+            return self.variable(node.child_sheet_ident, frame), coordinate.row, coordinate.column
+        # The analysis makes sure that $ is inside a for loop.
+        ranges, index = self.loop
+        range_ident = getattr(node, "child_range_ident", None)
+        if range_ident is None:
+            return ranges[0].cell(index)
+        return range_cell(self.variable(range_ident, frame), index, range_ident.value)
+
+    def eval_vector(self, node: nodes.Node, frame: List[object], loop: VectorLoop):
+        """
+        Evaluates an expression of an independent loop for all its cells.
+
+        :return: An array of the values, or a scalar if the value is the same for all the cells.
+        """
+        if node.nodetype == nodes.TYPE_CELL_REF:
+            coordinate = getattr(node, "child_coordinate_ident", None)
+            if coordinate is not None:
+                return loop.cell(self.variable(node.child_sheet_ident, frame), coordinate.row, coordinate.column)
+            range_ident = getattr(node, "child_range_ident", None)
+            return loop.values(loop.cells if range_ident is None else self.variable(range_ident, frame))
+        if node.nodetype != nodes.TYPE_OP or node.value == "#":
+            return self.evaluate(node, frame)
+        right = self.eval_vector(node.child_right, frame, loop)
+        left = getattr(node, "child_left", None)
+        if left is None:
+            return self.array_operators["negate"](right)
+        return self.array_operators[node.value](self.eval_vector(left, frame, loop), right)
+
+    def eval_range_expression(self, node: nodes.Node, frame: List[object]) -> Range:
+        expression = getattr(node, "child_expression", None)
+        if expression is not None:
+            # range_expr[columns, rows] moves the range
+            columns: int = int(node.child_from.value)
+            rows: int = int(node.child_to.value)
+            return self.evaluate(expression, frame).moved(rows, columns)
+        return range_between(self.locate(node.child_from, frame), self.locate(node.child_to, frame))
+
+    def eval_function_call(self, node: nodes.Node, frame: List[object]):
+        result = self.call(node, frame)
+        if result is None:
+            raise ExecutionError(f"Function '{node.child_name.value}' ended without return")
+        return result
+
+    def call(self, node: nodes.Node, frame: List[object]):
+        """
+        Calls a function or subroutine, or takes the result from its memo.
+
+        :return: The returned value or None.
+        """
+        arguments: List[object] = [self.evaluate(argument, frame)
+                                   for argument in getattr(node, "children_arguments", [])]
+        return self.apply(node.child_name.slot, arguments)
+
+    def apply(self, slot: int, arguments: List[object]):
+        memo: Optional[Memo] = self.memos[slot]
+        if memo is None or memo.dropped:
+            return self.invoke(self.functions[slot], arguments)
+        key: tuple = memo.key(arguments)
+        result = memo.get(key)
+        if result is None:
+            result = self.invoke(self.functions[slot], arguments)
+            if result is not None and not memo.dropped:
+                memo.put(key, result)
+        return result
+
+    def invoke(self, function: sssemantics.Function, arguments: List[object]):
+        """
+        Runs the function with a new frame.
+        """
+        definition: nodes.Node = function.definition
+        local: List[object] = arguments + [None] * (function.variables - len(arguments))
+        outer = self.loop
+        self.loop = None
+        try:
+            self.execute(getattr(definition, "children_variable_definitions", []), local)
+            return self.execute(definition.children_statement_list, local)
+        finally:
+            self.loop = outer
+
+
+@contextlib.contextmanager
+def deep_recursion():
+    """
+    Raises the recursion limit of Python to `RECURSION_LIMIT` for running a program.
+
+    :raises ExecutionError: If the program recurses deeper than that.
+    """
+    limit: int = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, RECURSION_LIMIT))
+    try:
+        yield
+    except RecursionError:
+        raise ExecutionError("Too deep recursion")
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def run(program: nodes.Node, output: TextIO = sys.stdout, exact: bool = False, numbers: Optional[Numbers] = None,
+        memo_size: int = MEMO_SIZE, vectorize: bool = True) -> List[Memo]:
+    """
+    Runs the program with a new interpreter.
+
+    :param program: The root node from `ssparser.parse_data`.
+    :param output: Where the print statements write.
+    :param exact: Use exact scalars instead of floats.
+    :param numbers: See `Interpreter`.
+    :param memo_size: See `Interpreter`.
+    :param vectorize: See `Interpreter`.
+    :return: The memos of the pure functions, for their statistics.
+    """
+    interpreter: Interpreter = Interpreter(output=output, exact=exact, numbers=numbers, memo_size=memo_size,
+                                           vectorize=vectorize)
+    interpreter.run(program)
+    return [memo for memo in interpreter.memos if memo is not None]
@@ -0,0 +1,926 @@
+"""
+The syntax parser of SheetScript.
+The order of grammar definition is preserved as given in specification.
+"""
+import copy
+import decimal
+import functools
+import os
+import sys
+import threading
+from typing import Iterator, List, Optional, Tuple, Type
+
+import ply.yacc
+
+import ssfastlexer
+import sslexer
+import sssyntax as nodes
+import sstables
+
+tokens: List[str] = sslexer.tokens
+
+# The lexer of the parser sessions, `SHEETSCRIPT_LEXER=fast` uses `ssfastlexer` instead of PLY.
+fast_lexer: bool = os.environ.get("SHEETSCRIPT_LEXER", "ply") == "fast"
+
+# Alias for p arg typehint for easier development.
+P = [ply.yacc.YaccProduction]
+
+
+def leaf(p: P, index: int, node: nodes.Node) -> nodes.Node:
+    """
+    Gives a node made from the token p[index] the position of the token.
+
+    :return: node
+    """
+    node.lexpos = node.lexend = p.slice[index].lexpos
+    return node
+
+
+def name(p: P, index: int, node_class: Type[nodes.Node]) -> nodes.Node:
+    """
+    Makes a name node from the token p[index] like `leaf`. The name is interned to the symbol table of the
+    parser session, so the node gets the id of the name and the same string object as the other uses of it.
+    """
+    symbols: nodes.SymbolTable = p.parser.symbols
+    node: nodes.Node = node_class()
+    node.symbol = symbols.intern(p[index])
+    node.value = symbols.names[node.symbol]
+    node.lexpos = node.lexend = p.slice[index].lexpos
+    return node
+
+
+def symbol_span(p: P, index: int) -> Optional[Tuple[int, int]]:
+    """
+    :return: The span of p[index], a token, a node or a list of nodes. None if it is not known.
+    """
+    symbol = p.slice[index]
+    if isinstance(symbol, ply.lex.LexToken):
+        return symbol.lexpos, symbol.lexpos
+    value = symbol.value
+    if isinstance(value, list):
+        if not value:
+            return None
+        first: Optional[Tuple[int, int]] = nodes.span(value[0])
+        last: Optional[Tuple[int, int]] = nodes.span(value[-1])
+        if first is None or last is None:
+            return None
+        return first[0], last[1]
+    if isinstance(value, nodes.Node):
+        return nodes.span(value)
+    return None
+
+
+def located(p: P):
+    """
+    Sets the span of a node made by the rule from the first and the last symbol of the rule.
+    A node passed on from a symbol of the rule keeps its span.
+    """
+    node = p[0]
+    if not isinstance(node, nodes.Node) or hasattr(node, "lexpos"):
+        return
+    first: Optional[Tuple[int, int]] = symbol_span(p, 1)
+    last: Optional[Tuple[int, int]] = symbol_span(p, len(p) - 1)
+    if first is not None and last is not None:
+        node.lexpos = first[0]
+        node.lexend = last[1]
+
+
+def p_program(p: P):
+    """program : multiple_function_or_variable_definition statement_list
+               | statement_list"""
+    if len(p) == 3:
+        # multiple_function_or_variable_definition statement_list
+        p[0] = nodes.Program(children_function_or_variable_definition=p[1],
+                             children_statement_list=p[2])
+    else:
+        # statement_list
+        p[0] = nodes.Program(children_statement_list=p[1])
+    located(p)
+
+
+# Additional definition for multiple function_or_variable_defs, uses lists
+# The lists are left-recursive so that each definition is appended to the same list instead of copying it,
+# and the parser stack does not grow with the length of the list.
+def p_multiple_function_or_variable_definition(p: P):
+    """multiple_function_or_variable_definition : multiple_function_or_variable_definition function_or_variable_definition
+                                                | function_or_variable_definition"""
+    # A definition with a syntax error is None and left out.
+    if len(p) == 3:
+        # multiple_function_or_variable_definition function_or_variable_definition
+        if p[2] is not None:
+            p[1].append(p[2])
+        p[0] = p[1]
+    else:
+        # function_or_variable_definition
+        p[0] = [] if p[1] is None else [p[1]]
+
+
+def p_function_or_variable_definition(p: P):
+    """function_or_variable_definition : variable_definition
+                                       | function_definition
+                                       | subroutine_definition"""
+    # Omitted
+    p[0] = p[1]
+
+
+def p_variable_definition(p: P):
+    """variable_definition : scalar_definition
+                           | range_definition
+                           | sheet_definition"""
+    # Omitted
+    p[0] = p[1]
+
+
+def p_function_definition(p: P):
+    """function_definition : FUNCTION FUNC_IDENT LSQUARE RSQUARE RETURN scalar_or_range IS statement_list END
+                           | FUNCTION FUNC_IDENT LSQUARE formals RSQUARE RETURN scalar_or_range IS statement_list END
+                           | FUNCTION FUNC_IDENT LSQUARE RSQUARE RETURN scalar_or_range IS multiple_variable_definition statement_list END
+                           | FUNCTION FUNC_IDENT LSQUARE formals RSQUARE RETURN scalar_or_range IS multiple_variable_definition statement_list END"""
+    length: int = len(p)
+
+    p[0] = nodes.FunctionDefinition(
+        child_name=name(p, 2, nodes.FuncIdent)
+    )
+    if length == 10:
+        # FUNCTION FUNC_IDENT LSQUARE RSQUARE RETURN scalar_or_range IS statement_list END
+        p[0].child_return_type = nodes.ReturnType(value=p[6])
+        p[0].children_statement_list = p[8]
+    elif length == 11:
+        if p[4] == ']':
+            # FUNCTION FUNC_IDENT LSQUARE RSQUARE RETURN scalar_or_range IS multiple_variable_definition statement_list END
+            p[0].child_return_type = nodes.ReturnType(value=p[6])
+            p[0].children_variable_definitions = p[8]
+            p[0].children_statement_list = p[9]
+        else:
+            # FUNCTION FUNC_IDENT LSQUARE formals RSQUARE RETURN scalar_or_range IS statement_list END
+            p[0].child_return_type = nodes.ReturnType(value=p[7])
+            p[0].children_formals = p[4]
+            p[0].children_statement_list = p[9]
+    elif length == 12:
+        # FUNCTION FUNC_IDENT LSQUARE formals RSQUARE RETURN scalar_or_range IS multiple_variable_definition statement_list END
+        p[0].child_return_type = nodes.ReturnType(value=p[7])
+        p[0].children_formals = p[4]
+        p[0].children_variable_definitions = p[9]
+        p[0].children_statement_list = p[10]
+    located(p)
+
+
+# helper definition for scalar or range in function
+def p_scalar_or_range(p: P):
+    """scalar_or_range : SCALAR
+                       | RANGE"""
+    # Omitted, since its just helper for function to check the syntax.
+    p[0] = p[1]
+
+
+# helper definition for multiple variables
+def p_multiple_variable_definition(p: P):
+    """multiple_variable_definition : multiple_variable_definition variable_definition
+                                    | variable_definition"""
+    if len(p) == 3:
+        # multiple_variable_definition variable_definition
+        p[1].append(p[2])
+        p[0] = p[1]
+    else:
+        # variable_definition
+        p[0] = [p[1]]
+
+
+def p_subroutine_definition(p: P):
+    """subroutine_definition : SUBROUTINE FUNC_IDENT LSQUARE RSQUARE IS multiple_variable_definition statement_list END
+                             | SUBROUTINE FUNC_IDENT LSQUARE formals RSQUARE IS multiple_variable_definition statement_list END"""
+    length: int = len(p)
+    if length == 9:
+        # without formals
+        p[0] = nodes.SubroutineDefinition(
+            child_name=name(p, 2, nodes.FuncIdent),
+            children_variable_definitions=p[6],
+            children_statement_list=p[7]
+        )
+    else:
+        # with formals
+        p[0] = nodes.SubroutineDefinition(
+            child_name=name(p, 2, nodes.FuncIdent),
+            children_formals=p[4],
+            children_variable_definitions=p[7],
+            children_statement_list=p[8]
+        )
+    located(p)
+
+
+def p_formals(p: P):
+    """formals : formals COMMA formal_arg
+               | formal_arg"""
+    length: int = len(p)
+    if length == 4:
+        p[1].append(p[3])
+        p[0] = p[1]
+    else:
+        p[0] = [p[1]]
+
+
+def p_formal_arg(p: P):
+    """formal_arg : IDENT COLON SCALAR
+                  | RANGE_IDENT COLON RANGE
+                  | SHEET_IDENT COLON SHEET"""
+    if p[3] == 'scalar':
+        p[0] = nodes.FormalArg(
+            value=p[3],
+            child_name=name(p, 1, nodes.Ident)
+        )
+    elif p[3] == 'range':
+        p[0] = nodes.FormalArg(
+            value=p[3],
+            child_name=name(p, 1, nodes.RangeIdent)
+        )
+    elif p[3] == 'sheet':
+        p[0] = nodes.FormalArg(
+            value=p[3],
+            child_name=name(p, 1, nodes.SheetInit)
+        )
+    located(p)
+
+
+def p_sheet_definition(p: P):
+    """sheet_definition : SHEET SHEET_IDENT sheet_init
+                        | SHEET SHEET_IDENT
+    """
+    if len(p) == 4:
+        # SHEET SHEET_IDENT sheet_init
+        p[0] = nodes.SheetDefinition(
+            child_name=name(p, 2, nodes.SheetName),
+            child_sheet_init=p[3]
+        )
+    else:
+        # SHEET SHEET_IDENT
+        p[0] = nodes.SheetDefinition(
+            child_name=name(p, 2, nodes.SheetName),
+        )
+    located(p)
+
+
+def p_sheet_init(p: P):
+    """sheet_init : EQ sheet_init_list
+                  | EQ INT_LITERAL MULT INT_LITERAL
+    """
+    if len(p) == 3:
+        # EQ sheet_init_list
+        p[0] = nodes.SheetInit(children_sheet_init_list=p[2])
+    else:
+        # EQ INT_LITERAL MULT INT_LITERAL
+        p[0] = nodes.Op(
+            value=p[3],
+            child_left=leaf(p, 2, nodes.IntLiteral(value=p[2])),
+            child_right=leaf(p, 4, nodes.IntLiteral(value=p[4]))
+        )
+        # The size without the EQ.
+        p[0].lexpos = p.slice[2].lexpos
+        p[0].lexend = p.slice[4].lexpos
+    located(p)
+
+
+def p_sheet_init_list(p: P):
+    """sheet_init_list : LCURLY multiple_sheet_row RCURLY"""
+    p[0] = p[2]
+
+
+def p_multiple_sheet_row(p: P):
+    """multiple_sheet_row : multiple_sheet_row sheet_row
+                          | sheet_row"""
+    length: int = len(p)
+    if length == 3:
+        # {sheet_row} sheet_row
+        p[1].append(p[2])
+        p[0] = p[1]
+    elif length == 2:
+        # sheet_row
+        p[0] = [p[1]]
+
+
+def p_sheet_row(p: P):
+    """sheet_row : sheet_row COMMA simple_expr
+                 | simple_expr"""
+    length: int = len(p)
+    if length == 4:
+        # { simple_expr COMMA } simple_expr
+        p[1].append(p[3])
+        p[0] = p[1]
+        end: Optional[Tuple[int, int]] = symbol_span(p, 3)
+        if end is not None and hasattr(p[0], "lexpos"):
+            p[0].lexend = end[1]
+    elif length == 2:
+        # simple_expr
+        p[0] = nodes.SheetRow([p[1]])
+        located(p)
+
+
+def p_range_definition(p: P):
+    """range_definition : RANGE RANGE_IDENT EQ range_expr
+                        | RANGE RANGE_IDENT"""
+    if len(p) == 5:
+        # RANGE RANGE_IDENT EQ range_expr
+        p[0] = nodes.RangeDefinition(
+            child_name=name(p, 2, nodes.RangeIdent),
+            child_expression=p[4]
+        )
+    elif len(p) == 3:
+        # RANGE RANGE_IDENT
+        p[0] = nodes.RangeDefinition(
+            child_name=name(p, 2, nodes.RangeIdent),
+        )
+    located(p)
+
+
+def p_scalar_definition(p: P):
+    """scalar_definition : SCALAR IDENT EQ scalar_expr
+                         | SCALAR IDENT"""
+    if len(p) == 5:
+        # SCALAR IDENT EQ scalar_expr
+        p[0] = nodes.ScalarDefinition(
+            child_name=name(p, 2, nodes.Scalar),
+            child_expression=p[4]
+        )
+    elif len(p) == 3:
+        # SCALAR IDENT
+        p[0] = nodes.ScalarDefinition(
+            child_name=name(p, 2, nodes.Scalar),
+        )
+    located(p)
+
+
+def p_statement_list(p: P):
+    """statement_list : statement_list statement
+                      | statement"""
+    # A statement with a syntax error is None and left out.
+    length: int = len(p)
+    if length == 3:
+        # {statement} statement
+        if p[2] is not None:
+            p[1].append(p[2])
+        p[0] = p[1]
+    else:
+        # statement
+        p[0] = [] if p[1] is None else [p[1]]
+
+
+def p_statement(p: P):
+    """statement : PRINT_SHEET SHEET_IDENT
+                 | PRINT_SHEET INFO_STRING SHEET_IDENT
+                 | PRINT_RANGE range_expr
+                 | PRINT_RANGE INFO_STRING range_expr
+                 | PRINT_SCALAR scalar_expr
+                 | PRINT_SCALAR INFO_STRING scalar_expr
+                 | IF scalar_expr THEN statement_list ENDIF
+                 | IF scalar_expr THEN statement_list ELSE statement_list ENDIF
+                 | WHILE scalar_expr DO statement_list DONE
+                 | FOR range_list DO statement_list DONE
+                 | subroutine_call
+                 | RETURN scalar_expr
+                 | RETURN range_expr
+                 | assignment"""
+    length: int = len(p)
+    if p[1] in ["print_sheet", "print_range", "print_scalar"]:
+        # PRINT_SHEET [INFO_STRING] SHEET_IDENT
+        # PRINT_RANGE [INFO_STRING] range_expr
+        # PRINT_SCALAR [INFO_STRING] scalar_expr
+        if len(p) == 4:
+            # has info string
+            if isinstance(p[3], nodes.Node):
+                # range_expr or scalar_expr
+                p[0] = nodes.NODE_CLASSES[p[1]](
+                    child_info_string=leaf(p, 2, nodes.InfoString(value=p[2])),
+                    child_expression=p[3]
+                )
+            else:
+                # sheet_ident
+                p[0] = nodes.NODE_CLASSES[p[1]](
+                    child_info_string=leaf(p, 2, nodes.InfoString(value=p[2])),
+                    child_name=name(p, 3, nodes.SheetIdent)
+                )
+        else:
+            # without info string
+            if isinstance(p[2], nodes.Node):
+                p[0] = nodes.NODE_CLASSES[p[1]](child_expression=p[2])
+            else:
+                p[0] = nodes.NODE_CLASSES[p[1]](child_name=name(p, 2, nodes.SheetIdent))
+    elif p[1] == "if":
+        # IF scalar_expr THEN statement_list [ELSE statement_list] ENDIF
+        if length == 6:
+            p[0] = nodes.If(
+                child_condition=p[2],
+                children_then_statement_list=p[4]
+            )
+        elif length == 8:
+            # with else
+            p[0] = nodes.If(
+                child_condition=p[2],
+                children_then_statement_list=p[4],
+                children_else_statement_list=p[6]
+            )
+    elif p[1] == "while":
+        # WHILE scalar_expr DO statement_list DONE
+        p[0] = nodes.While(child_condition=p[2], children_statement_list=p[4])
+    elif p[1] == "for":
+        # FOR range_list DO statement_list DONE
+        p[0] = nodes.For(children_range_list=p[2], children_statement_list=p[4])
+    elif p[1] == "return":
+        # RETURN scalar_expr
+        # RETURN range_expr
+        p[0] = nodes.Return(child_expression=p[2])
+    else:
+        # assignment, subroutine_call
+        p[0] = p[1]
+    located(p)
+
+
+def p_range_list(p: P):
+    """range_list : range_list COMMA range_expr
+                  | range_expr"""
+    length: int = len(p)
+    if length == 4:
+        # { range_expr COMMA } range_expr
+        p[1].append(p[3])
+        p[0] = p[1]
+    elif length == 2:
+        # range_expr
+        p[0] = [p[1]]
+
+
+def p_arguments(p: P):
+    """arguments : arg_expr COMMA arg_expr
+                 | arg_expr"""
+    if len(p) == 4:
+        # arg_expr COMMA arg_expr
+        if type(p[1]) is list and type(p[3]) is list:
+            p[0] = p[1] + p[3]
+        elif type(p[1]) is list and type(p[3]) is not list:
+            p[0] = p[1] + [p[3]]
+        elif type(p[1]) is not list and type(p[3]) is list:
+            p[0] = [p[1]] + p[3]
+        else:
+            p[0] = [p[1], p[3]]
+    else:
+        # arg_expr
+        p[0] = [p[1]]
+
+
+def p_arg_expr(p: P):
+    """arg_expr : scalar_expr
+                | range_expr
+                | SHEET_IDENT"""
+    if isinstance(p[1], nodes.Node):
+        # scalar_expr or range_expr
+        p[0] = p[1]
+    else:
+        # SHEET IDENT
+        p[0] = name(p, 1, nodes.SheetIdent)
+
+
+def p_subroutine_call(p: P):
+    """subroutine_call : FUNC_IDENT LSQUARE arguments RSQUARE
+                       | FUNC_IDENT LSQUARE RSQUARE"""
+    length: int = len(p)
+    if length == 5:
+        # with arguments
+        p[0] = nodes.SubroutineCall(
+            child_name=name(p, 1, nodes.FuncIdent),
+            children_arguments=p[3]
+        )
+    else:
+        # without arguments
+        p[0] = nodes.SubroutineCall(
+            child_name=name(p, 1, nodes.FuncIdent)
+        )
+    located(p)
+
+
+def p_assignment(p: P):
+    """assignment : IDENT ASSIGN scalar_expr
+                  | cell_ref ASSIGN scalar_expr
+                  | RANGE_IDENT ASSIGN range_expr
+                  | SHEET_IDENT ASSIGN SHEET_IDENT"""
+    if isinstance(p[1], nodes.Node):
+        # cell_ref ASSIGN scalar_expr
+        p[0] = nodes.Assignment(
+            child_cell_ref=p[1],
+            child_expression=p[3]
+        )
+    elif not isinstance(p[3], nodes.Node):
+        # SHEET_IDENT ASSIGN SHEET_IDENT
+        p[0] = nodes.Assignment(
+            child_name=name(p, 1, nodes.SheetIdent),
+            child_sheet_ident=name(p, 3, nodes.SheetIdent)
+        )
+    elif p[3].nodetype == nodes.TYPE_RANGE_EXPRESSION:
+        # RANGE_IDENT ASSIGN range_expr
+        p[0] = nodes.Assignment(
+            child_name=name(p, 1, nodes.RangeIdent),
+            child_expression=p[3]
+        )
+    else:
+        # IDENT ASSIGN scalar_expr
+        p[0] = nodes.Assignment(
+            child_name=name(p, 1, nodes.Ident),
+            child_expression=p[3]
+        )
+    located(p)
+
+
+def p_range_expr(p: P):
+    """range_expr : RANGE_IDENT
+                  | RANGE cell_ref DOTDOT cell_ref
+                  | LSQUARE function_call RSQUARE
+                  | range_expr LSQUARE INT_LITERAL COMMA INT_LITERAL RSQUARE"""
+    length: int = len(p)
+    if length == 2:
+        # RANGE_IDENT, should be a reference
+        p[0] = name(p, 1, nodes.RangeIdent)
+    elif length == 5:
+        # RANGE cell_ref DOTDOT cell_ref
+        p[0] = nodes.RangeExpression(child_from=p[2], child_to=p[4])
+    elif length == 4:
+        # LSQUARE function_call RSQUARE
+        p[0] = p[2]
+    elif length == 7:
+        # range_expr LSQUARE INT_LITERAL COMMA INT_LITERAL RSQUARE
+        p[0] = nodes.RangeExpression(
+            child_expression=p[1],
+            child_from=leaf(p, 3, nodes.IntLiteral(value=p[3])),
+            child_to=leaf(p, 5, nodes.IntLiteral(value=p[5]))
+        )
+    located(p)
+
+
+def p_cell_ref(p: P):
+    """cell_ref : SHEET_IDENT SQUOTE COORDINATE_IDENT
+                | DOLLAR COLON RANGE_IDENT
+                | DOLLAR
+    """
+    length: int = len(p)
+    if length == 4:
+        if p[1] == "$":
+            # DOLLAR COLON RANGE_IDENT
+            p[0] = nodes.CellRef(
+                child_range_ident=name(p, 3, nodes.RangeIdent)
+            )
+        else:
+            # SHEET_IDENT SQUOTE COORDINATE_IDENT
+            p[0] = nodes.CellRef(
+                child_sheet_ident=name(p, 1, nodes.SheetIdent),
+                child_coordinate_ident=leaf(p, 3, nodes.CoordinateIdent(value=p[3]))
+            )
+    elif length == 2:
+        # DOLLAR
+        # should it be empty?
+        p[0] = leaf(p, 1, nodes.CellRef(value=p[1]))
+    located(p)
+
+
+def p_scalar_expr(p: P):
+    """scalar_expr : simple_expr scalar_op scalar_expr
+                   | simple_expr"""
+    length: int = len(p)
+    if length == 4:
+        # simple_expr scalar_op scalar_expr
+        p[0] = nodes.Op(value=p[2], child_left=p[1], child_right=p[3])
+    elif length == 2:
+        # simple_expr
+        p[0] = p[1]
+    located(p)
+
+
+# helper rule for scalar expr
+def p_scalar_op(p: P):
+    """scalar_op : EQ
+                 | NOTEQ
+                 | LT
+                 | LTEQ
+                 | GT
+                 | GTEQ"""
+    p[0] = p[1]
+
+
+def p_simple_expr(p: P):
+    """simple_expr : term PLUS simple_expr
+                   | term MINUS simple_expr
+                   | term"""
+    if len(p) == 4:
+        # term {(PLUS|MINUS) term}
+        p[0] = nodes.Op(value=p[2], child_left=p[1], child_right=p[3])
+    elif len(p) == 2:
+        # term
+        p[0] = p[1]
+    located(p)
+
+
+def p_term(p: P):
+    """term : factor MULT term
+            | factor DIV term
+            | factor"""
+    if len(p) == 4:
+        # factor {(MULT | DIV) factor}
+        p[0] = nodes.Op(value=p[2], child_left=p[1], child_right=p[3])
+    elif len(p) == 2:
+        # factor
+        p[0] = p[1]
+    located(p)
+
+
+def p_factor(p: P):
+    """factor : MINUS atom
+              | atom"""
+    if len(p) == 3:
+        # MINUS atom
+        p[0] = nodes.Op(value=p[1], child_right=p[2])
+    elif len(p) == 2:
+        # atom
+        p[0] = p[1]
+    located(p)
+
+
+def p_atom_ident(p: P):
+    """atom : IDENT"""
+    p[0] = name(p, 1, nodes.Ident)
+
+
+def p_atom_decimal(p: P):
+    """atom : DECIMAL_LITERAL"""
+    p[0] = nodes.DecimalLiteral(value=decimal.Decimal(p[1]))
+    located(p)
+
+
+def p_atom(p: P):
+    """atom : function_call
+            | cell_ref
+            | NUMBER_SIGN range_expr
+            | LPAREN scalar_expr RPAREN
+    """
+    if len(p) == 2:
+        # function_call or cell_ref
+        p[0] = p[1]
+    elif (len(p)) == 3:
+        # NUMBER_SIGN range_expr, the size of the range
+        p[0] = nodes.Op(value=p[1], child_right=p[2])
+    elif (len(p)) == 4:
+        # LPAREN scalar_expr RPAREN
+        p[0] = p[2]
+    located(p)
+
+
+def p_function_call(p: P):
+    """function_call : FUNC_IDENT LSQUARE arguments RSQUARE
+                     | FUNC_IDENT LSQUARE RSQUARE"""
+
+    if len(p) == 4:
+        # FUNC_IDENT LSQUARE RSQUARE
+        p[0] = nodes.FunctionCall(
+            child_name=name(p, 1, nodes.FuncIdent),
+        )
+    else:
+        # With args
+        p[0] = nodes.FunctionCall(
+            child_name=name(p, 1, nodes.FuncIdent),
+            children_arguments=p[3]
+        )
+    located(p)
+
+
+# Error recovery, the parser continues after the next statement or after the END, DONE or ENDIF of the block
+# where the error was. The tokens in between are skipped and the statement or definition is None.
+def p_statement_error(p: P):
+    """statement : error
+                 | IF error ENDIF
+                 | WHILE error DONE
+                 | FOR error DONE"""
+    if len(p) == 2:
+        # `statement : error` takes no tokens, so if the token after it cannot follow a statement either, PLY
+        # would make a new error of it and reduce this again forever. The second time the session skips it.
+        if p[1] is getattr(p.parser, "recovered", None):
+            p.parser.errok()
+        p.parser.recovered = p[1]
+    p[0] = None
+
+
+def p_definition_error(p: P):
+    """function_definition : FUNCTION error END
+       subroutine_definition : SUBROUTINE error END"""
+    p[0] = None
+
+
+def syntax_error(token: Optional[ply.lex.LexToken], lexer: sslexer.Lexer) -> sslexer.SourceError:
+    """
+    :param token: The unexpected token or None at the end of the input.
+    :param lexer: The lexer session that read the token.
+    """
+    if token is None:
+        data: str = lexer.lexer.lexdata
+        return sslexer.SourceError("Syntax error at end of input", lexer.lexer.lineno,
+                                   sslexer.find_column(data, len(data)))
+    return sslexer.SourceError(f"Syntax error at '{token.value}'", token.lineno, lexer.column(token))
+
+
+def p_error(p: P):
+    """
+    Used only by the module level parser, the sessions collect all the errors instead of stopping at the first.
+    """
+    if p is None:
+        raise ParseError([sslexer.SourceError("Syntax error at end of input", 0, 0)])
+    # PLY gives the token the lexer that read it, a session or the PLY lexer.
+    data: str = getattr(p.lexer, "lexdata", None) or p.lexer.lexer.lexdata
+    raise ParseError([sslexer.SourceError(f"Syntax error at '{p.value}'", p.lineno,
+                                          sslexer.find_column(data, p.lexpos))])
+
+
+class ParseError(Exception):
+    """
+    Raised with all the lexical and syntax errors found in the source.
+    """
+
+    def __init__(self, errors: List[sslexer.SourceError]):
+        super().__init__("\n".join(str(error) for error in errors))
+        self.errors: List[sslexer.SourceError] = errors
+
+
+if sstables.enabled:
+    # The key changes with any docstring of p_ functions so the signature check can be skipped.
+    parser: ply.yacc.LRParser = sstables.build_parser(
+        lambda picklefile: ply.yacc.yacc(debug=False, optimize=True, picklefile=picklefile),
+        sstables.rules_key(globals(), "p_"))
+else:
+    parser: ply.yacc.LRParser = ply.yacc.yacc(debug=False, write_tables=False)
+
+
+# Start symbol of the parser for top-level definitions without statements, used by incremental parsing.
+DEFINITIONS_START: str = "multiple_function_or_variable_definition"
+
+_definitions_parser: Optional[ply.yacc.LRParser] = None
+_definitions_lock: threading.Lock = threading.Lock()
+
+
+def get_definitions_parser() -> ply.yacc.LRParser:
+    """
+    Builds the parser for DEFINITIONS_START on first use since it is not needed for parsing whole programs.
+    The warnings about the unreachable program rules are not printed.
+    """
+    global _definitions_parser
+    with _definitions_lock:
+        if _definitions_parser is None:
+            module = sys.modules[__name__]
+            if sstables.enabled:
+                key: str = sstables.rules_key(dict(globals(), start=DEFINITIONS_START), "p_")
+                _definitions_parser = sstables.build_parser(
+                    lambda picklefile: ply.yacc.yacc(module=module, start=DEFINITIONS_START, debug=False,
+                                                     optimize=True, picklefile=picklefile,
+                                                     errorlog=ply.yacc.NullLogger()),
+                    key, name="definitions_parsetab")
+            else:
+                _definitions_parser = ply.yacc.yacc(module=module, start=DEFINITIONS_START, debug=False,
+                                                    write_tables=False, errorlog=ply.yacc.NullLogger())
+    return _definitions_parser
+
+
+class Parser:
+    """
+    A parser session with its own lexer session and parser state.
+
+    The PLY parser stores the parsing state in itself, so the module level `parser` cannot be
+    used by two threads at once. The session has a shallow copy of it that shares the LALR tables.
+    """
+
+    def __init__(self, fast: Optional[bool] = None):
+        """
+        :param fast: Tokenize with `ssfastlexer`, the tokens are the same. By default `fast_lexer`.
+        """
+        if fast is None:
+            fast = fast_lexer
+        self.lexer: sslexer.Lexer = ssfastlexer.FastLexer(recover=True) if fast else sslexer.Lexer(recover=True)
+        self.parser: ply.yacc.LRParser = copy.copy(parser)
+        # The copies call the session instead of p_error, so the errors of one session are not seen by others.
+        self.parser.errorfunc = functools.partial(self.error, self.parser)
+        self.definitions_parser: Optional[ply.yacc.LRParser] = None
+        self.errors: List[sslexer.SourceError] = []
+        # The symbol table of the current parse, the rules reach it as `p.parser.symbols`.
+        self.parser.symbols = None
+
+    def error(self, parser_copy: ply.yacc.LRParser, token: Optional[ply.lex.LexToken]):
+        """
+        Collects the syntax error, the parser then recovers with the error rules.
+
+        :param parser_copy: The parser of the session that found the error.
+        :return: The token to continue from if the token is skipped, see `p_statement_error`.
+        """
+        if token is not None and token is getattr(parser_copy, "recovered", None):
+            parser_copy.errok()
+            return parser_copy.token()
+        self.errors.append(syntax_error(token, self.lexer))
+
+    def start(self, parser_copy: ply.yacc.LRParser, symbols: Optional[nodes.SymbolTable]):
+        """
+        Prepares a parser of the session for a new parse.
+
+        :param symbols: The symbol table where the names are interned, None for a new table.
+        """
+        self.errors.clear()
+        parser_copy.symbols = nodes.SymbolTable() if symbols is None else symbols
+        # The token skipped last time, see `p_statement_error`. The same tokens can be parsed again.
+        parser_copy.recovered = None
+
+    def finish(self, tree, errors: Optional[List[sslexer.SourceError]]):
+        """
+        :param tree: What the parser returned, None if it could not recover. A program gets the symbol table.
+        :param errors: The list for the errors, None to raise them.
+        :return: The tree.
+        :raises ParseError: If errors is None and there were errors.
+        """
+        if isinstance(tree, nodes.Program):
+            tree.symbols = self.parser.symbols
+        found: List[sslexer.SourceError] = sorted(self.lexer.errors + self.errors,
+                                                  key=lambda error: (error.line, error.column))
+        self.errors.clear()
+        self.lexer.errors.clear()
+        if errors is not None:
+            errors.extend(found)
+        elif found:
+            raise ParseError(found)
+        return tree
+
+    def parse(self, data: str, errors: Optional[List[sslexer.SourceError]] = None):
+        """
+        Returns the root of the abstract syntax tree.
+
+        :param errors: If given, the lexical and syntax errors are added to it instead of raising ParseError.
+            The tree is then returned without the statements and definitions that had errors, or None.
+        :raises ParseError: With all the errors found if errors is not given.
+        """
+        self.start(self.parser, None)
+        return self.finish(self.parser.parse(data, lexer=self.lexer, debug=False), errors)
+
+    def parse_stream(self, source: sslexer.Source, errors: Optional[List[sslexer.SourceError]] = None):
+        """
+        Returns the root of the abstract syntax tree.
+        The tokens are read lazily from the source instead of tokenizing the whole input first.
+
+        :param source: A string, bytes, mmap or a file object.
+        :param errors: See `parse`.
+        """
+        tokens: Iterator[ply.lex.LexToken] = self.lexer.iter_tokens(source)
+        self.start(self.parser, None)
+        return self.finish(self.parser.parse(lexer=self.lexer, tokenfunc=lambda: next(tokens, None), debug=False),
+                           errors)
+
+    def parse_tokens(self, tokens: List[ply.lex.LexToken], definitions: bool = False,
+                     errors: Optional[List[sslexer.SourceError]] = None,
+                     symbols: Optional[nodes.SymbolTable] = None):
+        """
+        Parses tokens that are already tokenized by the lexer of this session, its errors are included.
+
+        :param definitions: Parse only top-level definitions instead of a whole program.
+        :param errors: See `parse`.
+        :param symbols: The symbol table of the program the tokens are part of, by default a new table.
+        :return: The root of the abstract syntax tree or the list of definition nodes.
+        """
+        if definitions:
+            if self.definitions_parser is None:
+                self.definitions_parser = copy.copy(get_definitions_parser())
+                self.definitions_parser.errorfunc = functools.partial(self.error, self.definitions_parser)
+            parser_copy: ply.yacc.LRParser = self.definitions_parser
+        else:
+            parser_copy = self.parser
+        self.start(parser_copy, symbols)
+        remaining: Iterator[ply.lex.LexToken] = iter(tokens)
+        return self.finish(parser_copy.parse(lexer=self.lexer, tokenfunc=lambda: next(remaining, None), debug=False),
+                           errors)
+
+
+# One session per thread so that parse_data can be called concurrently.
+_sessions: threading.local = threading.local()
+
+
+def get_session() -> Parser:
+    """
+    :return: The parser session of the current thread.
+    """
+    session = getattr(_sessions, "parser", None)
+    if session is None:
+        session = _sessions.parser = Parser()
+    return session
+
+
+def parse_data(data: str, errors: Optional[List[sslexer.SourceError]] = None):
+    """
+    Returns the root of the abstract syntax tree.
+    This is thread-safe since each thread uses its own parser session.
+
+    :raises ParseError: With every error in the source, unless errors is given, see `Parser.parse`.
+    """
+    return get_session().parse(data, errors)
+
+
+def parse_stream(source: sslexer.Source, errors: Optional[List[sslexer.SourceError]] = None):
+    """
+    Returns the root of the abstract syntax tree.
+    The source can be a file object or mmap which is tokenized lazily.
+
+    :raises ParseError: See `parse_data`.
+    """
+    return get_session().parse_stream(source, errors)
@@ -0,0 +1,478 @@
+"""
+Recalculation of a program after its input cells change, like a spreadsheet does.
+
+The program is run once with an interpreter that records what each top-level statement (a unit) reads and
+writes: the global variables, single cells, ranges and whole sheets. A location that a unit reads gets an edge
+from the unit that wrote it, so the edges form the dependency graph of the units. Cells that no unit writes are
+the inputs. When an input cell is changed, the units that read it are marked dirty and `recalculate` runs them
+again in the order of the program, which is a topological order since a unit can only depend on the units
+before it. A unit that runs again marks its dependents dirty, so only the transitive dependents of the changed
+cells run.
+
+Running only some of the units gives the same result as running the whole program when every location has one
+writer and nothing reads a location before a later unit writes it. For example `total := total + 1.0` reads its
+old value, so running it again would add one more. Such units are recorded with the reason and a recalculation
+that would need them raises `RecalculationError`, then the whole program has to be run again. A global variable
+that is assigned before anything reads the value of its definition counts as written only by the assignment.
+
+The dependencies are recorded also while recalculating, so a unit that takes another branch adds its new reads
+and writes to the graph.
+"""
+import decimal
+import sys
+from typing import Callable, Dict, List, Optional, Set, TextIO, Tuple
+
+import numpy
+
+import ssinterpreter
+import sssemantics
+import sssyntax as nodes
+from ssinterpreter import Range, Sheet
+
+# A rectangle of cells that a unit read: first row, first column, last row, last column and the unit.
+RangeRead = Tuple[int, int, int, int, int]
+# Covers every cell of a sheet whatever its size.
+WHOLE_SHEET: Tuple[int, int, int, int] = (0, 0, sys.maxsize, sys.maxsize)
+
+
+class RecalculationError(Exception):
+    """
+    Raised when the cells cannot be recalculated without running the whole program again.
+    """
+
+
+def format_coordinate(row: int, column: int) -> str:
+    """
+    The opposite of `sssemantics.parse_coordinate`.
+    """
+    letters: str = ""
+    column += 1
+    while column:
+        column, letter = divmod(column - 1, 26)
+        letters = chr(ord("A") + letter) + letters
+    return f"{letters}{row + 1}"
+
+
+def cell_name(sheet: Sheet, row: int, column: int) -> str:
+    return f"{sheet.name}'{format_coordinate(row, column)}"
+
+
+class Locations:
+    """
+    The writer and the readers of each location of one kind, e.g. the cells of a sheet.
+    """
+    __slots__ = ("writers", "readers")
+
+    def __init__(self):
+        self.writers: Dict[object, int] = {}
+        # Every unit that has read the location.
+        self.readers: Dict[object, Set[int]] = {}
+
+    def writer(self, key) -> Optional[int]:
+        return self.writers.get(key)
+
+
+class SheetLocations(Locations):
+    """
+    The cells of a sheet, also the ranges read from it and the unit that wrote the whole sheet.
+    """
+    __slots__ = ("ranges", "whole_writer", "initial", "whole_initial")
+
+    def __init__(self):
+        super().__init__()
+        self.ranges: Set[RangeRead] = set()
+        self.whole_writer: Optional[int] = None
+        # The values of the written cells before they were written.
+        self.initial: Dict[Tuple[int, int], object] = {}
+        self.whole_initial: Optional[numpy.ndarray] = None
+
+    def writer(self, key) -> Optional[int]:
+        return self.writers.get(key, self.whole_writer)
+
+    def range_readers(self, row: int, column: int) -> List[int]:
+        return [unit for first_row, first_column, last_row, last_column, unit in self.ranges
+                if first_row <= row <= last_row and first_column <= column <= last_column]
+
+
+class Graph:
+    """
+    The dependencies between the units and the units that cannot be run again.
+    """
+
+    def __init__(self, units: int, names: List[str]):
+        """
+        :param names: The names of the global variables by slot, for the messages.
+        """
+        self.dependents: List[Set[int]] = [set() for _ in range(units)]
+        # The cells that each unit has written, None for the whole sheet.
+        self.written: List[List[Tuple[Sheet, Optional[Tuple[int, int]]]]] = [[] for _ in range(units)]
+        self.dirty: List[bool] = [False] * units
+        # Why a unit cannot be run again.
+        self.problems: Dict[int, str] = {}
+        self.variables: Locations = Locations()
+        # The unit of the definition of each global variable.
+        self.definitions: Dict[int, int] = {}
+        self.sheets: Dict[Sheet, SheetLocations] = {}
+        self.names: List[str] = names
+        # True while recalculating, a problem found then means that the result is wrong.
+        self.recalculating: bool = False
+        # A problem found while recalculating that makes the result wrong.
+        self.failure: Optional[str] = None
+
+    def sheet(self, sheet: Sheet) -> SheetLocations:
+        locations: Optional[SheetLocations] = self.sheets.get(sheet)
+        if locations is None:
+            locations = self.sheets[sheet] = SheetLocations()
+        return locations
+
+    def problem(self, unit: int, message: str):
+        self.problems.setdefault(unit, message)
+
+    def read(self, locations: Locations, key, unit: int, name: Callable[[], str]):
+        locations.readers.setdefault(key, set()).add(unit)
+        self.read_written(locations.writer(key), unit, name)
+
+    def read_written(self, writer: Optional[int], unit: int, name: Callable[[], str]):
+        if writer is None or writer == unit:
+            return
+        if writer < unit:
+            self.dependents[writer].add(unit)
+            return
+        # Only possible when recalculating: the unit should have seen the value before the later unit wrote it.
+        message: str = f"{name()} is read before a later statement writes it"
+        self.problem(unit, message)
+        if self.recalculating:
+            self.failure = message
+
+    def write(self, locations: Locations, key, unit: int, name: Callable[[], str], readers: Set[int]):
+        """
+        :param name: Gives the name of the location for the messages, only needed when there is a problem.
+        :param readers: All the units that read the location, also through ranges.
+        """
+        writer: Optional[int] = locations.writer(key)
+        if writer is not None:
+            if writer != unit:
+                message: str = f"{name()} is written by two statements"
+                self.problem(writer, message)
+                self.problem(unit, message)
+                if self.recalculating:
+                    self.failure = message
+            return
+        locations.writers[key] = unit
+        for reader in readers:
+            if reader < unit:
+                self.problem(reader, f"{name()} is read before a later statement writes it")
+            elif reader == unit:
+                self.problem(unit, f"{name()} is read and written by the same statement")
+            else:
+                self.dependents[unit].add(reader)
+
+    # The locations
+
+    def read_variable(self, slot: int, unit: int):
+        self.read(self.variables, slot, unit, lambda: self.names[slot])
+
+    def define_variable(self, slot: int, unit: int):
+        self.definitions[slot] = unit
+        self.write_variable(slot, unit)
+
+    def write_variable(self, slot: int, unit: int):
+        readers: Set[int] = self.variables.readers.get(slot, set())
+        writer: Optional[int] = self.variables.writer(slot)
+        definition: Optional[int] = self.definitions.get(slot)
+        if writer is not None and definition is not None and writer != unit:
+            if unit == definition:
+                # The definition runs again before the assignment that superseded it, see below.
+                return
+            if writer == definition and not any(writer < reader <= unit for reader in readers):
+                # Nothing read the value of the definition, so the assignment is the writer that counts. The
+                # assignment depends on the definition so that it runs again after it.
+                del self.variables.writers[slot]
+                self.dependents[writer].add(unit)
+        self.write(self.variables, slot, unit, lambda: self.names[slot], readers)
+
+    def read_cell(self, sheet: Sheet, row: int, column: int, unit: int):
+        self.read(self.sheet(sheet), (row, column), unit, lambda: cell_name(sheet, row, column))
+
+    def write_cell(self, sheet: Sheet, row: int, column: int, unit: int, previous):
+        """
+        :param previous: The value of the cell before the write.
+        """
+        locations: SheetLocations = self.sheet(sheet)
+        if locations.writer((row, column)) is None:
+            locations.initial[row, column] = previous
+            self.written[unit].append((sheet, (row, column)))
+        readers: Set[int] = set(locations.readers.get((row, column), ()))
+        readers.update(locations.range_readers(row, column))
+        self.write(locations, (row, column), unit, lambda: cell_name(sheet, row, column), readers)
+
+    def read_range(self, sheet: Sheet, first_row: int, first_column: int, last_row: int, last_column: int,
+                   unit: int):
+        locations: SheetLocations = self.sheet(sheet)
+        locations.ranges.add((first_row, first_column, last_row, last_column, unit))
+        self.read_written(locations.whole_writer, unit, lambda: f"sheet {sheet.name}")
+        for (row, column), writer in locations.writers.items():
+            if first_row <= row <= last_row and first_column <= column <= last_column:
+                self.read_written(writer, unit, lambda: cell_name(sheet, row, column))
+
+    def write_sheet(self, sheet: Sheet, unit: int, previous: numpy.ndarray):
+        """
+        :param previous: The cells before the write.
+        """
+        locations: SheetLocations = self.sheet(sheet)
+        name: str = f"sheet {sheet.name}"
+        writers: Set[int] = set(locations.writers.values())
+        if locations.whole_writer is not None:
+            writers.add(locations.whole_writer)
+        writers.discard(unit)
+        if writers:
+            for writer in writers:
+                self.problem(writer, f"{name} is written by two statements")
+            self.problem(unit, f"{name} is written by two statements")
+            if self.recalculating:
+                self.failure = f"{name} is written by two statements"
+            return
+        if locations.whole_writer == unit:
+            return
+        locations.whole_writer = unit
+        locations.whole_initial = previous
+        self.written[unit].append((sheet, None))
+        readers: Set[int] = set().union(*locations.readers.values()) if locations.readers else set()
+        readers.update(range_read[4] for range_read in locations.ranges)
+        for reader in readers:
+            if reader < unit:
+                self.problem(reader, f"{name} is read before a later statement writes it")
+            elif reader == unit:
+                self.problem(unit, f"{name} is read and written by the same statement")
+            else:
+                self.dependents[unit].add(reader)
+
+    def reset(self, unit: int):
+        """
+        Puts back the cells that the unit wrote as they were before it, so a cell that the unit does not write
+        when run again has the same value as when the whole program is run.
+        """
+        for sheet, key in self.written[unit]:
+            locations: SheetLocations = self.sheets[sheet]
+            if key is None:
+                sheet.cells = locations.whole_initial.copy()
+            else:
+                ssinterpreter.write_cell(sheet, key[0], key[1], locations.initial[key])
+
+    def input_readers(self, sheet: Sheet, row: int, column: int) -> Set[int]:
+        """
+        :return: The units that read the input cell.
+        :raises RecalculationError: If a unit writes the cell.
+        """
+        locations: SheetLocations = self.sheet(sheet)
+        if locations.writer((row, column)) is not None:
+            raise RecalculationError(f"{cell_name(sheet, row, column)} is computed by the program")
+        readers: Set[int] = set(locations.readers.get((row, column), ()))
+        readers.update(locations.range_readers(row, column))
+        return readers
+
+
+class TracingInterpreter(ssinterpreter.Interpreter):
+    """
+    An interpreter that records the reads and writes of the current unit to the graph.
+    Only the global variables are recorded, the variables of functions are gone when the call returns.
+    """
+
+    def __init__(self, output: TextIO = sys.stdout, exact: bool = False):
+        # The loops run with arrays would not record their reads and writes.
+        super().__init__(output=output, exact=exact, vectorize=False)
+        # The dispatch tables of the interpreter get the methods of this class.
+        self.graph: Optional[Graph] = None
+        self.unit: int = 0
+        # Whether the cells of the innermost for loop are recorded as one range read.
+        self.loop_read: bool = False
+
+    def defined(self, node: nodes.Node, frame: List[object]):
+        if frame is self.globals:
+            self.graph.define_variable(node.child_name.slot, self.unit)
+
+    def exec_scalar_definition(self, node: nodes.Node, frame: List[object]):
+        super().exec_scalar_definition(node, frame)
+        self.defined(node, frame)
+
+    def exec_range_definition(self, node: nodes.Node, frame: List[object]):
+        super().exec_range_definition(node, frame)
+        self.defined(node, frame)
+
+    def exec_sheet_definition(self, node: nodes.Node, frame: List[object]):
+        super().exec_sheet_definition(node, frame)
+        self.defined(node, frame)
+        # The cells are kept by the sheet, a new sheet would lose them and the changes to them.
+        self.graph.problem(self.unit, f"sheet {node.child_name.value} would be defined again")
+
+    def exec_assignment(self, node: nodes.Node, frame: List[object]):
+        cell_ref = getattr(node, "child_cell_ref", None)
+        if cell_ref is not None:
+            sheet, row, column = self.locate(cell_ref, frame)
+            value = self.evaluate(node.child_expression, frame)
+            previous = ssinterpreter.read_cell(sheet, row, column)
+            ssinterpreter.write_cell(sheet, row, column, value)
+            self.graph.write_cell(sheet, row, column, self.unit, previous)
+        elif hasattr(node, "child_sheet_ident"):
+            source: Sheet = self.variable(node.child_sheet_ident, frame)
+            target: Sheet = self.variable(node.child_name, frame)
+            self.graph.read_range(source, *WHOLE_SHEET, self.unit)
+            previous: numpy.ndarray = target.cells
+            target.copy_from(source)
+            self.graph.write_sheet(target, self.unit, previous)
+        else:
+            super().exec_assignment(node, frame)
+            if not node.child_name.scope:
+                self.graph.write_variable(node.child_name.slot, self.unit)
+
+    def read_cells(self, cells: Range):
+        if cells.sheet is not None and len(cells):
+            self.graph.read_range(cells.sheet, cells.row, cells.column, cells.row + cells.rows - 1,
+                                  cells.column + cells.columns - 1, self.unit)
+
+    def exec_for(self, node: nodes.Node, frame: List[object]):
+        outer: bool = self.loop_read
+        self.loop_read = False
+        try:
+            return super().exec_for(node, frame)
+        finally:
+            self.loop_read = outer
+
+    def apply(self, slot: int, arguments: List[object]):
+        memo: Optional[ssinterpreter.Memo] = self.memos[slot]
+        if memo is not None and not memo.dropped:
+            # A result from the memo does not run the function, which reads only its arguments.
+            for argument in arguments:
+                if isinstance(argument, Range):
+                    self.read_cells(argument)
+        return super().apply(slot, arguments)
+
+    def exec_print_range(self, node: nodes.Node, frame: List[object]):
+        cells: Range = self.evaluate(node.child_expression, frame)
+        self.read_cells(cells)
+        values = cells.values()
+        self.print(node, " ".join(map(self.numbers.format, values.tolist())))
+
+    def exec_print_sheet(self, node: nodes.Node, frame: List[object]):
+        self.graph.read_range(self.variable(node.child_name, frame), *WHOLE_SHEET, self.unit)
+        super().exec_print_sheet(node, frame)
+
+    def variable(self, name: nodes.Node, frame: List[object]):
+        if not name.scope:
+            self.graph.read_variable(name.slot, self.unit)
+            return self.globals[name.slot]
+        return frame[name.slot]
+
+    def eval_variable(self, node: nodes.Node, frame: List[object]):
+        return self.variable(node, frame)
+
+    def eval_cell_ref(self, node: nodes.Node, frame: List[object]):
+        if not hasattr(node, "child_coordinate_ident") and not hasattr(node, "child_range_ident"):
+            # Recording a loop over a range cell by cell would cost more than the loop, $ reads the whole range
+            # instead. A loop that reads $ and writes the same range cannot be recalculated anyway.
+            if not self.loop_read:
+                self.read_cells(self.loop[0][0])
+                self.loop_read = True
+            return ssinterpreter.read_cell(*self.locate(node, frame))
+        sheet, row, column = self.locate(node, frame)
+        self.graph.read_cell(sheet, row, column, self.unit)
+        return ssinterpreter.read_cell(sheet, row, column)
+
+
+class Workbook:
+    """
+    A program that has been run, its input cells can be changed and the results recalculated.
+    """
+
+    def __init__(self, program: nodes.Node, output: TextIO = sys.stdout, exact: bool = False):
+        """
+        Runs the program and records the dependencies.
+
+        :param program: The root node from `ssparser.parse_data`.
+        :param output: Where the print statements write, also when recalculating.
+        :param exact: Use exact scalars instead of floats.
+        :raises sssemantics.SemanticError: If the program has semantic errors.
+        :raises ssinterpreter.ExecutionError: If running fails.
+        """
+        self.interpreter: TracingInterpreter = TracingInterpreter(output=output, exact=exact)
+        interpreter: TracingInterpreter = self.interpreter
+        analyzer: sssemantics.Analyzer = interpreter.analyze(program)
+        interpreter.globals = [None] * interpreter.globals_count
+        definitions: List[nodes.Node] = getattr(program, "children_function_or_variable_definition", [])
+        self.units: List[nodes.Node] = [definition for definition in definitions
+                                        if definition.nodetype not in sssemantics.FUNCTION_TYPES]
+        self.units += program.children_statement_list
+        names: List[str] = [program.symbols.names[symbol] for symbol in analyzer.globals]
+        self.graph: Graph = Graph(len(self.units), names)
+        # The global sheets by name.
+        self.sheets: Dict[str, Sheet] = {}
+        interpreter.graph = self.graph
+        for index in range(len(self.units)):
+            if self.run_unit(index) is not None:
+                # A return at the top level ends the program.
+                del self.units[index + 1:]
+                break
+        self.sheets = {value.name: value for value in interpreter.globals if isinstance(value, Sheet)}
+
+    def run_unit(self, index: int):
+        self.interpreter.unit = index
+        with ssinterpreter.deep_recursion():
+            return self.interpreter.execute([self.units[index]], self.interpreter.globals)
+
+    def sheet(self, name: str) -> Sheet:
+        if name not in self.sheets:
+            raise RecalculationError(f"No sheet {name}")
+        return self.sheets[name]
+
+    def cell(self, name: str, coordinate: str):
+        """
+        :return: The value of a cell, e.g. `cell("SH", "A1")`.
+        """
+        row, column = sssemantics.parse_coordinate(coordinate)
+        return ssinterpreter.read_cell(self.sheet(name), row, column)
+
+    def set_cell(self, name: str, coordinate: str, value):
+        """
+        Changes an input cell and marks the units that read it dirty.
+
+        :param value: A decimal or its string like "1.5", or a scalar of the interpreter.
+        :raises RecalculationError: If the cell is written by the program.
+        """
+        sheet: Sheet = self.sheet(name)
+        row, column = sssemantics.parse_coordinate(coordinate)
+        readers: Set[int] = self.graph.input_readers(sheet, row, column)
+        if isinstance(value, (str, decimal.Decimal)):
+            value = self.interpreter.numbers.literal(decimal.Decimal(value))
+        ssinterpreter.write_cell(sheet, row, column, value)
+        for reader in readers:
+            self.graph.dirty[reader] = True
+
+    def recalculate(self) -> int:
+        """
+        Runs the dirty units and their dependents in the order of the program.
+
+        :return: The number of units run.
+        :raises RecalculationError: If a unit that has to run cannot be run again.
+        """
+        graph: Graph = self.graph
+        dirty: List[bool] = graph.dirty
+        count: int = 0
+        graph.recalculating = True
+        try:
+            for index in range(len(self.units)):
+                if not dirty[index]:
+                    continue
+                if index in graph.problems:
+                    raise RecalculationError(f"Cannot recalculate: {graph.problems[index]}")
+                dirty[index] = False
+                graph.reset(index)
+                self.run_unit(index)
+                count += 1
+                if graph.failure is not None:
+                    raise RecalculationError(f"Cannot recalculate: {graph.failure}")
+                for dependent in graph.dependents[index]:
+                    dirty[dependent] = True
+        finally:
+            graph.recalculating = False
+        return count
+
@@ -0,0 +1,549 @@
+"""
+Static semantic analysis of SheetScript, done once before the program is run or compiled.
+
+The analysis is one pass over the tree. It resolves every name to a slot in the global scope or in the scope of
+its function (`slot` and `scope` of the name nodes), checks that the names are defined, that a call has as many
+arguments as the definition has formals and that each argument and the value of each call has the type that is
+expected there, and that `$` is only used inside a for loop. The runtime can then trust the tree and does not
+check any of these while running.
+
+The type of a variable follows from its name: `IDENT` is a scalar, `RANGE_IDENT` a range and `SHEET_IDENT` a
+sheet. Only the calls can have the wrong type since `[Fn[]]` is a range expression and `Fn[]` a scalar expression
+whatever Fn returns, and an argument can be any of the three.
+
+All the errors are collected so that they are reported at once like the syntax errors. Each function gets its
+scope table, the symbol ids of its variables by slot, which is kept in `Function` for the runtime.
+
+A function is pure when its value depends only on its arguments and calling it does nothing else, so the runtime
+can memoize it. It must not use global variables, print, write cells, move a range (which reads cells outside
+of the argument), build a range other than `range $..$` (which is one cell of the argument) or take a sheet, and
+it may call only pure functions. A function that writes the cells of a range argument is not pure either, even
+though it only uses its arguments.
+
+A for loop is marked `independent` when its body is one assignment to `$` from an expression of literals,
+variables, cells and operators. The body writes no variable, so an iteration can depend on an earlier one only
+through the cells that the earlier one wrote. Whether the cells read are among them is only known while running,
+see `ssinterpreter.VectorLoop`.
+"""
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import sslexer
+import sssyntax as nodes
+
+SCALAR = "scalar"
+RANGE = "range"
+SHEET = "sheet"
+
+# The type of each variable name nodetype.
+VARIABLE_TYPES: Dict[str, str] = {
+    nodes.TYPE_IDENT: SCALAR,
+    nodes.TYPE_SCALAR: SCALAR,
+    nodes.TYPE_RANGE_IDENT: RANGE,
+    nodes.TYPE_SHEET_IDENT: SHEET,
+    nodes.TYPE_SHEET_NAME: SHEET,
+    nodes.TYPE_SHEET_INIT: SHEET,
+}
+
+FUNCTION_TYPES = (nodes.TYPE_FUNCTION_DEFINITION, nodes.TYPE_SUBROUTINE_DEFINITION)
+
+
+class SemanticError(Exception):
+    """
+    Raised with all the semantic errors found in the program, nothing of the program is run.
+    """
+
+    def __init__(self, errors: List[Tuple[Optional[int], str]]):
+        """
+        :param errors: The position in the source (`lexpos`) if known and the message of each error.
+        """
+        super().__init__("\n".join(message for _, message in errors))
+        self.errors: List[Tuple[Optional[int], str]] = errors
+
+    def located(self, source: str) -> List[str]:
+        """
+        :param source: The source code of the program.
+        :return: The errors as `line:column: message` when the position is known.
+        """
+        index: sslexer.LineIndex = sslexer.LineIndex(source)
+        located: List[str] = []
+        for lexpos, message in self.errors:
+            if lexpos is None:
+                located.append(message)
+            else:
+                line, column = index.position(lexpos)
+                located.append(f"{line}:{column}: {message}")
+        return located
+
+
+class Function:
+    """
+    A function or subroutine with the scope table of its frame.
+    The formal arguments take the first slots of the frame.
+    """
+    __slots__ = ("definition", "formals", "returns", "symbols", "pure", "calls")
+
+    def __init__(self, definition: nodes.Node):
+        self.definition: nodes.Node = definition
+        # The types of the formal arguments.
+        self.formals: List[str] = [formal.value for formal in getattr(definition, "children_formals", [])]
+        # The type of the value, None for a subroutine.
+        self.returns: Optional[str] = (definition.child_return_type.value
+                                       if definition.nodetype == nodes.TYPE_FUNCTION_DEFINITION else None)
+        # The symbol ids of the variables by slot.
+        self.symbols: List[int] = []
+        # See the module docstring, only known after the analysis.
+        self.pure: bool = SHEET not in self.formals
+        # The slots of the functions and subroutines that are called.
+        self.calls: Set[int] = set()
+
+    @property
+    def variables(self) -> int:
+        """
+        :return: The number of variables needed for the frame.
+        """
+        return len(self.symbols)
+
+    @property
+    def memoizable(self) -> bool:
+        """
+        :return: True if the results can be reused for the same arguments. A range is a view to the sheet of the
+            argument, so only the scalar results can.
+        """
+        return self.pure and self.returns == SCALAR
+
+
+# The scope that defined a variable and its slot.
+Binding = Tuple["Scope", int]
+
+
+class Scope:
+    """
+    The variables of the program or a function, used only when resolving.
+
+    The visible variables are in one list indexed by the symbol id of the name that all the scopes share, so
+    a lookup is an index and not a walk through the scopes. A local variable replaces the global one with the
+    same name until its scope is closed.
+    """
+    __slots__ = ("bindings", "scope", "shadowed")
+
+    def __init__(self, scope: int, bindings: List[Optional[Binding]]):
+        """
+        :param bindings: The visible variables by symbol id, None if the name is not defined.
+        """
+        self.bindings: List[Optional[Binding]] = bindings
+        self.scope: int = scope
+        # The symbol ids of the variables in the order of their slots and what they replaced.
+        self.shadowed: List[Tuple[int, Optional[Binding]]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.shadowed)
+
+    def symbols(self) -> List[int]:
+        """
+        :return: The scope table, the symbol ids of the variables by slot.
+        """
+        return [symbol for symbol, _ in self.shadowed]
+
+    def define(self, name: nodes.Node) -> bool:
+        """
+        :return: False if the name is already defined in this scope.
+        """
+        binding: Optional[Binding] = self.bindings[name.symbol]
+        if binding is not None and binding[0] is self:
+            return False
+        name.slot = len(self.shadowed)
+        name.scope = self.scope
+        self.shadowed.append((name.symbol, binding))
+        self.bindings[name.symbol] = (self, name.slot)
+        return True
+
+    def lookup(self, name: nodes.Node) -> bool:
+        """
+        :return: False if the name is not defined.
+        """
+        binding: Optional[Binding] = self.bindings[name.symbol]
+        if binding is None:
+            return False
+        name.scope = binding[0].scope
+        name.slot = binding[1]
+        return True
+
+    def close(self):
+        """
+        Makes the variables replaced by this scope visible again.
+        """
+        for symbol, binding in reversed(self.shadowed):
+            self.bindings[symbol] = binding
+
+
+def is_current_cell(node: Optional[nodes.Node]) -> bool:
+    """
+    :return: True if the node is `$` of the innermost for loop.
+    """
+    return (node is not None and node.nodetype == nodes.TYPE_CELL_REF and not hasattr(node, "child_coordinate_ident")
+            and not hasattr(node, "child_range_ident"))
+
+
+def is_same_current_cell(first: nodes.Node, second: nodes.Node) -> bool:
+    """
+    :return: True if both cell_ref nodes are the current cell of the same loop range, `$` or `$:_name`.
+    """
+    if hasattr(first, "child_coordinate_ident") or hasattr(second, "child_coordinate_ident"):
+        return False
+    first_range = getattr(first, "child_range_ident", None)
+    second_range = getattr(second, "child_range_ident", None)
+    if first_range is None or second_range is None:
+        return first_range is second_range
+    return first_range.value == second_range.value
+
+
+def is_elementwise(node: nodes.Node) -> bool:
+    """
+    :return: True if the expression can be computed for all the cells of a loop at once.
+    """
+    # Without recursion so that long expressions don't hit the recursion limit.
+    operands: List[nodes.Node] = [node]
+    while operands:
+        operand: nodes.Node = operands.pop()
+        if operand.nodetype == nodes.TYPE_OP:
+            if operand.value == "#":
+                if operand.child_right.nodetype != nodes.TYPE_RANGE_IDENT:
+                    return False
+                continue
+            left = getattr(operand, "child_left", None)
+            if left is not None:
+                operands.append(left)
+            operands.append(operand.child_right)
+        elif operand.nodetype not in (nodes.TYPE_DECIMAL, nodes.TYPE_IDENT, nodes.TYPE_CELL_REF):
+            return False
+    return True
+
+
+def parse_coordinate(coordinate: str) -> Tuple[int, int]:
+    """
+    Converts a coordinate such as AB12 to zero based row and column.
+
+    :return: Tuple (row, column).
+    """
+    letters: str = coordinate.rstrip("0123456789")
+    column: int = 0
+    for letter in letters:
+        column = column * 26 + ord(letter) - ord("A") + 1
+    return int(coordinate[len(letters):]) - 1, column - 1
+
+
+class Analyzer:
+    """
+    The semantic analysis of one program, see the module docstring.
+    """
+
+    def __init__(self, literal: Optional[Callable[[object], object]] = None):
+        """
+        :param literal: Converts the value of a decimal literal to the scalar of the runtime, stored as `number`
+            of the literal nodes. None leaves the literals as they are.
+        """
+        self.literal: Optional[Callable[[object], object]] = literal
+        self.errors: List[Tuple[Optional[int], str]] = []
+        self.functions: List[Function] = []
+        # The function slots by symbol id, None for names that are not functions.
+        self.function_slots: List[Optional[int]] = []
+        # The scope table of the global scope.
+        self.globals: List[int] = []
+        # The function being analysed, None at the top level.
+        self.function: Optional[Function] = None
+        # The number of for loops around the current statement in the current function.
+        self.loops: int = 0
+
+        self.statements: Dict[str, Callable[[nodes.Node, Scope], None]] = {
+            nodes.TYPE_ASSIGNMENT: self.check_assignment,
+            nodes.TYPE_FOR: self.check_for,
+            nodes.TYPE_IF: self.check_if,
+            nodes.TYPE_PRINT_RANGE: self.check_print,
+            nodes.TYPE_PRINT_SCALAR: self.check_print,
+            nodes.TYPE_PRINT_SHEET: self.check_print_sheet,
+            nodes.TYPE_RANGE_DEFINITION: self.check_definition,
+            nodes.TYPE_RETURN: self.check_return,
+            nodes.TYPE_SCALAR_DEFINITION: self.check_definition,
+            nodes.TYPE_SHEET_DEFINITION: self.check_sheet_definition,
+            nodes.TYPE_SUBROUTINE_CALL: self.check_subroutine_call,
+            nodes.TYPE_WHILE: self.check_while,
+        }
+        self.expressions: Dict[str, Callable[[nodes.Node, Scope], Optional[str]]] = {
+            nodes.TYPE_CELL_REF: self.check_cell_ref,
+            nodes.TYPE_DECIMAL: self.check_decimal,
+            nodes.TYPE_FUNCTION_CALL: self.check_function_call,
+            nodes.TYPE_IDENT: self.check_variable,
+            nodes.TYPE_OP: self.check_op,
+            nodes.TYPE_RANGE_EXPRESSION: self.check_range_expression,
+            nodes.TYPE_RANGE_IDENT: self.check_variable,
+            nodes.TYPE_SHEET_IDENT: self.check_variable,
+        }
+
+    def error(self, node: nodes.Node, message: str):
+        self.errors.append((getattr(node, "lexpos", None), message))
+
+    def analyze(self, program: nodes.Node):
+        """
+        :param program: The root node from `ssparser.parse_data`, the nodes are annotated in place.
+        :raises SemanticError: With all the errors found.
+        """
+        definitions: List[nodes.Node] = getattr(program, "children_function_or_variable_definition", [])
+        symbols: int = len(program.symbols)
+        global_scope: Scope = Scope(nodes.SCOPE_GLOBAL, [None] * symbols)
+        self.function_slots = [None] * symbols
+        # Functions are registered first so that they can be called before their definition and recursively.
+        for definition in definitions:
+            if definition.nodetype in FUNCTION_TYPES:
+                name: nodes.Node = definition.child_name
+                if self.function_slots[name.symbol] is not None:
+                    self.error(name, f"Function '{name.value}' is already defined")
+                    continue
+                name.slot = self.function_slots[name.symbol] = len(self.functions)
+                self.functions.append(Function(definition))
+            else:
+                self.statement(definition, global_scope)
+        for function in self.functions:
+            self.check_function(function, global_scope)
+        self.find_pure()
+        self.block(program.children_statement_list, global_scope)
+        self.globals = global_scope.symbols()
+        if self.errors:
+            self.errors.sort(key=lambda error: -1 if error[0] is None else error[0])
+            raise SemanticError(self.errors)
+
+    def check_function(self, function: Function, global_scope: Scope):
+        scope: Scope = Scope(nodes.SCOPE_LOCAL, global_scope.bindings)
+        definition: nodes.Node = function.definition
+        self.function = function
+        for formal in getattr(definition, "children_formals", []):
+            self.define(formal.child_name, scope)
+        self.block(getattr(definition, "children_variable_definitions", []), scope)
+        self.block(definition.children_statement_list, scope)
+        scope.close()
+        function.symbols = scope.symbols()
+        self.function = None
+
+    def find_pure(self):
+        """
+        A function that calls an impure function is impure, until nothing changes. Recursive calls keep a
+        function pure.
+        """
+        changed: bool = True
+        while changed:
+            changed = False
+            for function in self.functions:
+                if function.pure and any(not self.functions[slot].pure for slot in function.calls):
+                    function.pure = False
+                    changed = True
+
+    def impure(self):
+        """
+        Marks the function being analysed as not pure.
+        """
+        if self.function is not None:
+            self.function.pure = False
+
+    def define(self, name: nodes.Node, scope: Scope):
+        if not scope.define(name):
+            self.error(name, f"Variable '{name.value}' is already defined")
+
+    # Statements
+
+    def block(self, statements: List[nodes.Node], scope: Scope):
+        for statement in statements:
+            self.statement(statement, scope)
+
+    def statement(self, node: nodes.Node, scope: Scope):
+        self.statements[node.nodetype](node, scope)
+
+    def check_definition(self, node: nodes.Node, scope: Scope):
+        # The initial value is checked first since it cannot refer to the variable being defined.
+        expression = getattr(node, "child_expression", None)
+        if expression is not None:
+            self.expect(expression, VARIABLE_TYPES[node.child_name.nodetype], scope)
+        self.define(node.child_name, scope)
+
+    def check_sheet_definition(self, node: nodes.Node, scope: Scope):
+        init = getattr(node, "child_sheet_init", None)
+        if init is not None and init.nodetype == nodes.TYPE_SHEET_INIT:
+            # The literal cells are in the number array, only the other expressions have nodes.
+            for row in init.children_sheet_init_list:
+                for expression in row.expressions.values():
+                    self.expect(expression, SCALAR, scope)
+        self.define(node.child_name, scope)
+
+    def check_assignment(self, node: nodes.Node, scope: Scope):
+        cell_ref = getattr(node, "child_cell_ref", None)
+        if cell_ref is not None:
+            self.impure()
+            self.check_cell_ref(cell_ref, scope)
+            self.expect(node.child_expression, SCALAR, scope)
+            return
+        sheet_ident = getattr(node, "child_sheet_ident", None)
+        if sheet_ident is not None:
+            self.check_variable(sheet_ident, scope)
+        else:
+            self.expect(node.child_expression, VARIABLE_TYPES[node.child_name.nodetype], scope)
+        self.check_variable(node.child_name, scope)
+
+    def check_print(self, node: nodes.Node, scope: Scope):
+        self.impure()
+        self.expect(node.child_expression, SCALAR if node.nodetype == nodes.TYPE_PRINT_SCALAR else RANGE, scope)
+
+    def check_print_sheet(self, node: nodes.Node, scope: Scope):
+        self.impure()
+        self.check_variable(node.child_name, scope)
+
+    def check_if(self, node: nodes.Node, scope: Scope):
+        self.expect(node.child_condition, SCALAR, scope)
+        self.block(node.children_then_statement_list, scope)
+        self.block(getattr(node, "children_else_statement_list", []), scope)
+
+    def check_while(self, node: nodes.Node, scope: Scope):
+        self.expect(node.child_condition, SCALAR, scope)
+        self.block(node.children_statement_list, scope)
+
+    def check_for(self, node: nodes.Node, scope: Scope):
+        for expression in node.children_range_list:
+            self.expect(expression, RANGE, scope)
+        self.loops += 1
+        self.block(node.children_statement_list, scope)
+        self.loops -= 1
+        statements: List[nodes.Node] = node.children_statement_list
+        node.independent = (len(statements) == 1 and statements[0].nodetype == nodes.TYPE_ASSIGNMENT
+                            and is_current_cell(getattr(statements[0], "child_cell_ref", None))
+                            and is_elementwise(statements[0].child_expression))
+
+    def check_subroutine_call(self, node: nodes.Node, scope: Scope):
+        self.call(node, scope)
+
+    def check_return(self, node: nodes.Node, scope: Scope):
+        # A return at the top level ends the program, its value can be anything.
+        returns: Optional[str] = None if self.function is None else self.function.returns
+        self.expect(node.child_expression, returns, scope)
+
+    # Expressions
+
+    def expression(self, node: nodes.Node, scope: Scope) -> Optional[str]:
+        """
+        :return: The type of the expression, None if it is not known because of an error.
+        """
+        return self.expressions[node.nodetype](node, scope)
+
+    def expect(self, node: nodes.Node, expected: Optional[str], scope: Scope):
+        """
+        Checks the expression and that it has the expected type, None accepts any type.
+        """
+        found: Optional[str] = self.expression(node, scope)
+        if expected is not None and found is not None and found != expected:
+            if node.nodetype == nodes.TYPE_FUNCTION_CALL:
+                self.error(node, f"'{node.child_name.value}' returns a {found}, not a {expected}")
+            else:
+                self.error(node, f"Expected a {expected}, not a {found}")
+
+    def check_variable(self, node: nodes.Node, scope: Scope) -> Optional[str]:
+        if not scope.lookup(node):
+            self.error(node, f"Variable '{node.value}' is not defined")
+            return None
+        if node.scope == nodes.SCOPE_GLOBAL:
+            self.impure()
+        return VARIABLE_TYPES[node.nodetype]
+
+    def check_decimal(self, node: nodes.Node, scope: Scope) -> str:
+        if self.literal is not None:
+            node.number = self.literal(node.value)
+        return SCALAR
+
+    def check_op(self, node: nodes.Node, scope: Scope) -> str:
+        # The operands that are operators are checked here instead of recursing, so that long expressions don't
+        # hit the recursion limit. They are scalars, so only their operands can have errors, in the same order.
+        operands: List[Tuple[nodes.Node, str]] = [(node, SCALAR)]
+        while operands:
+            operand, expected = operands.pop()
+            if operand.nodetype != nodes.TYPE_OP or expected != SCALAR:
+                self.expect(operand, expected, scope)
+                continue
+            operands.append((operand.child_right, RANGE if operand.value == "#" else SCALAR))
+            left = getattr(operand, "child_left", None)
+            if left is not None:
+                operands.append((left, SCALAR))
+        return SCALAR
+
+    def check_cell_ref(self, node: nodes.Node, scope: Scope) -> str:
+        coordinate = getattr(node, "child_coordinate_ident", None)
+        if coordinate is not None:
+            coordinate.row, coordinate.column = parse_coordinate(coordinate.value)
+            self.check_variable(node.child_sheet_ident, scope)
+            return SCALAR
+        if not self.loops:
+            self.error(node, "Current cell $ used outside of for loop")
+        range_ident = getattr(node, "child_range_ident", None)
+        if range_ident is not None:
+            self.check_variable(range_ident, scope)
+        return SCALAR
+
+    def check_range_expression(self, node: nodes.Node, scope: Scope) -> str:
+        expression = getattr(node, "child_expression", None)
+        if expression is not None:
+            # range_expr[columns, rows] moves the range
+            self.impure()
+            self.expect(expression, RANGE, scope)
+        else:
+            # The cells between the ends need not be in the arguments, e.g. `range $..$:_bb`. Only `range $..$`
+            # (or `$:_bb` at both ends) is one cell of them.
+            if not is_same_current_cell(node.child_from, node.child_to):
+                self.impure()
+            self.check_cell_ref(node.child_from, scope)
+            self.check_cell_ref(node.child_to, scope)
+        return RANGE
+
+    def check_function_call(self, node: nodes.Node, scope: Scope) -> Optional[str]:
+        function: Optional[Function] = self.call(node, scope)
+        return None if function is None else function.returns
+
+    def call(self, node: nodes.Node, scope: Scope) -> Optional[Function]:
+        """
+        Checks a function or subroutine call and its arguments.
+
+        :return: The called function, None if it is not known.
+        """
+        name: nodes.Node = node.child_name
+        arguments: List[nodes.Node] = getattr(node, "children_arguments", [])
+        slot: Optional[int] = self.function_slots[name.symbol]
+        function: Optional[Function] = None if slot is None else self.functions[slot]
+        if function is None:
+            self.error(name, f"Function '{name.value}' is not defined")
+        else:
+            name.slot = slot
+            if self.function is not None:
+                self.function.calls.add(slot)
+            expected: str = (nodes.TYPE_FUNCTION_DEFINITION if node.nodetype == nodes.TYPE_FUNCTION_CALL
+                             else nodes.TYPE_SUBROUTINE_DEFINITION)
+            if function.definition.nodetype != expected:
+                self.error(name, f"'{name.value}' is not a {expected.split('_')[0]}")
+                function = None
+            elif len(arguments) != len(function.formals):
+                self.error(node, f"Wrong number of arguments for '{name.value}'")
+        for index, argument in enumerate(arguments):
+            found: Optional[str] = self.expression(argument, scope)
+            if function is None or index >= len(function.formals):
+                continue
+            formal: str = function.formals[index]
+            if found is not None and found != formal:
+                self.error(argument, f"Argument {index + 1} of '{name.value}' is a {found}, not a {formal}")
+        return function
+
+
+def analyze(program: nodes.Node, literal: Optional[Callable[[object], object]] = None) -> Analyzer:
+    """
+    Analyses the program with a new analyzer.
+
+    :param program: The root node from `ssparser.parse_data`.
+    :param literal: See `Analyzer`.
+    :return: The analyzer with the functions and the global scope table of the program.
+    :raises SemanticError: With all the errors found.
+    """
+    analyzer: Analyzer = Analyzer(literal)
+    analyzer.analyze(program)
+    return analyzer
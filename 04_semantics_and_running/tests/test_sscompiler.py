@@ -0,0 +1,160 @@
+import io
+from typing import Callable
+from unittest import TestCase
+
+import sscompiler
+import ssinterpreter
+import ssparser
+import sssemantics
+from benchmarks.programs import loop_programs
+from main import read_file
+from tests.test_ssinterpreter import vector_programs
+
+
+def run(program: str, exact: bool = False) -> str:
+    output = io.StringIO()
+    sscompiler.run(program, output=output, exact=exact)
+    return output.getvalue()
+
+
+def interpret(program: str, exact: bool = False) -> str:
+    output = io.StringIO()
+    ssinterpreter.run(ssparser.parse_data(data=program), output=output, exact=exact)
+    return output.getvalue()
+
+
+class SSCompilerTest(TestCase):
+    def test_same_output_as_interpreter(self):
+        sheet_literal = "scalar value = 2.5\nsheet SH = { 1.5, 2.0 + 1.0 * value\n -0.5 }\nprint_sheet SH"
+        # The constants are folded before compiling, with the rounding of the mode.
+        folded = "print_scalar 1.5 * 4.1\nprint_scalar 9.9 * (1.5 * 4.1)"
+        programs = [read_file("tests/code.sheetscript"), sheet_literal, folded] + list(loop_programs(2000).values())
+        for program in programs:
+            for exact in (False, True):
+                with self.subTest(program=program[:40], exact=exact):
+                    self.assertEqual(run(program, exact=exact), interpret(program, exact=exact))
+
+    def test_nested_for(self):
+        program = """
+        sheet SH = 2 * 2
+        scalar count = 0.0
+        for range SH'A1..SH'B1 do
+          for range SH'A2..SH'B2 do
+            count := count + 1.0
+            $ := count
+          done
+        done
+        print_sheet SH
+        """
+        self.assertEqual(run(program), "0.0 0.0\n3.0 4.0\n")
+
+    def test_cache(self):
+        program = "print_scalar 1.0 + 2.0"
+        self.assertIs(sscompiler.compile_data(program), sscompiler.compile_data(program))
+        self.assertIsNot(sscompiler.compile_data(program), sscompiler.compile_data(program, exact=True))
+        # The runs don't share the globals.
+        self.assertEqual(run("scalar total = 1.0\ntotal := total + 1.0\nprint_scalar total") * 2, "2.0\n2.0\n")
+
+    def test_deep_expressions(self):
+        # Too deep for one Python expression, also as a while condition and as the value of an independent loop.
+        total = " + ".join(["xx"] * 600)
+        program = f"""
+        scalar xx = 0.1
+        scalar yy = 0.0
+        sheet SH = 2 * 2
+        function Show[num : scalar] return scalar is
+          print_scalar num
+          return num
+        end
+        print_scalar {total}
+        print_scalar {" - ".join(f"Show[{index}.0]" if index % 7 == 0 else "SH'A1" for index in range(600))}
+        while yy < {total} do yy := yy + 1.0 done
+        print_scalar yy
+        for range SH'A1..SH'B2 do $ := {total} done
+        print_sheet SH
+        """
+        for exact in (False, True):
+            with self.subTest(exact=exact):
+                self.assertEqual(run(program, exact=exact), interpret(program, exact=exact))
+        self.assertEqual(run(f"scalar xx = 0.1\nprint_scalar {total}"), "60.0\n")
+
+    def test_errors(self):
+        cases = {
+            "print_scalar 1.0 / 0.0": "Division by zero",
+            "sheet SH = 1 * 1\nprint_scalar SH'B2": "outside of sheet",
+            "sheet SH = 2 * 2\nSH'A0 := 7.0": "outside of sheet",
+            "sheet SH = 2 * 2\nprint_scalar SH'B0": "outside of sheet",
+            "function Empty[] return scalar is print_scalar 1.0 end\nprint_scalar Empty[]": "ended without return",
+            "sheet SH = 1 * 20\nscalar yy = 10.0\nfor range SH'A1..SH'A20 do yy := yy * yy + yy done": "Value is too large",
+            "scalar yy = 1.0\nwhile yy > 0.0 do yy := yy + yy done": "Value is too large",
+            "function Down[num : scalar] return scalar is return Down[num - 1.0] end\nprint_scalar Down[1.0]":
+                "Too deep recursion",
+        }
+        for program, message in cases.items():
+            with self.subTest(program=program):
+                with self.assertRaisesRegex(ssinterpreter.ExecutionError, message):
+                    run(program)
+
+    def test_semantic_errors(self):
+        cases = {
+            "print_scalar missing": "'missing' is not defined",
+            "print_scalar $": "outside of for loop",
+            "function Two[] return scalar is return 2.0 end\nprint_scalar Two[1.0]": "Wrong number of arguments",
+        }
+        for program, message in cases.items():
+            with self.subTest(program=program):
+                with self.assertRaisesRegex(sssemantics.SemanticError, message):
+                    run(program)
+
+    def test_wrong_arguments_found_without_running(self):
+        program = """
+        function Two[] return scalar is return 2.0 end
+        if 0.0 then print_scalar Two[1.0] endif
+        print_scalar Two[]
+        """
+        with self.assertRaisesRegex(sssemantics.SemanticError, "Wrong number of arguments"):
+            run(program)
+
+    def test_memo(self):
+        program = """
+        sheet SH = {1.0, 2.0, 1.0, 2.0}
+        function Fib[num : scalar] return scalar is
+          if num < 2.0 then return num endif
+          return Fib[num - 1.0] + Fib[num - 2.0]
+        end
+        function Sum[_values : range] return scalar is
+          scalar total = 0.0
+          for _values do total := total + $ done
+          return total
+        end
+        print_scalar Fib[25.0]
+        print_scalar Sum[range SH'A1..SH'B1] + Sum[range SH'C1..SH'D1]
+        """
+        output = io.StringIO()
+        memos = sscompiler.run(program, output=output)
+        self.assertEqual(output.getvalue(), interpret(program))
+        self.assertEqual([(memo.name, memo.misses, memo.hits) for memo in memos], [("Fib", 26, 23), ("Sum", 1, 1)])
+        # Each run has its own memos.
+        self.assertEqual(sscompiler.run(program, output=io.StringIO())[0].misses, 26)
+        self.assertEqual(sscompiler.run(program, output=io.StringIO(), memo_size=0), [])
+        # The calls go to the function directly after the memo is dropped.
+        memo = sscompiler.run(loop_programs(2000)["function calls"], output=io.StringIO())[0]
+        self.assertTrue(memo.dropped)
+        self.assertEqual(memo.misses, ssinterpreter.MEMO_TRIAL)
+
+    def test_vectorized_loops(self):
+        def outcome(function: Callable[[io.StringIO], object]) -> str:
+            output = io.StringIO()
+            try:
+                function(output)
+            except ssinterpreter.ExecutionError as error:
+                return f"Error: {error}"
+            return output.getvalue()
+
+        for program in vector_programs(60):
+            for exact in (False, True):
+                tree = ssparser.parse_data(program)
+                self.assertEqual(outcome(lambda output: sscompiler.run(program, output=output, exact=exact)),
+                                 outcome(lambda output: ssinterpreter.run(tree, output=output, exact=exact,
+                                                                          vectorize=False)),
+                                 f"{program} exact={exact}")
@@ -0,0 +1,515 @@
+import decimal
+import io
+import random
+import sys
+from typing import Dict, List, Optional
+from unittest import TestCase, mock
+
+import numpy
+
+import ssinterpreter
+import ssoptimizer
+import ssparser
+import sssemantics
+from benchmarks.programs import loop_programs
+from main import read_file
+
+
+def run(program: str, exact: bool = False, numbers: Optional[ssinterpreter.Numbers] = None,
+        vectorize: bool = True) -> str:
+    output = io.StringIO()
+    ssinterpreter.run(ssparser.parse_data(data=program), output=output, exact=exact, numbers=numbers,
+                      vectorize=vectorize)
+    return output.getvalue()
+
+
+def vector_programs(count: int) -> List[str]:
+    """
+    :return: Random loops that write `$` from an expression, with overlapping and short ranges, zeros to divide
+        with and negative zeros.
+    """
+    generator = random.Random(25)
+    leaves: List[str] = ["$", "$:_a", "$:_c", "$:_s", "SH'B2", "TT'A1", "rate", "1.5", "0.0", "#_a"]
+    loops: List[str] = ["_c, _a", "_a, _c", "_a, _b", "_a", "_b, _a", "_c, _s", "_s, _c", "_a[1, 0], _a"]
+
+    def expression(depth: int) -> str:
+        if depth == 0 or generator.random() < 0.3:
+            return generator.choice(leaves)
+        if generator.random() < 0.1:
+            return f"-({expression(depth - 1)})"
+        operator = generator.choice(["+", "-", "*", "/", "<", "="])
+        return f"({expression(depth - 1)} {operator} {expression(depth - 1)})"
+
+    def sheet() -> str:
+        return "\n".join(", ".join(generator.choice(["0.0", "-0.1", "0.5", "1.5", "-2.5", "10.0", "3.3"])
+                                   for _ in range(4)) for _ in range(4))
+
+    programs: List[str] = []
+    for _ in range(count):
+        programs.append(f"""
+sheet SH = {{ {sheet()} }}
+sheet TT = {{ {sheet()} }}
+range _a = range SH'A1..SH'C3
+range _b = range SH'B2..SH'D4
+range _c = range TT'A1..TT'C3
+range _s = range TT'C3..TT'D4
+scalar rate = -0.5
+for {generator.choice(loops)} do $ := {expression(3)} done
+print_sheet SH
+print_sheet TT
+""")
+    return programs
+
+
+class SSInterpreterTest(TestCase):
+    def test_program(self):
+        self.assertEqual(run(read_file("tests/code.sheetscript")), "\n".join([
+            "big 129.6",
+            "amount 129.6",
+            "area 9.1 1.0 1.0 1.0",
+            "1.0 0.0 1.0 0.0",
+            "sheet",
+            "9.1 1.0 0.0",
+            "1.0 1.0 0.0",
+            "9.1 1.0 0.0",
+            "1.0 1.0 0.0",
+            "25.2",
+        ]) + "\n")
+
+    def test_arithmetic(self):
+        self.assertEqual(run("print_scalar 1.0 + 2.0 * 3.0 - 4.0 / 2.0"), "5.0\n")
+        # Results are rounded to one fractional digit
+        self.assertEqual(run("print_scalar 1.5 * 2.5"), "3.8\n")
+        self.assertEqual(run("print_scalar 1.0 / 3.0"), "0.3\n")
+        self.assertEqual(run("print_scalar 2.0 > 1.0"), "1.0\n")
+
+    def test_recursion(self):
+        program = """
+        function Factorial[num : scalar] return scalar is
+          if num <= 1.0 then return 1.0 endif
+          return num * Factorial[num - 1.0]
+        end
+        print_scalar Factorial[5.0]
+        """
+        self.assertEqual(run(program), "120.0\n")
+
+    def test_nested_for(self):
+        program = """
+        sheet SH = 2 * 2
+        scalar count = 0.0
+        for range SH'A1..SH'B1 do
+          for range SH'A2..SH'B2 do
+            count := count + 1.0
+            $ := count
+          done
+        done
+        print_sheet SH
+        """
+        self.assertEqual(run(program), "0.0 0.0\n3.0 4.0\n")
+
+    def test_local_variables(self):
+        program = """
+        scalar value = 1.0
+        function Shadow[value : scalar] return scalar is
+          value := value + 1.0
+          return value
+        end
+        print_scalar Shadow[5.0]
+        print_scalar value
+        """
+        self.assertEqual(run(program), "6.0\n1.0\n")
+
+    def test_local_variables_are_not_visible_outside(self):
+        program = """
+        function Inner[] return scalar is
+          scalar local = 2.0
+          return local
+        end
+        print_scalar Inner[]
+        print_scalar local
+        """
+        with self.assertRaisesRegex(sssemantics.SemanticError, "'local' is not defined"):
+            run(program)
+        with self.assertRaisesRegex(sssemantics.SemanticError, "'value' is already defined"):
+            run("scalar value\nscalar value\nprint_scalar value")
+
+    def test_undefined_variable(self):
+        with self.assertRaisesRegex(sssemantics.SemanticError, "'missing' is not defined"):
+            run("print_scalar missing")
+
+    def test_undefined_function(self):
+        with self.assertRaisesRegex(sssemantics.SemanticError, "'Missing' is not defined"):
+            run("print_scalar Missing[]")
+
+    def test_division_by_zero(self):
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Division by zero"):
+            run("print_scalar 1.0 / 0.0")
+
+    def test_too_large(self):
+        program = "sheet SH = 1 * 20\nscalar yy = 10.0\nfor range SH'A1..SH'A20 do yy := yy * yy done\nprint_scalar yy"
+        for operator in ["*", "+"]:
+            with self.subTest(operator=operator):
+                with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Value is too large"):
+                    run(program.replace("yy * yy", f"yy * yy {operator} yy"))
+
+    def test_deep_recursion(self):
+        program = """
+        function Down[num : scalar] return scalar is
+          if num < 1.0 then return 0.0 endif
+          return Down[num - 1.0] + 1.0
+        end
+        print_scalar Down[DEPTH]
+        """
+        self.assertEqual(run(program.replace("DEPTH", "1000.0")), "1000.0\n")
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Too deep recursion"):
+            run(program.replace("DEPTH", "100000.0"))
+        self.assertLess(sys.getrecursionlimit(), ssinterpreter.RECURSION_LIMIT)
+
+    def test_current_cell_outside_loop(self):
+        with self.assertRaisesRegex(sssemantics.SemanticError, "outside of for loop"):
+            run("print_scalar $")
+
+    def test_cell_outside_sheet(self):
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "outside of sheet"):
+            run("sheet SH = 1 * 1\nprint_scalar SH'B2")
+        for program in ("sheet SH = 2 * 2\nSH'A0 := 7.0", "sheet SH = 2 * 2\nprint_scalar SH'B0"):
+            with self.subTest(program=program):
+                with self.assertRaisesRegex(ssinterpreter.ExecutionError, "outside of sheet"):
+                    run(program)
+
+    def test_exact_mode(self):
+        program = read_file("tests/code.sheetscript")
+        self.assertEqual(run(program, exact=True), run(program))
+        self.assertEqual(run("print_scalar 0.1 + 0.2 = 0.3", exact=True), "1.0\n")
+        self.assertEqual(run("print_scalar 0.1 + 0.2 = 0.3"), "1.0\n")
+
+    def test_sheet_storage(self):
+        interpreter = ssinterpreter.Interpreter(output=io.StringIO())
+        interpreter.run(ssparser.parse_data(data="sheet SH = 1000 * 1000\nSH'B3 := 2.5"))
+        cells = interpreter.globals[0].cells
+        self.assertEqual(cells.dtype, numpy.float64)
+        self.assertEqual(cells.shape, (1000, 1000))
+        self.assertEqual(cells[2, 1], 2.5)
+
+    def test_sheet_literal(self):
+        program = """
+        scalar value = 2.0
+        sheet SH = { 1.5, value * 2.0, -0.0
+          999999999999999.5 }
+        print_sheet SH
+        """
+        expected = "1.5 4.0 -0.0\n999999999999999.5 0.0 0.0\n"
+        self.assertEqual(run(program), expected)
+        self.assertEqual(run(program, numbers=ssinterpreter.DecimalNumbers()), expected)
+        # The tenths of the exact mode have no negative zero.
+        self.assertEqual(run(program, exact=True), expected.replace("-0.0", "0.0"))
+
+    def test_range_is_view(self):
+        program = """
+        sheet SH = 1000 * 1000
+        range _r = range SH'A1..SH'ZZ999
+        range _corner = range SH'B2..SH'C3
+        print_scalar #_r
+        for _corner do
+          $ := 1.0
+        done
+        print_range _corner[-1, -1]
+        """
+        self.assertEqual(run(program), "701298.0\n0.0 0.0 0.0 1.0\n")
+
+    def test_range_outside_sheet(self):
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Range is outside of sheet SH"):
+            run("sheet SH = 2 * 2\nprint_range range SH'A1..SH'B2[1, 0]")
+
+    def test_folded_program(self):
+        program = read_file("tests/code.sheetscript")
+        tree = ssparser.parse_data(data=program)
+        self.assertLess(ssoptimizer.fold_constants(tree).after, ssoptimizer.count_nodes(ssparser.parse_data(program)))
+        output = io.StringIO()
+        ssinterpreter.run(tree, output=output, exact=True)
+        self.assertEqual(output.getvalue(), run(program, exact=True))
+        tree = ssparser.parse_data(data="print_scalar - 0.0")
+        ssoptimizer.fold_constants(tree)
+        output = io.StringIO()
+        ssinterpreter.run(tree, output=output)
+        self.assertEqual(output.getvalue(), run("print_scalar - 0.0"))
+
+
+    def test_folding_keeps_output(self):
+        def outcome(tree) -> str:
+            output = io.StringIO()
+            try:
+                ssinterpreter.run(tree, output=output, exact=exact)
+            except ssinterpreter.ExecutionError as error:
+                return f"Error: {error}"
+            return output.getvalue()
+
+        large = "9" * 200 + ".0"
+        programs = [
+            # The float product is 6.1499..., rounded down unlike the exact 6.15.
+            "print_scalar 1.5 * 4.1", "print_scalar 9.9 * (1.5 * 4.1)", "print_scalar 0.1 + 0.2 - 0.3",
+            "print_scalar -0.1 * 0.1", "print_scalar 12345678901234567890.1 * 12345678901234567890.1",
+            f"print_scalar 1.0 < {large} * {large}", "print_scalar 0.7 / 0.3 = 2.3",
+        ]
+        for program in programs:
+            for exact in (False, True):
+                with self.subTest(program=program, exact=exact):
+                    tree = ssparser.parse_data(data=program)
+                    ssoptimizer.fold_constants(tree, ssinterpreter.numbers_for(exact).folding_operators())
+                    self.assertEqual(outcome(tree), outcome(ssparser.parse_data(data=program)))
+
+
+class FixedNumbersTest(TestCase):
+    """
+    The tenths of the exact mode against the decimals they replace.
+    """
+    fixed = ssinterpreter.FixedNumbers()
+    reference = ssinterpreter.DecimalNumbers()
+
+    @staticmethod
+    def values() -> List[int]:
+        # Ties of the rounding, signs, zero and large values, in tenths.
+        special: List[int] = [0, 1, -1, 5, -5, 10, -10, 15, -15, 25, 35, -45, 99, 3, 7, 30, 70, -70,
+                              10 ** 12 + 5, -(10 ** 12) - 5]
+        generator = random.Random(400)
+        return special + [generator.randint(-100000, 100000) for _ in range(30)]
+
+    def assertSame(self, fixed: int, reference: decimal.Decimal, message: Optional[str] = None):
+        self.assertEqual(decimal.Decimal(fixed).scaleb(-1), reference, message)
+        self.assertEqual(self.fixed.format(fixed), self.reference.format(reference).replace("-0.0", "0.0"), message)
+
+    def test_operators(self):
+        fixed_operators = self.fixed.operators()
+        reference_operators = self.reference.operators()
+        values: List[int] = self.values()
+        for symbol in fixed_operators:
+            for left in values:
+                for right in values:
+                    if symbol == "/" and not right:
+                        continue
+                    self.assertSame(fixed_operators[symbol](left, right),
+                                    reference_operators[symbol](decimal.Decimal(left).scaleb(-1),
+                                                                decimal.Decimal(right).scaleb(-1)),
+                                    f"{left} {symbol} {right}")
+
+    def test_literals(self):
+        for text in ("0.0", "1.5", "-2.5", "999999999999999.5", "0.1"):
+            with self.subTest(text=text):
+                value = decimal.Decimal(text)
+                self.assertSame(self.fixed.literal(value), self.reference.literal(value))
+        self.assertSame(self.fixed.count(12), self.reference.count(12))
+
+    def test_division_by_zero(self):
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Division by zero"):
+            self.fixed.divide(10, 0)
+
+    def test_format_large(self):
+        # More digits than str of an integer allows by default.
+        value = -(10 ** 5000 * 10 + 3)
+        self.assertEqual(self.fixed.format(value), "-1" + "0" * 5000 + ".3")
+        program = "sheet SH = 1 * 13\nscalar yy = 10.0\nfor range SH'A1..SH'A13 do yy := yy * yy done\nprint_scalar yy"
+        self.assertEqual(run(program, exact=True), "1" + "0" * 8192 + ".0\n")
+
+    def test_programs(self):
+        programs: Dict[str, str] = loop_programs(300)
+        programs["code"] = read_file("tests/code.sheetscript")
+        programs["rounding"] = """
+        scalar value = 0.1
+        scalar counter = 0.0
+        while counter < 40.0 do
+          value := value * 1.5 - value / 3.0 + counter / 7.0
+          print_scalar value
+          counter := counter + 1.0
+        done
+        """
+        for name, program in programs.items():
+            with self.subTest(program=name):
+                self.assertEqual(run(program, exact=True), run(program, numbers=self.reference))
+
+    def test_sheet_storage(self):
+        interpreter = ssinterpreter.Interpreter(output=io.StringIO(), exact=True)
+        interpreter.run(ssparser.parse_data(data="sheet SH = 10 * 10\nSH'B3 := 2.5"))
+        cells = interpreter.globals[0].cells
+        self.assertEqual(cells.dtype, numpy.int64)
+        self.assertEqual(cells[2, 1], 25)
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "too large for sheet SH"):
+            run("sheet SH = 1 * 1\nSH'A1 := 999999999999999.5 * 999999999999999.5", exact=True)
+
+
+class MemoTest(TestCase):
+    def memos(self, program: str) -> Dict[str, ssinterpreter.Memo]:
+        output = io.StringIO()
+        memos = ssinterpreter.run(ssparser.parse_data(data=program), output=output)
+        self.assertEqual(output.getvalue(), self.output(program))
+        return {memo.name: memo for memo in memos}
+
+    @staticmethod
+    def output(program: str) -> str:
+        output = io.StringIO()
+        ssinterpreter.run(ssparser.parse_data(data=program), output=output, memo_size=0)
+        return output.getvalue()
+
+    def test_recursion(self):
+        program = """
+        function Fib[num : scalar] return scalar is
+          if num < 2.0 then return num endif
+          return Fib[num - 1.0] + Fib[num - 2.0]
+        end
+        print_scalar Fib[20.0]
+        """
+        self.assertEqual(self.output(program), "6765.0\n")
+        memo = self.memos(program)["Fib"]
+        # Each number is computed once, the second call of each level is a hit.
+        self.assertEqual((memo.misses, memo.hits), (21, 18))
+
+    def test_range_values(self):
+        program = """
+        sheet AA = {1.0, 2.0}
+        sheet BB = {1.0, 2.0}
+        function Sum[_values : range] return scalar is
+          scalar total = 0.0
+          for _values do total := total + $ done
+          return total
+        end
+        print_scalar Sum[range AA'A1..AA'B1]
+        print_scalar Sum[range BB'A1..BB'B1]
+        BB'B1 := 5.0
+        print_scalar Sum[range BB'A1..BB'B1]
+        print_scalar Sum[range AA'A1..AA'A1[1, 0]]
+        """
+        memo = self.memos(program)["Sum"]
+        self.assertEqual((memo.misses, memo.hits), (3, 1))
+        self.assertEqual(str(memo), "Sum: 1 hits, 3 misses (25.0% hit rate)")
+
+    def test_negative_zero(self):
+        program = """
+        function Same[num : scalar] return scalar is return num end
+        print_scalar Same[0.0]
+        print_scalar Same[0.0 * -1.0]
+        """
+        self.assertEqual(self.output(program), "0.0\n-0.0\n")
+        self.assertEqual(self.memos(program)["Same"].misses, 2)
+
+    def test_least_recently_used(self):
+        memo = ssinterpreter.Memo("Fn", ssinterpreter.FloatNumbers(), ["scalar"], size=2)
+        memo.put((1.0,), 1.0)
+        memo.put((2.0,), 2.0)
+        self.assertEqual(memo.get((1.0,)), 1.0)
+        memo.put((3.0,), 3.0)
+        self.assertIsNone(memo.get((2.0,)))
+        self.assertEqual(list(memo.results), [(1.0,), (3.0,)])
+
+    def test_impure_not_memoized(self):
+        program = """
+        scalar rate = 2.0
+        function Rated[num : scalar] return scalar is return num * rate end
+        print_scalar Rated[1.0]
+        rate := 3.0
+        print_scalar Rated[1.0]
+        """
+        self.assertEqual(self.memos(program), {})
+        self.assertEqual(self.output(program), "2.0\n3.0\n")
+
+    def test_dropped(self):
+        program = loop_programs(2000)["function calls"]
+        memo = self.memos(program)["Step"]
+        self.assertTrue(memo.dropped)
+        self.assertEqual((memo.misses, memo.hits), (ssinterpreter.MEMO_TRIAL, 0))
+        self.assertEqual(len(memo.results), 0)
+
+
+class VectorTest(TestCase):
+    @staticmethod
+    def outcome(program: str, exact: bool, vectorize: bool) -> str:
+        try:
+            return run(program, exact=exact, vectorize=vectorize)
+        except ssinterpreter.ExecutionError as error:
+            return f"Error: {error}"
+
+    def test_same_as_cell_by_cell(self):
+        results: List[bool] = []
+
+        def spy(*arguments) -> bool:
+            results.append(run_vectorized(*arguments))
+            return results[-1]
+
+        run_vectorized = ssinterpreter.run_vectorized
+        with mock.patch.object(ssinterpreter, "run_vectorized", spy):
+            for program in vector_programs(150):
+                for exact in (False, True):
+                    self.assertEqual(self.outcome(program, exact, True), self.outcome(program, exact, False),
+                                     f"{program} exact={exact}")
+        # Both the arrays and the fallback were tried.
+        self.assertGreater(results.count(True), 100)
+        self.assertGreater(results.count(False), 50)
+
+    def test_dependent_iterations(self):
+        # Each cell is computed from the cell above, which an earlier iteration writes.
+        program = """
+        sheet SH = 1 * 4
+        range _top = range SH'A1..SH'A3
+        SH'A1 := 1.0
+        for _top[0, 1], _top do $ := $:_top * 2.0 done
+        print_sheet SH
+        """
+        self.assertEqual(run(program), "1.0\n2.0\n4.0\n8.0\n")
+
+    def test_zero_written_by_earlier_iteration(self):
+        # The arrays have the zero that the first iteration replaces before the second divides with it.
+        program = """
+        sheet SH = 1 * 4
+        range _r = range SH'A2..SH'A3
+        range _s = range SH'A1..SH'A2
+        SH'A1 := 1.0
+        for _r, _s do $ := 1.0 / $:_s done
+        print_sheet SH
+        """
+        for exact in (False, True):
+            with self.subTest(exact=exact):
+                self.assertEqual(run(program, exact=exact), "1.0\n1.0\n1.0\n0.0\n")
+                self.assertEqual(self.outcome(program, exact, True), self.outcome(program, exact, False))
+
+    def test_independent_loops(self):
+        program = """
+        sheet SH = 2 * 2
+        range _r = range SH'A1..SH'B2
+        scalar total = 0.0
+        for _r do $ := $ * 2.0 + SH'A1 done
+        for _r do $ := $ + Twice[1.0] done
+        for _r do total := total + $ done
+        for _r do $ := 1.0 print_scalar $ done
+        """
+        program = "function Twice[num : scalar] return scalar is return num * 2.0 end\n" + program
+        tree = ssparser.parse_data(data=program)
+        sssemantics.analyze(tree)
+        self.assertEqual([statement.independent for statement in tree.children_statement_list],
+                         [True, False, False, False])
+
+    def test_errors(self):
+        cases = {
+            "sheet SH = 2 * 1\nfor range SH'A1..SH'B1 do $ := 1.0 / $ done": "Division by zero",
+            "sheet SH = 1 * 1\nSH'A1 := 999999999999999.5\nfor range SH'A1..SH'A1 do $ := $ * $ done":
+                "too large for sheet SH",
+        }
+        for program, message in cases.items():
+            with self.subTest(program=program):
+                with self.assertRaisesRegex(ssinterpreter.ExecutionError, message):
+                    run(program, exact=True)
+        with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Value is too large"):
+            run("sheet SH = 2 * 1\nSH'A1 := 1" + "0" * 200 + ".0\nfor range SH'A1..SH'B1 do $ := $ * $ done")
+
+    def test_failing_loop_writes_cells_before_error(self):
+        # The arrays fail as a whole and the loop runs again cell by cell, up to the cell that fails.
+        program = """
+        sheet SH = {2.0, 4.0, 0.0, 5.0}
+        sheet TT = 4 * 1
+        range _s = range SH'A1..SH'D1
+        for range TT'A1..TT'D1, _s do $ := 10.0 / $:_s done
+        """
+        for exact in (False, True):
+            with self.subTest(exact=exact):
+                interpreter = ssinterpreter.Interpreter(io.StringIO(), exact=exact)
+                with self.assertRaisesRegex(ssinterpreter.ExecutionError, "Division by zero"):
+                    interpreter.run(ssparser.parse_data(data=program))
+                cells = interpreter.globals[1].cells[0].tolist()
+                self.assertEqual(list(map(interpreter.numbers.format, cells)), ["5.0", "2.5", "0.0", "0.0"])
@@ -0,0 +1,133 @@
+import io
+from typing import Dict, List
+from unittest import TestCase
+
+import numpy
+
+import ssinterpreter
+import ssparser
+import sssemantics
+import ssrecalc
+
+MODEL = """
+sheet IN = {{
+  {inputs}
+}}
+sheet OUT = 4 * 4
+scalar rate = 1.5
+range _row = range IN'A2..IN'D2
+function Sum[_cells : range] return scalar is
+  scalar total = 0.0
+  for _cells do total := total + $ done
+  return total
+end
+OUT'A1 := IN'A1 * rate
+OUT'B1 := IN'B1 + 1.0
+OUT'C1 := OUT'A1 + OUT'B1
+OUT'A2 := Sum[_row]
+if OUT'C1 > 10.0 then OUT'B2 := OUT'A2 / 2.0 endif
+for range OUT'A3..OUT'D3, _row do $ := $:_row * 2.0 done
+print_scalar OUT'C1
+print_scalar OUT'B2
+"""
+
+
+def model(inputs: List[str]) -> str:
+    return MODEL.format(inputs=", ".join(inputs[:4]) + "\n  " + ", ".join(inputs[4:]))
+
+
+def sheets(program: str) -> Dict[str, numpy.ndarray]:
+    interpreter = ssinterpreter.Interpreter(output=io.StringIO())
+    interpreter.run(ssparser.parse_data(data=program))
+    return {value.name: value.cells for value in interpreter.globals if isinstance(value, ssinterpreter.Sheet)}
+
+
+class RecalculationTest(TestCase):
+    inputs = ["1.0", "2.0", "3.0", "4.0", "5.0", "6.0", "7.0", "8.0"]
+
+    def workbook(self) -> ssrecalc.Workbook:
+        return ssrecalc.Workbook(ssparser.parse_data(data=model(self.inputs)), output=io.StringIO())
+
+    def test_same_as_running_again(self):
+        workbook = self.workbook()
+        inputs = list(self.inputs)
+        for coordinate, value in [("A1", "9.0"), ("B2", "0.5"), ("B1", "-3.0"), ("A1", "1.0")]:
+            with self.subTest(coordinate=coordinate, value=value):
+                workbook.set_cell("IN", coordinate, value)
+                workbook.recalculate()
+                row, column = sssemantics.parse_coordinate(coordinate)
+                inputs[row * 4 + column] = value
+                expected = sheets(model(inputs))
+                for name, cells in expected.items():
+                    numpy.testing.assert_array_equal(workbook.sheet(name).cells, cells)
+
+    def test_only_dependents_run(self):
+        workbook = self.workbook()
+        workbook.set_cell("IN", "B1", "2.5")
+        # OUT'B1, OUT'C1, the if statement and the print of OUT'C1.
+        self.assertEqual(workbook.recalculate(), 4)
+        self.assertEqual(workbook.cell("OUT", "C1"), 5.0)
+        self.assertEqual(workbook.recalculate(), 0)
+        workbook.set_cell("IN", "C2", "1.0")
+        # OUT'A2 and the for loop, the if statement does not read OUT'A2 when its condition is false.
+        self.assertEqual(workbook.recalculate(), 2)
+
+    def test_new_branch(self):
+        output = io.StringIO()
+        workbook = ssrecalc.Workbook(ssparser.parse_data(data=model(self.inputs)), output=output)
+        self.assertEqual(output.getvalue(), "4.5\n0.0\n")
+        workbook.set_cell("IN", "A1", "6.0")
+        # The if statement writes OUT'B2 now, so it is printed again.
+        workbook.recalculate()
+        self.assertEqual(output.getvalue(), "4.5\n0.0\n12.0\n13.0\n")
+
+    def test_computed_cell(self):
+        with self.assertRaisesRegex(ssrecalc.RecalculationError, "OUT'C1 is computed by the program"):
+            self.workbook().set_cell("OUT", "C1", "1.0")
+
+    def test_cannot_recalculate(self):
+        program = """
+        sheet IN = 3 * 1
+        scalar total = 0.0
+        for range IN'A1..IN'C1 do total := total + $ done
+        print_scalar total
+        """
+        workbook = ssrecalc.Workbook(ssparser.parse_data(data=program), output=io.StringIO())
+        workbook.set_cell("IN", "A1", "1.0")
+        with self.assertRaisesRegex(ssrecalc.RecalculationError, "total is written by two statements"):
+            workbook.recalculate()
+
+    def test_define_then_assign(self):
+        program = """
+        sheet SH = 2 * 1
+        scalar aa = 0.0
+        aa := SH'A1 * 2.0
+        SH'B1 := aa + 1.0
+        """
+        workbook = ssrecalc.Workbook(ssparser.parse_data(data=program), output=io.StringIO())
+        workbook.set_cell("SH", "A1", "1.5")
+        self.assertEqual(workbook.recalculate(), 2)
+        self.assertEqual(workbook.cell("SH", "B1"), 4.0)
+
+    def test_memoized_call(self):
+        program = """
+        sheet IN = 2 * 1
+        sheet OUT = 2 * 1
+        function Sum[_cells : range] return scalar is
+          scalar total = 0.0
+          for _cells do total := total + $ done
+          return total
+        end
+        OUT'A1 := Sum[range IN'A1..IN'B1]
+        OUT'B1 := Sum[range IN'A1..IN'B1] * 2.0
+        """
+        workbook = ssrecalc.Workbook(ssparser.parse_data(data=program), output=io.StringIO())
+        workbook.set_cell("IN", "B1", "1.5")
+        # The second call takes the result from the memo but depends on the range all the same.
+        self.assertEqual(workbook.recalculate(), 2)
+        self.assertEqual((workbook.cell("OUT", "A1"), workbook.cell("OUT", "B1")), (1.5, 3.0))
+
+    def test_format_coordinate(self):
+        for coordinate in ("A1", "Z9", "AA10", "AZ1", "ZZ999"):
+            with self.subTest(coordinate=coordinate):
+                self.assertEqual(ssrecalc.format_coordinate(*sssemantics.parse_coordinate(coordinate)), coordinate)
@@ -0,0 +1,156 @@
+from typing import List
+from unittest import TestCase
+
+import ssparser
+import sssemantics
+import sssyntax as nodes
+
+
+def analyze(program: str) -> sssemantics.Analyzer:
+    return sssemantics.analyze(ssparser.parse_data(data=program))
+
+
+def errors(program: str) -> List[str]:
+    with TestCase().assertRaises(sssemantics.SemanticError) as context:
+        analyze(program)
+    return [message for _, message in context.exception.errors]
+
+
+class SemanticsTest(TestCase):
+    def test_valid_program(self):
+        program = """
+        sheet SH = 1 * 2
+        range _r = range SH'A1..SH'B2
+        function Sum[_values : range] return scalar is
+          scalar total = 0.0
+          for _values do total := total + $ done
+          return total
+        end
+        subroutine Show[value : scalar] is scalar shown = value print_scalar shown end
+        Show[Sum[_r]]
+        print_range _r[1, 0]
+        """
+        analyzer = analyze(program)
+        self.assertEqual([function.formals for function in analyzer.functions], [["range"], ["scalar"]])
+        self.assertEqual([function.returns for function in analyzer.functions], ["scalar", None])
+
+    def test_scope_tables(self):
+        program = """
+        scalar total = 1.0
+        function Twice[total : scalar] return scalar is
+          scalar result = total * 2.0
+          return result
+        end
+        print_scalar Twice[total]
+        """
+        tree = ssparser.parse_data(data=program)
+        analyzer = sssemantics.analyze(tree)
+        names = tree.symbols.names
+        self.assertEqual([names[symbol] for symbol in analyzer.globals], ["total"])
+        function = analyzer.functions[0]
+        self.assertEqual([names[symbol] for symbol in function.symbols], ["total", "result"])
+        self.assertEqual(function.variables, 2)
+        # The formal hides the global variable inside the function only.
+        definition = function.definition
+        returned = definition.children_statement_list[0].child_expression
+        self.assertEqual((returned.scope, returned.slot), (nodes.SCOPE_LOCAL, 1))
+        argument = tree.children_statement_list[0].child_expression.children_arguments[0]
+        self.assertEqual((argument.scope, argument.slot), (nodes.SCOPE_GLOBAL, 0))
+
+    def test_argument_types(self):
+        program = """
+        function Size[_values : range] return scalar is return #_values end
+        print_scalar Size[1.0]
+        """
+        self.assertEqual(errors(program), ["Argument 1 of 'Size' is a scalar, not a range"])
+
+    def test_call_types(self):
+        one: str = "function One[] return scalar is return 1.0 end\n"
+        cases = {
+            one + "print_range [One[]]": "'One' returns a scalar, not a range",
+            one + "One[]": "'One' is not a subroutine",
+            "subroutine Nothing[] is scalar unused print_scalar 1.0 end\nprint_scalar Nothing[]":
+                "'Nothing' is not a function",
+            "sheet SH = 1 * 1\nrange _r = range SH'A1..SH'A1\n"
+            "function Bad[] return scalar is return _r end\nprint_scalar Bad[]": "Expected a scalar, not a range",
+        }
+        for program, message in cases.items():
+            with self.subTest(program=program):
+                self.assertIn(message, errors(program))
+
+    def test_all_errors_are_reported(self):
+        program = """
+        scalar first = second
+        print_scalar third
+        print_scalar $
+        Missing[]
+        """
+        self.assertEqual(errors(program), [
+            "Variable 'second' is not defined",
+            "Variable 'third' is not defined",
+            "Current cell $ used outside of for loop",
+            "Function 'Missing' is not defined",
+        ])
+
+    def test_long_expression(self):
+        terms = " + ".join(["xx"] * 600)
+        self.assertEqual(errors(f"scalar xx = 1.0\nprint_scalar aa * {terms} - #_missing + bb"), [
+            "Variable 'aa' is not defined",
+            "Variable '_missing' is not defined",
+            "Variable 'bb' is not defined",
+        ])
+        tree = ssparser.parse_data(data=f"scalar xx = 1.0\nsheet SH = 1 * 1\nfor range SH'A1..SH'A1 do $ := {terms} done")
+        sssemantics.analyze(tree)
+        self.assertTrue(tree.children_statement_list[0].independent)
+
+    def test_located(self):
+        program = "scalar aa = 1.0\nprint_scalar aa + bb\n"
+        with self.assertRaises(sssemantics.SemanticError) as context:
+            analyze(program)
+        self.assertEqual(context.exception.located(program), ["2:19: Variable 'bb' is not defined"])
+
+    def test_pure_functions(self):
+        program = """
+        sheet SH = 2 * 2
+        scalar rate = 1.5
+        range _r = range SH'A1..SH'B2
+        function Sum[_values : range] return scalar is
+          scalar total = 0.0
+          for _values do total := total + $ done
+          return total
+        end
+        function Fib[num : scalar] return scalar is
+          if num < 2.0 then return num endif
+          return Fib[num - 1.0] + Fib[num - 2.0]
+        end
+        function First[_values : range] return range is return _values end
+        function Rated[num : scalar] return scalar is return num * rate end
+        function Shown[num : scalar] return scalar is print_scalar num return num end
+        function Fill[_values : range] return scalar is for _values do $ := 1.0 done return 1.0 end
+        function Next[_values : range] return scalar is return Sum[_values[1, 0]] end
+        function Uses[num : scalar] return scalar is return Fib[num] + Rated[num] end
+        function Cell[SHEET : sheet] return scalar is return SHEET'A1 end
+        function Own[_values : range] return scalar is
+          scalar total = 0.0
+          for _values do total := total + Sum[range $..$] done
+          return total
+        end
+        function Between[_aa : range, _bb : range] return scalar is
+          scalar total = 0.0
+          for _aa, _bb do total := total + Sum[range $..$:_bb] done
+          return total
+        end
+        print_scalar Uses[Sum[_r]]
+        """
+        functions = analyze(program).functions
+        self.assertEqual({function.definition.child_name.value: function.pure for function in functions}, {
+            "Sum": True, "Fib": True, "First": True, "Rated": False, "Shown": False, "Fill": False,
+            "Next": False, "Uses": False, "Cell": False, "Own": True, "Between": False,
+        })
+        # A range result is a view to the sheet of the argument.
+        self.assertEqual([function.memoizable for function in functions[:3]], [True, True, False])
+
+    def test_literals(self):
+        tree = ssparser.parse_data(data="print_scalar 1.5")
+        sssemantics.analyze(tree, literal=float)
+        self.assertEqual(tree.children_statement_list[0].child_expression.number, 1.5)